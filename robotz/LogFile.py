@@ -1,8 +1,9 @@
 import time
 import os
 import datetime
-from .core import Robot, synchronized, Core
-from threading import Timer, Thread
+import weakref
+from .core import Robot, synchronized, Core, Timer
+from threading import Thread
 
 def make_timestamp(t=None):
     if t is None:   
@@ -10,6 +11,12 @@ def make_timestamp(t=None):
     elif isinstance(t, (int, float)):
         t = datetime.datetime.fromtimestamp(t)
     return t.strftime("%m/%d/%Y %H:%M:%S") + ".%03d" % (t.microsecond//1000)
+
+def _flush_log(ref, interval):
+    # the flush Timer holds only a weak reference, so an unused LogFile can be garbage-collected while the Timer is armed
+    log = ref()
+    if log is not None:
+        log.flush(interval)
                 
 class LogStream(Core):
 
@@ -58,6 +65,8 @@ class LogFile(Core):
             self.LineBuf = ''
             self.LastLog = None
             self.LastFlush = time.time()
+            self.FlushTimer = None
+            self.Closed = False
             if append:
                 self.File = open(self.Path, 'a')
                 self.File.write("%s: [appending to old log]\n" % (make_timestamp(),))
@@ -107,9 +116,13 @@ class LogFile(Core):
             self.flush()
             self.LastLog = datetime.date.today()
 
+        @synchronized
         def arm_flush_timer(self, interval):
-            if interval:
-                Timer(interval, self.flush, interval=interval).start()
+            if self.FlushTimer is not None:
+                self.FlushTimer.cancel()
+                self.FlushTimer = None
+            if interval and not self.Closed:
+                self.FlushTimer = Timer(_flush_log, weakref.ref(self), interval, t=interval)
                     
         @synchronized
         def flush(self, interval=None):
@@ -117,6 +130,16 @@ class LogFile(Core):
                 self.File.flush()
             if interval:
                 self.arm_flush_timer(interval)
+
+        @synchronized
+        def close(self):
+            self.Closed = True
+            if self.FlushTimer is not None:
+                self.FlushTimer.cancel()
+                self.FlushTimer = None
+            if self.File is not None:
+                self.File.close()
+                self.File = None
                 
         def start(self):
             # for compatibility with clients, which think LogFile is a thread
@@ -128,8 +151,6 @@ class LogFile(Core):
                 pass
                 
         def __del__(self):
-            if self.File is not None:
-                self.File.close()
-                self.File = None
+            self.close()
 
 
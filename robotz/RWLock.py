@@ -64,7 +64,8 @@ class RWLock(Core):
         if self.ExclusiveCount <= 0:
             self.ExclusiveCount = 0
             self.Exclusive= None
-        self.wakeup(all=True)
+            self.wakeup(all=True, channel="shared")
+            self.wakeup(all=True, channel="exclusive")
         
     def __acq_shared(self):
         tid = _thread_id()
@@ -85,12 +86,14 @@ class RWLock(Core):
             del self.Shared[tid]
         else:
             self.Shared[tid] = n
-        self.wakeup(all=True)
+        if len(self.Shared) <= 1:
+            # only threads waiting for exclusive lock can be waiting for shared locks to be released
+            self.wakeup(all=True, channel="exclusive")
         
     @synchronized
     def acquireExclusive(self):
         while not self.__acq_exclusive():
-            self.sleep()
+            self.sleep(channel="exclusive")
             
     @synchronized
     def acquireShared(self):
@@ -99,7 +102,7 @@ class RWLock(Core):
         If the lock is exclusively locked by the same thread, the lock will also be locked in shared way and the method will return immediately.
         """
         while not self.__acq_shared():
-            self.sleep()
+            self.sleep(channel="shared")
             
     @synchronized
     def releaseExclusive(self):
@@ -1,100 +1,249 @@
 from .core import Robot, synchronized, Core, Timeout
 from .task_queue import Task, TaskQueue
 from .promise import Promise
+from .executor import ThreadExecutor
+from .timer_store import HeapTimerStore
+from .cron import CronExpression
+from .histogram import Histogram
+from .clock import now as _now, monotonic as _monotonic, to_monotonic, to_wall
+from collections import OrderedDict
+from zoneinfo import ZoneInfo
 import time, uuid, traceback, random
 import sys
 
+JobFunctions = {}           # name -> function, for Scheduler.restore_state()
+_JobFunctionNames = {}      # function -> name
+
+def register_job_function(fcn, name=None):
+    """Registers the function under a name so that jobs calling it can be saved with ``Scheduler.save_state`` and restored
+    with ``Scheduler.restore_state``. Can be used as a decorator:
+
+    .. code-block:: python
+
+        @register_job_function
+        def poll(host):
+            ...
+
+    Args:
+        fcn (callable): function to register
+        name (str): name to register the function under. Must be the same in the process saving the state and the process
+            restoring it. Default: "module.qualified_name" of the function
+
+    Returns:
+        callable: the function
+    """
+    if name is None:
+        name = f"{fcn.__module__}.{fcn.__qualname__}"
+    JobFunctions[name] = fcn
+    _JobFunctionNames[fcn] = name
+    return fcn
+
+def _job_function_name(fcn):
+    try:    return _JobFunctionNames.get(fcn)
+    except TypeError:
+        return None         # unhashable callable
+
 class Job(object):
     
-    def __init__(self, scheduler, id, t, interval, jitter, fcn, count, params, args):
+    def __init__(self, scheduler, id, t, interval, jitter, fcn, count, params, args, overlap="skip", misfire="coalesce", grace=None,
+                tags=()):
+        if overlap not in ("skip", "queue", "allow"):
+            raise ValueError(f"Unknown overlap policy: {overlap}")
+        if misfire not in ("coalesce", "catch_up", "skip"):
+            raise ValueError(f"Unknown misfire policy: {misfire}")
         self.F = fcn
         self.Params = params or ()
         self.Args = args or {}
         self.ID = id
         self.Interval = interval
         self.Jitter = jitter or 0.0
-        self.NextT = t
+        self.NextT = t                  # monotonic time
+        self.BaseT = t                  # scheduled time without the jitter, the job phase
         self.Scheduler = scheduler
         self.Count = count
         self.Promise = None
+        self.Entry = None               # timeline handle while the job is scheduled
+        self.Cancelled = False
+        self.Cron = None                # CronExpression for cron jobs
+        self.TZ = None
+        self.Tags = frozenset(tags)
+        self.Paused = False
+        self.Overlap = overlap
+        self.Misfire = misfire
+        self.Grace = grace
+        self.NRunning = 0               # including the runs waiting for a free Scheduler thread
+        self.Queued = None              # (promise, scheduled time) of the run queued because of overlap
+        self.NRuns = 0
+        self.NMisfired = 0              # runs not started because they were late by more than the grace time
+        self.NMissed = 0                # runs skipped or coalesced because the next run was already due
+        self.NOverlapped = 0            # runs which became due while the job was running
+        self.NEnded = 0
+        self.LatenessSum = self.MaxLateness = 0.0       # lateness - time between the scheduled and actual start
+        self.DurationSum = self.MaxDuration = 0.0
+        self.Lateness = self.Duration = None            # histograms, if the Scheduler collects per job metrics
         
     def __str__(self):
         return f"Job({self.ID})"
         
     __repr__ = __str__
+
+    @property
+    def repeating(self):
+        return self.Interval is not None or self.Cron is not None
+
+    def _after(self, t):
+        # next scheduled time of the job after the run scheduled at t, without the jitter
+        if self.Cron is not None:
+            # cron expressions follow the wall clock
+            return to_monotonic(self.Cron.next_after(to_wall(t), self.TZ))
+        else:
+            return t + self.Interval
+
+    def due(self, now):
+        """Applies the misfire policy when the run scheduled for ``BaseT`` becomes due at ``now``.
+
+        Returns:
+            tuple: (run, next_t) - whether the run should start and the scheduled time of the next run without the jitter or
+                None if the job does not repeat
+        """
+        lateness = now - self.NextT
+        run = self.Grace is None or lateness <= self.Grace
+        if not run:
+            self.NMisfired += 1
+        if not self.repeating:
+            return run, None
+        t = self._after(self.BaseT)
+        if t > now or self.Misfire == "catch_up":
+            return run, t
+        # some runs after this one were missed too, find the first run in the future
+        missed = 1
+        if self.Cron is None:
+            if self.Interval > 0:
+                n = int((now - t) // self.Interval) + 1
+                missed, t = n, t + n * self.Interval
+            else:
+                t = now
+        else:
+            t = self._after(t)
+            while t <= now:
+                t = self._after(t)
+                missed += 1
+        if self.Misfire == "skip" and run:
+            run = False
+            missed += 1
+        self.NMissed += missed
+        return run, t
         
-    def run(self):
-        promise = self.Promise
-        self.Promise = None
-        self.Scheduler = None           # to break circular dependencies
-        start = time.time()
+    def run(self, promise=None):
+        start = _monotonic()
         exc_info = None
         try:    
-            #print(f"Job({self.ID}): running:", self.F, self.Params, self.Args)
             next_t = self.F(*self.Params, **self.Args)
-            promise.complete()
+            if promise is not None:
+                promise.complete()
         except Exception as e:
-            #print(f"Job({self.ID}):", e)
             exc_info = sys.exc_info()
-            #print(f"Job({self.ID}): exception:", traceback.format_exc())
-            promise.exception(*exc_info)
-            next_t = None
-        else:
-            #print(f"Job({self.ID}): done")
-            pass
-        if self.Count is not None:
-            self.Count -= 1
-            if self.Count <= 0:
-                return None, exc_info
-        if next_t == "stop":
+            if promise is not None:
+                promise.exception(*exc_info)
             next_t = None
-        elif next_t is None and self.Interval is not None:
-            next_t = start + self.Interval + random.random() * self.Jitter
-        if next_t is not None and next_t < 3.0e7:
-            # if next_t is < 1980, it's relative time
-            next_t = next_t + start + random.random() * self.Jitter
+        if next_t is not None and next_t != "stop":
+            if next_t < 3.0e7:
+                # if next_t is < 1980, it's relative time
+                next_t = next_t + start + random.random() * self.Jitter
+            else:
+                next_t = to_monotonic(next_t)
         return next_t, exc_info
+
+    def stats(self):
+        """
+        Returns:
+            dict: number of runs, number of runs not started because they were late by more than the grace time, missed runs skipped or
+                coalesced, runs which became due while the job was running, average and maximum lateness of the job starts,
+                average and maximum run duration
+        """
+        return dict(
+            runs = self.NRuns,
+            misfired = self.NMisfired,
+            missed = self.NMissed,
+            overlapped = self.NOverlapped,
+            avg_lateness = self.LatenessSum/self.NRuns if self.NRuns else 0.0,
+            max_lateness = self.MaxLateness,
+            avg_duration = self.DurationSum/self.NEnded if self.NEnded else 0.0,
+            max_duration = self.MaxDuration
+        )
+
+    def _started(self, lateness):
+        self.NRuns += 1
+        self.LatenessSum += lateness
+        self.MaxLateness = max(self.MaxLateness, lateness)
+        if self.Lateness is not None:
+            self.Lateness.add(lateness)
+
+    def _ended(self, duration):
+        self.NEnded += 1
+        self.DurationSum += duration
+        self.MaxDuration = max(self.MaxDuration, duration)
+        if self.Duration is not None:
+            self.Duration.add(duration)
         
-    def cancel(self):
+    def cancel(self, *ignored):
         """Cancels the job. If the job is currently running, it will not be stopped, but if it's a repeating job, calling this
         method will prevent the job from running again.
         """
+        self.Cancelled = True
         try: 
             self.Scheduler.remove(self)
         except: pass
-        self.Scheduler = None
-
-class JobThread(Robot):
-    
-    def __init__(self, scheduler, job):
-        Robot.__init__(self, name=f"Scheduler({scheduler})/job{job.ID}", daemon=True)
-        self.Scheduler = scheduler
-        self.Job = job
-        
-    def run(self):
-        scheduler = self.Scheduler
-        job = self.Job
-        self.Job = self.Scheduler = None
-        next_t, exc_info = job.run()
-        if exc_info:
-            scheduler.job_failed(job, next_t, *exc_info)
-        else:
-            scheduler.job_ended(job, next_t)
 
 class Scheduler(Robot):
-    def __init__(self, max_concurrent = 100, stop_when_empty = False, delegate=None, daemon=True, name=None, start=True, **args):
+    def __init__(self, max_concurrent = 100, stop_when_empty = False, delegate=None, daemon=True, name=None, start=True,
+                overflow="queue", timer_store=None, late_threshold=None, job_metrics=False, **args):
         """
         Args:
-            max_concurrent (int): maximum number of concurrent jobs to run. Default: 100
+            max_concurrent (int): maximum number of concurrent jobs to run. Jobs run on a pool of up to ``max_concurrent`` reusable
+                threads. None - no limit. Default: 100
+            overflow (str): what to do with a job, which becomes due when ``max_concurrent`` jobs are already running:
+
+                * "queue" - wait for a free thread, jobs start in the order they became due
+                * "skip" - skip this run. A repeating job will be rescheduled for its next interval, a one-time job will be cancelled
+                * "coalesce" - wait like with "queue", but if a job with the same id is already waiting, the two runs are merged into one.
+                  The promise of the earlier run will be delivered when the merged run ends
+
+                Default: "queue"
+            timer_store (object): timer store to keep the scheduled jobs in, e.g. TimingWheel. Default: new HeapTimerStore
             stop_when_empty (bool): stops the Scheduler thread when all the jobs complete. Default: False
-            delegate (object): an object to notify when a job ends or fails
+            delegate (object): an object to notify when a job ends, fails or starts late
+            late_threshold (numeric): if specified, the delegate's ``jobLate(scheduler, job_id, lateness)`` method will be called when
+                a job starts later than its scheduled time by more than ``late_threshold`` seconds
+            job_metrics (bool): keep lateness and duration histograms for each job, see ``snapshot()``. Per job averages and maximums
+                are always available from ``Job.stats()``. Default: False
             daemon (bool): whether the Scheduler thread will run as daemon. Default: False
             name (str): name of the Scheduler
             start (bool): whether to start the Scheduler immediately on initialization. If False, the Scheduler needs to be started
                 by calling ``start()`` method. Default: True
         """
         Robot.__init__(self, daemon=daemon, name=name)
-        self.Timeline = []      # [job, ...]
+        if overflow not in ("queue", "skip", "coalesce"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.MaxConcurrent = max_concurrent
+        self.Overflow = overflow
+        self.Executor = ThreadExecutor(max_concurrent, name=f"Scheduler({self.Name}).executor")
+        self.NRunning = 0
+        self.Waiting = OrderedDict()        # job id (coalesce) or sequence number -> (job, time it started waiting)
+        self.NDelayed = self.NSkipped = self.NCoalesced = 0
+        self.NMissed = self.NMisfired = self.NOverlapped = 0
+        self.LateThreshold = late_threshold
+        self.Lateness = Histogram()
+        self.Duration = Histogram()
+        self.TimelineDepth = Histogram([1, 10, 100, 1000, 10000, 100000, 1000000])
+        self.JobMetrics = job_metrics
+        self.DelayTime = 0.0
+        self.Timeline = timer_store if timer_store is not None else HeapTimerStore()
+        self.Jobs = {}          # job id -> scheduled job
+        self.Paused = {}        # job id -> paused job
+        self.Tags = {}          # tag -> {job id -> job}
+        self.Seq = 0
+        self.WakeUpT = None     # time the Scheduler thread sleeps until
         self.Delegate = delegate
         self.StopWhenEmpty = stop_when_empty
         self.Stop = False
@@ -105,10 +254,9 @@ class Scheduler(Robot):
     def job_ended(self, job, next_t):
         #print("job_ended:", job.ID)
         if self.Delegate is not None and hasattr(self.Delegate, "jobEnded"):
-            try:    self.Delegate.jobEnded(self, task.JobID)
+            try:    self.Delegate.jobEnded(self, job.ID)
             except: pass
-        if next_t is not None:
-            self.add_job(job, next_t)
+        self._reschedule(job, next_t)
         self.wakeup()
 
     def job_failed(self, job, next_t, exc_type, exc_value, tb):
@@ -116,13 +264,39 @@ class Scheduler(Robot):
         if self.Delegate is not None and hasattr(self.Delegate, "jobFailed"):
             try:    self.Delegate.jobFailed(self, job.ID, exc_type, exc_value, tb)
             except: pass
-        if next_t is not None:
-            self.add_job(job, next_t)
+        self._reschedule(job, next_t)
         self.wakeup()
+
+    def job_late(self, job, lateness):
+        if self.Delegate is not None and hasattr(self.Delegate, "jobLate"):
+            try:    self.Delegate.jobLate(self, job.ID, lateness)
+            except: pass
+
+    @synchronized
+    def _reschedule(self, job, next_t):
+        # applies the next run time returned by the job function
+        if next_t == "stop":
+            if job.Promise is not None:
+                job.Promise.cancel()        # this will cancel the job too
+            else:
+                job.cancel()
+        elif next_t is not None and not job.Cancelled and (job.Count is None or job.Count > 0):
+            if job.Paused:
+                # will be scheduled by resume_tag()
+                job.NextT = job.BaseT = next_t
+            else:
+                # replaces the run scheduled when this run started
+                self.add_job(job, next_t)
         
     @synchronized
-    def jobs(self):
-        return self.Timeline[:]
+    def jobs(self, tag=None):
+        """Returns the list of scheduled jobs sorted by their next run time
+
+        Args:
+            tag (str): if specified, return only the jobs with this tag, including paused ones
+        """
+        jobs = self.Jobs.values() if tag is None else self.Tags.get(tag, {}).values()
+        return sorted(jobs, key=lambda j: j.NextT)
 
     def stop(self):
         """Stops the Scheduler thread"""
@@ -130,15 +304,63 @@ class Scheduler(Robot):
         self.wakeup()
         
     @synchronized
-    def add_job(self, job, t):
+    def add_job(self, job, t, base_t=None):
+        self._replace(job)
         job.NextT = t
-        self.Timeline.append(job)
-        job.Promise = promise = Promise(job).oncancel(job.cancel)
-        self.wakeup()
+        job.BaseT = t if base_t is None else base_t
+        job.Scheduler = self
+        self._job_metrics(job)
+        job.Entry = self.Timeline.push(t, job)
+        self.Jobs[job.ID] = job
+        for tag in job.Tags:
+            self.Tags.setdefault(tag, {})[job.ID] = job
+        if job.Promise is None:
+            job.Promise = Promise(job).oncancel(job.cancel)
+        promise = job.Promise
+        if self.WakeUpT is None or t < self.WakeUpT:
+            # the Scheduler thread needs to wake up earlier
+            self.wakeup()
         return promise
+
+    def _job_metrics(self, job):
+        # allocates per job histograms if the Scheduler collects them
+        if self.JobMetrics and job.Lateness is None:
+            job.Lateness, job.Duration = Histogram(), Histogram()
+
+    def _replace(self, job):
+        # must be called while the Scheduler is locked. Removes the job or another job with the same id from the schedule
+        old = self.Jobs.get(job.ID) or self.Paused.get(job.ID)
+        if old is not None:
+            self._unschedule(old)
+            if old is not job:
+                # replaced by the new job
+                old.Cancelled = True
+                if old.Promise is not None:
+                    old.Promise.cancel()
+
+    def _unschedule(self, job):
+        # must be called while the Scheduler is locked
+        if self.Jobs.get(job.ID) is job:
+            del self.Jobs[job.ID]
+        elif self.Paused.get(job.ID) is job:
+            del self.Paused[job.ID]
+            job.Paused = False
+        if job.Entry is not None:
+            self.Timeline.cancel(job.Entry)
+            job.Entry = None
+        self._untag(job)
+
+    def _untag(self, job):
+        for tag in job.Tags:
+            jobs = self.Tags.get(tag)
+            if jobs is not None and jobs.get(job.ID) is job:
+                del jobs[job.ID]
+                if not jobs:
+                    del self.Tags[tag]
         
     @synchronized        
-    def add(self, fcn, *params, interval=None, t=None, t0=None, id=None, jitter=0.0, param=None, count=None, **args):
+    def add(self, fcn, *params, interval=None, t=None, t0=None, id=None, jitter=0.0, param=None, count=None,
+                overlap="skip", misfire="coalesce", grace=None, tags=(), **args):
         """Adds a new job to the schedule.
         
         Args:
@@ -150,12 +372,30 @@ class Scheduler(Robot):
             t (numeric): pecifies the time when to fire the Timer first time. ``t`` can be either absolute timestamp - time in seconds since the
                 Epoch or relative to current time. If ``t`` is less than 3e8 (~10 years), then it is interpreted as relative to current time.
                 Default: current time plus ``interval``
-            id (str): id to assign to the job. If None, the id will be generated automatically
+            id (str): id to assign to the job. If None, the id will be generated automatically. If a job with the same id is already
+                scheduled, it will be replaced
+            overlap (str): what to do when a run of a repeating job becomes due while the previous run is still running:
+
+                * "skip" - skip the new run
+                * "queue" - start the new run when the previous one ends. Several overlapping runs are queued as one
+                * "allow" - start the new run concurrently
+
+                Default: "skip"
+            misfire (str): what to do when a repeating job runs late so that its next run is already due, e.g. after a long run or
+                when the process was stalled:
+
+                * "coalesce" - run once, then continue with the first run scheduled in the future
+                * "catch_up" - run all the missed runs one after another
+                * "skip" - do not run the late run and continue with the first run scheduled in the future
+
+                Default: "coalesce"
+            grace (numeric): if specified, a run, which is late by more than ``grace`` seconds will not be started. Default: no limit
+            tags (iterable): tags to assign to the job for the bulk operations like ``pause_tag`` and ``remove_tag``
             t0 - deprecated, alias to t, retained for backward compatibility
             param: deprecated, single positional parameter to pass to ``fcn``. Use ``params`` instead        
         
         Returns:
-            Job: job object
+            Promise: promise of the first run of the job. Its ``Data`` attribute is the Job object
         """
         #
         # t0 - first time to run the task. Default:
@@ -170,18 +410,56 @@ class Scheduler(Robot):
         #   next_t:
         #       "stop" - remove task
         #       int or float - next time to run
-        #       None - run at now+interval next time
+        #       None - run at the next scheduled time
         #
         if t is None: t = t0            # alias, t0 argument is deprecated
         if param is not None:       # for backward compatibility
             params = (param,)
         if id is None:
             id = uuid.uuid4().hex[:8]
+            while id in self.Jobs:
+                id = uuid.uuid4().hex[:8]
         if t is None:
-            t = time.time() + (interval or 0.0) + random.random()*jitter
+            t = _monotonic() + (interval or 0.0)
         elif t < 10*365*24*3600:           # ~ Jan 1 1980
-            t = time.time() + t
-        job = Job(self, id, t, interval, jitter, fcn, count, params, args)
+            t = _monotonic() + t
+        else:
+            t = to_monotonic(t)
+        job = Job(self, id, t, interval, jitter, fcn, count, params, args, overlap=overlap, misfire=misfire, grace=grace, tags=tags)
+        return self.add_job(job, t + random.random()*jitter, t)
+
+    @synchronized
+    def add_cron(self, expression, fcn, *params, tz=None, id=None, count=None, overlap="skip", misfire="coalesce", grace=None,
+                tags=(), **args):
+        """Adds a new job to run at times specified by a cron expression. Cron jobs are kept in the same timeline as the other jobs,
+        the next fire time is calculated once per run.
+
+        Args:
+            expression (str or CronExpression): cron expression, e.g. "*/5 * * * *". See ``CronExpression``
+            fcn (callable): will be called when the job starts. If it returns "stop", the job will not run again. If it returns a time,
+                the job will run at that time next time instead of the next time matching the expression
+            params: positional arguments to pass to ``fcn``
+            args: keyword arguments to to pass to ``fcn``
+            tz (tzinfo): time zone to interpret the expression in. Default: local time
+            id (str): id to assign to the job
+            count (int): how many times to run the job. Default: unlimited
+            overlap (str): overlap policy, see ``add``
+            misfire (str): misfire policy, see ``add``
+            grace (numeric): misfire grace time, see ``add``
+            tags (iterable): tags to assign to the job
+
+        Returns:
+            Promise: promise of the first run of the job. Its ``Data`` attribute is the Job object
+        """
+        cron = expression if isinstance(expression, CronExpression) else CronExpression(expression)
+        if id is None:
+            id = uuid.uuid4().hex[:8]
+            while id in self.Jobs:
+                id = uuid.uuid4().hex[:8]
+        t = to_monotonic(cron.next_after(_now(), tz))
+        job = Job(self, id, t, None, 0.0, fcn, count, params, args, overlap=overlap, misfire=misfire, grace=grace, tags=tags)
+        job.Cron = cron
+        job.TZ = tz
         return self.add_job(job, t)
         
     @synchronized
@@ -192,57 +470,401 @@ class Scheduler(Robot):
             job_or_id: Either the Job object returned by the ``add`` method, or job id (str)
         """
         job_id = job_or_id if isinstance(job_or_id, str) else job_or_id.ID
-        self.Timeline = [j for j in self.Timeline if j.ID != job_id]
+        job = self.Jobs.get(job_id) or self.Paused.get(job_id)
+        if job is not None:
+            self._unschedule(job)
+
+    @synchronized
+    def pause_tag(self, tag):
+        """Pauses all jobs with the tag. Paused jobs stay in the Scheduler, but they are not run until resumed. Jobs currently running
+        are not stopped.
+
+        Returns:
+            int: number of paused jobs
+        """
+        n = 0
+        for job in list(self.Tags.get(tag, {}).values()):
+            if not job.Paused:
+                if self.Jobs.get(job.ID) is job:
+                    del self.Jobs[job.ID]
+                if job.Entry is not None:
+                    self.Timeline.cancel(job.Entry)
+                    job.Entry = None
+                job.Paused = True
+                self.Paused[job.ID] = job
+                n += 1
+        return n
+
+    @synchronized
+    def resume_tag(self, tag):
+        """Resumes the paused jobs with the tag. Runs missed while the jobs were paused are handled according to the job misfire policy.
+
+        Returns:
+            int: number of resumed jobs
+        """
+        n = 0
+        for job in list(self.Tags.get(tag, {}).values()):
+            if job.Paused:
+                del self.Paused[job.ID]
+                job.Paused = False
+                self.add_job(job, job.NextT, job.BaseT)
+                n += 1
+        return n
+
+    @synchronized
+    def remove_tag(self, tag):
+        """Removes all jobs with the tag from the Scheduler. Jobs currently running are not stopped, but they will not run again.
+
+        Returns:
+            int: number of removed jobs
+        """
+        jobs = list(self.Tags.get(tag, {}).values())
+        for job in jobs:
+            job.Cancelled = True
+            self._unschedule(job)
+        return len(jobs)
+
+    @synchronized
+    def reschedule_tag(self, tag, t=None, delta=None):
+        """Moves the next runs of all jobs with the tag. Repeating jobs keep their interval, their phase will be moved too.
+
+        Args:
+            tag (str): job tag
+            t (numeric): new time for the next run, absolute or relative to current time if less than 3e8
+            delta (numeric): time in seconds to move the next runs by. Either ``t`` or ``delta`` must be specified
+
+        Returns:
+            int: number of rescheduled jobs
+        """
+        if (t is None) == (delta is None):
+            raise ValueError("Either t or delta must be specified")
+        if t is not None:
+            t = _monotonic() + t if t < 10*365*24*3600 else to_monotonic(t)
+        n = 0
+        for job in list(self.Tags.get(tag, {}).values()):
+            shift = t - job.BaseT if t is not None else delta
+            if job.Paused:
+                job.NextT += shift
+                job.BaseT += shift
+            else:
+                self.add_job(job, job.NextT + shift, job.BaseT + shift)
+            n += 1
+        return n
 
     @synchronized
     def run_jobs(self):
-        keep_jobs = []
-        next_run = None
-        for job in self.Timeline:
-            if job.NextT <= time.time():
-                t = JobThread(self, job)
-                t.start()
-                self.wakeup()
+        # starts all due jobs, returns the time of the next job to run or None
+        now = _monotonic()
+        self.TimelineDepth.add(len(self.Timeline))
+        due = self.Timeline.pop_due(now)
+        for job in due:
+            job.Entry = None
+            del self.Jobs[job.ID]
+            self._untag(job)            # will be tagged again if rescheduled
+            self._job_due(job, now)
+        if due:
+            self.wakeup()
+        return self.Timeline.next_time()
+
+    def _job_due(self, job, now):
+        # must be called while the Scheduler is locked. Schedules the next run of the job and starts this one
+        # according to the job policies
+        promise = job.Promise
+        job.Promise = None
+        t_scheduled = job.NextT
+        missed, misfired = job.NMissed, job.NMisfired
+        run, next_t = job.due(now)
+        self.NMissed += job.NMissed - missed
+        self.NMisfired += job.NMisfired - misfired
+        if next_t is not None and not job.Cancelled and (job.Count is None or job.Count > 0):
+            self.add_job(job, next_t + random.random()*job.Jitter, next_t)
+        if run and job.NRunning and job.Overlap != "allow":
+            job.NOverlapped += 1
+            self.NOverlapped += 1
+            if job.Overlap == "queue":
+                if job.Queued is None:
+                    job.Queued = (promise, t_scheduled)
+                elif promise is not None:
+                    queued_promise = job.Queued[0]
+                    if queued_promise is None:
+                        job.Queued = (promise, job.Queued[1])
+                    else:
+                        queued_promise.chain(promise)
+                return
+            run = False
+        if run:
+            self._start_job(job, promise, t_scheduled)
+        else:
+            self._drop_run(job, promise)
+
+    def _drop_run(self, job, promise):
+        # the run will not happen, its promise will be delivered by the next run of the job, if any
+        if promise is not None:
+            if job.Promise is not None:
+                job.Promise.chain(promise)
+            else:
+                promise.cancel()
+
+    def _count_run(self, job, promise):
+        # must be called while the Scheduler is locked, when a run of the job is about to start. Counts the run against
+        # the job count and removes the job from the schedule after the last run.
+        # Returns False if the job has no runs left
+        if job.Count is None:
+            return True
+        if job.Count <= 0:
+            return False
+        job.Count -= 1
+        if job.Count <= 0:
+            self._unschedule(job)
+            if job.Promise is not None:
+                # the next run will not happen, the promise is delivered by this run
+                next_promise, job.Promise = job.Promise, None
+                if promise is not None and next_promise is not promise:
+                    promise.chain(next_promise)
+        return True
+
+    def _start_job(self, job, promise, t_scheduled):
+        # must be called while the Scheduler is locked
+        job.NRunning += 1
+        if self.MaxConcurrent is None or self.NRunning < self.MaxConcurrent:
+            if not self._count_run(job, promise):
+                job.NRunning -= 1
+                self._drop_run(job, promise)
+                return
+            self.NRunning += 1
+            self.Executor.submit(self._run_job, job, promise, t_scheduled)
+            return
+        self.NDelayed += 1
+        if self.Overflow == "skip":
+            self.NSkipped += 1
+            job.NRunning -= 1
+            self._drop_run(job, promise)
+        elif self.Overflow == "coalesce" and job.ID in self.Waiting:
+            self.NCoalesced += 1
+            job.NRunning -= 1
+            _, earlier, t_earlier, t_waiting = self.Waiting[job.ID]
+            if earlier is None:
+                earlier = promise
+            elif promise is not None:
+                earlier.chain(promise)
+            self.Waiting[job.ID] = (job, earlier, t_earlier, t_waiting)
+        else:
+            if self.Overflow == "coalesce":
+                key = job.ID
             else:
-                next_run = min(next_run or job.NextT, job.NextT)
-                keep_jobs.append(job)
-        self.Timeline = keep_jobs
-        return next_run
+                self.Seq += 1
+                key = self.Seq
+            self.Waiting[key] = (job, promise, t_scheduled, _monotonic())
+
+    def _run_job(self, job, promise, t_scheduled):
+        # called by the executor thread
+        t_started = _monotonic()
+        try:
+            lateness = t_started - t_scheduled
+            with self:
+                job._started(lateness)
+                self.Lateness.add(lateness)
+            if self.LateThreshold is not None and lateness > self.LateThreshold:
+                self.job_late(job, lateness)
+            next_t, exc_info = job.run(promise)
+            if exc_info:
+                self.job_failed(job, next_t, *exc_info)
+            else:
+                self.job_ended(job, next_t)
+        finally:
+            with self:
+                duration = _monotonic() - t_started
+                job._ended(duration)
+                self.Duration.add(duration)
+                self.NRunning -= 1
+                job.NRunning -= 1
+                if job.Queued is not None:
+                    (promise, t_queued), job.Queued = job.Queued, None
+                    if job.Cancelled:
+                        self._drop_run(job, promise)
+                    else:
+                        self._start_job(job, promise, t_queued)
+                while self.Waiting and (self.MaxConcurrent is None or self.NRunning < self.MaxConcurrent):
+                    _, (job, promise, t_scheduled, t_waiting) = self.Waiting.popitem(last=False)
+                    if job.Cancelled or not self._count_run(job, promise):
+                        job.NRunning -= 1
+                        self._drop_run(job, promise)
+                    else:
+                        self.DelayTime += _monotonic() - t_waiting
+                        self.NRunning += 1
+                        self.Executor.submit(self._run_job, job, promise, t_scheduled)
+
+    @synchronized
+    def stats(self):
+        """
+        Returns:
+            dict: number of scheduled, paused and running jobs, number of jobs waiting for a free thread, number of times a job was delayed because
+                ``max_concurrent`` jobs were running, skipped and coalesced runs, total time the jobs spent waiting,
+                total number of runs not started because of the job misfire and overlap policies
+        """
+        return dict(
+            scheduled = len(self.Jobs),
+            paused = len(self.Paused),
+            running = self.NRunning,
+            waiting = len(self.Waiting),
+            delayed = self.NDelayed,
+            skipped = self.NSkipped,
+            coalesced = self.NCoalesced,
+            delay_time = self.DelayTime,
+            misfired = self.NMisfired,
+            missed = self.NMissed,
+            overlapped = self.NOverlapped
+        )
+
+    @synchronized
+    def save_state(self):
+        """Saves the schedule so that it can be restored later, e.g. after a restart, with ``restore_state``.
+
+        Only jobs calling functions registered with ``register_job_function`` can be saved. Cron jobs can be saved if they have
+        no time zone or the time zone is a ``zoneinfo.ZoneInfo``. Jobs which are currently running and will not run again unless
+        they return the next run time are not on the schedule and are not saved.
+
+        Returns:
+            dict: the Scheduler state. It consists of built-in types and the job arguments, so it can be stored with json or pickle
+                if the job arguments can. The "skipped" item is the list of ids of the jobs, which could not be saved
+        """
+        jobs = []
+        skipped = []
+        for job in list(self.Jobs.values()) + list(self.Paused.values()):
+            name = _job_function_name(job.F)
+            tz = job.TZ
+            if name is None or (tz is not None and getattr(tz, "key", None) is None):
+                skipped.append(job.ID)
+                continue
+            jobs.append(dict(
+                id = job.ID,
+                function = name,
+                params = list(job.Params),
+                args = dict(job.Args),
+                t = to_wall(job.NextT),     # with the jitter
+                base_t = to_wall(job.BaseT),
+                interval = job.Interval,
+                jitter = job.Jitter,
+                count = job.Count,
+                cron = job.Cron.Expression if job.Cron is not None else None,
+                tz = tz.key if tz is not None else None,
+                overlap = job.Overlap,
+                misfire = job.Misfire,
+                grace = job.Grace,
+                tags = sorted(job.Tags),
+                paused = job.Paused
+            ))
+        return dict(time=_now(), jobs=jobs, skipped=skipped)
+
+    @synchronized
+    def restore_state(self, state):
+        """Restores the jobs saved with ``save_state``. The jobs keep their next run times, remaining run counts and phases.
+        Jobs, which became due while the state was saved, are run according to their misfire policies. Scheduled jobs with the
+        same ids are replaced.
+
+        The jobs are loaded into the timeline at once, which is much faster than adding them one by one.
+
+        Args:
+            state (dict): the state returned by ``save_state``
+
+        Returns:
+            list: promises of the next runs of the restored jobs
+        """
+        jobs = []
+        for saved in state["jobs"]:
+            fcn = JobFunctions.get(saved["function"])
+            if fcn is None:
+                raise ValueError(f"Job function is not registered: {saved['function']}")
+            job = Job(self, saved["id"], to_monotonic(saved["t"]), saved["interval"], saved["jitter"], fcn, saved["count"], tuple(saved["params"]),
+                    saved["args"], overlap=saved["overlap"], misfire=saved["misfire"], grace=saved["grace"], tags=saved["tags"])
+            job.BaseT = to_monotonic(saved["base_t"])
+            if saved["cron"] is not None:
+                job.Cron = CronExpression(saved["cron"])
+                job.TZ = ZoneInfo(saved["tz"]) if saved["tz"] is not None else None
+            jobs.append((job, saved["paused"]))
+        scheduled = []
+        for job, paused in jobs:
+            self._replace(job)
+            self._job_metrics(job)
+            job.Promise = Promise(job).oncancel(job.cancel)
+            for tag in job.Tags:
+                self.Tags.setdefault(tag, {})[job.ID] = job
+            if paused:
+                job.Paused = True
+                self.Paused[job.ID] = job
+            else:
+                self.Jobs[job.ID] = job
+                scheduled.append(job)
+        for job, entry in zip(scheduled, self.Timeline.bulk_load([(job.NextT, job) for job in scheduled])):
+            job.Entry = entry
+        self.wakeup()
+        return [job.Promise for job, _ in jobs]
+
+    @synchronized
+    def snapshot(self, jobs=True, reset=False):
+        """Returns Scheduler timing metrics: histograms of the job start lateness (time between scheduled and actual start),
+        run duration and the timeline depth (number of scheduled jobs) sampled every time the Scheduler thread wakes up.
+        See ``Histogram.snapshot()`` for the histogram format.
+
+        Args:
+            jobs (bool): include per job lateness and duration histograms of the scheduled jobs, if the Scheduler was created
+                with ``job_metrics=True``. Default: True
+            reset (bool): reset the histograms after taking the snapshot. Default: False
+
+        Returns:
+            dict: "lateness", "duration" and "timeline_depth" histograms, "stats" - the ``stats()`` output and, optionally, "jobs" -
+                dictionary {job id: {"lateness": histogram, "duration": histogram}}
+        """
+        out = dict(
+            lateness = self.Lateness.snapshot(),
+            duration = self.Duration.snapshot(),
+            timeline_depth = self.TimelineDepth.snapshot(),
+            stats = self.stats()
+        )
+        if jobs and self.JobMetrics:
+            out["jobs"] = {job.ID: dict(lateness = job.Lateness.snapshot(), duration = job.Duration.snapshot())
+                            for job in self.Jobs.values()}
+        if reset:
+            for h in (self.Lateness, self.Duration, self.TimelineDepth):
+                h.reset()
+            if self.JobMetrics:
+                for job in self.Jobs.values():
+                    job.Lateness.reset()
+                    job.Duration.reset()
+        return out
 
     @synchronized
     def is_empty(self):
-        """Returns True if there are no pending jobs on the schedule. Note that if a repeating job is currently running, it will not
-        be on the schedule until it completes or fails.
+        """Returns True if there are no pending jobs on the schedule. A repeating job stays on the schedule while it is running.
+        Paused jobs are not on the schedule.
         """
-        return not self.Timeline
+        return not self.Jobs
         
-    
     @synchronized
     def _next_run(self):
         # returns run time of first job to run
-        if self.Timeline:
-            return min(j.NextT for j in self.Timeline)
-        else:
-            return None
+        return self.Timeline.next_time()
 
     @synchronized
     def _job_is_ready(self):
-        return any(j.NextT <= time.time() for j in self.Timeline)
+        next_t = self.Timeline.next_time()
+        return next_t is not None and next_t <= _monotonic()
 
     def run(self):
         while not self.Stop and not (self.is_empty() and self.StopWhenEmpty):
             with self:
                 delta = 100
-                if self.Timeline:
+                if self.Jobs:
                     next_t = self.run_jobs()
                     if next_t is not None:
-                        delta = next_t - time.time()
+                        delta = next_t - _monotonic()
+                self.WakeUpT = _monotonic() + delta
                 self.sleep(delta)
+                self.WakeUpT = None
 
     @synchronized        
     def wait_until_empty(self):
-        """Wait until the schedule is empty. Note that if a repeating job is currently running, it will not
-        be on the schedule until it completes or fails.
+        """Wait until the schedule is empty. Note that one-time jobs currently running are not on the schedule.
         """
         while not self.is_empty():
             self.sleep(10)
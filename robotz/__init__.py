@@ -1,24 +1,34 @@
-from .core import Core, synchronized, Robot, gated, Timeout, Timer
+from .core import Core, SlotCore, LockPool, synchronized, Robot, gated, Timeout, Timer
 from .dequeue import DEQueue
 from .task_queue import TaskQueue, Task, schedule_task
-from .Scheduler import Scheduler
+from .Scheduler import Scheduler, register_job_function
 from .Subprocess import ShellCommand
 from .RWLock import RWLock
 from .Version import Version
 from .promise import Promise
-from .processor import Processor
+from .processor import Processor, BatchProcessor
+from .pipeline import Pipeline, PipelineController
 from .flag import Flag
 from .gate import Gate
 from .LogFile import LogFile, LogStream
 from .producer import Producer
 from .escrow import Escrow
 from .gang import Gang
+from .timer_service import TimerService, global_timer_service
+from .timer_store import HeapTimerStore, TimingWheel
+from .cron import CronExpression
+from .histogram import Histogram
+from .clock import RealClock, VirtualClock, set_clock, get_clock, now
+from .async_scheduler import AsyncScheduler, AsyncJob, run_in_thread
+from .executor import InlineExecutor, ThreadExecutor, AsyncioExecutor
+from .singleflight import SingleFlight, singleflight
+from .lock_profiler import LockProfiler, enable_lock_profiling, disable_lock_profiling, lock_profile_report
 
 __version__ = Version
 version_info = (tuple(int(x) for x in Version.split(".")) + (0,0,0))[:3]            # pad with 0s
 
 __a_ll__ = [
-    'Core',
+    'Core', 'SlotCore', 'LockPool',
     'Robot',
     'TimerThread',
     'DEQueue',
@@ -31,7 +41,11 @@ __a_ll__ = [
     'Version', '__version__', 'version_info',
     'Timeout',
     'Promise',
-    'Scheduler',
+    'Scheduler', 'register_job_function',
+    'Processor', 'BatchProcessor', 'Pipeline', 'PipelineController',
     'Gate', 'LogFile', 'LogStream',
-    'Escrow', 'Producer', 'Gang'
+    'Escrow', 'Producer', 'Gang',
+    'TimerService', 'global_timer_service', 'HeapTimerStore', 'TimingWheel', 'CronExpression', 'Histogram', 'RealClock', 'VirtualClock', 'set_clock', 'get_clock', 'now', 'AsyncScheduler', 'AsyncJob', 'run_in_thread', 'InlineExecutor', 'ThreadExecutor', 'AsyncioExecutor',
+    'SingleFlight', 'singleflight',
+    'LockProfiler', 'enable_lock_profiling', 'disable_lock_profiling', 'lock_profile_report'
 ]
@@ -0,0 +1,256 @@
+from .timer_store import HeapTimerStore
+from .clock import get_clock, monotonic as _monotonic, to_monotonic
+import asyncio, functools, inspect, uuid, random, sys, traceback
+
+def run_in_thread(fcn, executor=None):
+    """Wraps a regular (blocking) function into a coroutine function, which runs it in a thread pool. Can be used to add sync jobs
+    to AsyncScheduler:
+
+    .. code-block:: python
+
+        scheduler.add(run_in_thread(blocking_probe), host, interval=5)
+
+    Args:
+        fcn (callable): function to wrap
+        executor (concurrent.futures.Executor): executor to run the function. Default: the event loop default executor
+
+    Returns:
+        coroutine function
+    """
+    @functools.wraps(fcn)
+    async def wrapper(*params, **args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fcn, *params, **args))
+    return wrapper
+
+class AsyncJob(object):
+
+    def __init__(self, scheduler, id, t, interval, jitter, fcn, count, params, args):
+        self.F = fcn
+        self.Params = params or ()
+        self.Args = args or {}
+        self.ID = id
+        self.Interval = interval
+        self.Jitter = jitter or 0.0
+        self.NextT = t                  # monotonic time
+        self.Scheduler = scheduler
+        self.Count = count
+        self.Entry = None               # timeline handle while the job is scheduled
+        self.Cancelled = False
+
+    def __str__(self):
+        return f"AsyncJob({self.ID})"
+
+    __repr__ = __str__
+
+    async def run(self):
+        start = _monotonic()
+        exc_info = None
+        try:
+            next_t = self.F(*self.Params, **self.Args)
+            if inspect.isawaitable(next_t):
+                next_t = await next_t
+        except Exception:
+            exc_info = sys.exc_info()
+            next_t = None
+        if self.Count is not None:
+            self.Count -= 1
+            if self.Count <= 0:
+                return None, exc_info
+        if next_t == "stop":
+            next_t = None
+        elif next_t is None and self.Interval is not None:
+            next_t = start + self.Interval + random.random() * self.Jitter
+        elif next_t is not None and next_t < 3.0e7:
+            # if next_t is < 1980, it's relative time
+            next_t = next_t + start + random.random() * self.Jitter
+        elif next_t is not None:
+            next_t = to_monotonic(next_t)
+        return next_t, exc_info
+
+    def cancel(self):
+        """Cancels the job. If the job is currently running, it will not be stopped, but if it's a repeating job, calling this
+        method will prevent the job from running again.
+        """
+        self.Cancelled = True
+        if self.Scheduler is not None:
+            self.Scheduler.remove(self)
+        self.Scheduler = None
+
+class AsyncScheduler(object):
+
+    def __init__(self, max_concurrent=100, delegate=None, name=None, timer_store=None):
+        """Asyncio version of the Scheduler. Jobs are coroutine functions or regular functions, which run in the event loop thread.
+        Use ``run_in_thread`` to run blocking jobs in a thread pool.
+
+        The job function return value has the same meaning as for the Scheduler: "stop" - do not run the job again, a number - time
+        of the next run, absolute or relative, None - run again after the job interval, if any.
+
+        AsyncScheduler methods must be called from the event loop thread. The Scheduler uses the clock installed with ``set_clock``,
+        so it can run on a VirtualClock.
+
+        Args:
+            max_concurrent (int): maximum number of concurrently running jobs. Default: 100
+            delegate (object): an object to notify when a job ends or fails: ``jobEnded(scheduler, job_id)``,
+                ``jobFailed(scheduler, job_id, exc_type, exc_value, tb)``
+            name (str): name of the Scheduler
+            timer_store (object): timer store to keep the scheduled jobs in. Default: new HeapTimerStore
+        """
+        self.Name = name or "AsyncScheduler"
+        self.MaxConcurrent = max_concurrent
+        self.Delegate = delegate
+        self.Timeline = timer_store if timer_store is not None else HeapTimerStore()
+        self.Jobs = {}              # job id -> scheduled job
+        self.Running = set()        # asyncio tasks running jobs
+        self.Semaphore = None
+        self.WakeUp = None
+        self.Task = None
+        self.Stop = False
+        self.Idle = asyncio.Event()     # set when there are no scheduled or running jobs
+        self.Idle.set()
+
+    def __str__(self):
+        return f"AsyncScheduler({self.Name})"
+
+    def start(self):
+        """Starts the Scheduler as a task in the running event loop
+
+        Returns:
+            asyncio.Task: the Scheduler task
+        """
+        if self.Task is None:
+            self.Task = asyncio.get_running_loop().create_task(self.run())
+        return self.Task
+
+    def stop(self):
+        """Stops the Scheduler. Jobs already running are not cancelled.
+        """
+        self.Stop = True
+        if self.WakeUp is not None:
+            self.WakeUp.set()
+
+    def add_job(self, job, t):
+        old = self.Jobs.get(job.ID)
+        if old is not None and old is not job:
+            old.cancel()
+        job.NextT = t
+        job.Scheduler = self
+        job.Entry = self.Timeline.push(t, job)
+        self.Jobs[job.ID] = job
+        self.Idle.clear()
+        if self.WakeUp is not None:
+            self.WakeUp.set()
+        return job
+
+    def add(self, fcn, *params, interval=None, t=None, id=None, jitter=0.0, count=None, **args):
+        """Adds a new job to the schedule.
+
+        Args:
+            fcn (callable): coroutine function or regular function to call when the job starts
+            params: positional arguments to pass to ``fcn``
+            args: keyword arguments to to pass to ``fcn``
+            interval (numeric): interval to repeat the job. Default: None (do not repeat)
+            count (int): if ``interval`` is specified, specifies how many times to repeat the job. Default: unlimited
+            t (numeric): time when to run the job first time, absolute or relative to current time if less than 3e8.
+                Default: current time plus ``interval``
+            jitter (numeric): random delay up to ``jitter`` seconds added to the run times
+            id (str): id to assign to the job. If None, the id will be generated automatically. If a job with the same id is already
+                scheduled, it will be replaced
+
+        Returns:
+            AsyncJob: job object
+        """
+        if id is None:
+            id = uuid.uuid4().hex[:8]
+            while id in self.Jobs:
+                id = uuid.uuid4().hex[:8]
+        if t is None:
+            t = _monotonic() + (interval or 0.0) + random.random()*jitter
+        elif t < 10*365*24*3600:
+            t = _monotonic() + t
+        else:
+            t = to_monotonic(t)
+        job = AsyncJob(self, id, t, interval, jitter, fcn, count, params, args)
+        return self.add_job(job, t)
+
+    def remove(self, job_or_id):
+        """Removes the job from the schedule. Will not stop the job if it is already running.
+
+        Args:
+            job_or_id: Either the AsyncJob object returned by the ``add`` method, or job id (str)
+        """
+        job_id = job_or_id if isinstance(job_or_id, str) else job_or_id.ID
+        job = self.Jobs.pop(job_id, None)
+        if job is not None and job.Entry is not None:
+            self.Timeline.cancel(job.Entry)
+            job.Entry = None
+        self._check_idle()
+
+    def _check_idle(self):
+        if not self.Jobs and not self.Running:
+            self.Idle.set()
+
+    def jobs(self):
+        return sorted(self.Jobs.values(), key=lambda j: j.NextT)
+
+    def is_empty(self):
+        """Returns True if there are no pending jobs on the schedule. Note that if a repeating job is currently running, it will not
+        be on the schedule until it completes or fails.
+        """
+        return not self.Jobs
+
+    def call_delegate(self, cb, *params):
+        if self.Delegate is not None and hasattr(self.Delegate, cb):
+            try:    getattr(self.Delegate, cb)(self, *params)
+            except: pass
+
+    async def _run_job(self, job):
+        async with self.Semaphore:
+            next_t, exc_info = await job.run()
+        if exc_info:
+            self.call_delegate("jobFailed", job.ID, *exc_info)
+        else:
+            self.call_delegate("jobEnded", job.ID)
+        if next_t is not None and not job.Cancelled:
+            self.add_job(job, next_t)
+
+    def _task_done(self, task):
+        self.Running.discard(task)
+        self._check_idle()
+        if not task.cancelled() and task.exception() is not None:
+            traceback.print_exception(task.exception(), file=sys.stderr)
+
+    async def run(self):
+        """Runs the Scheduler in the current task until ``stop()`` is called
+        """
+        loop = asyncio.get_running_loop()
+        clock = get_clock()
+        self.Semaphore = asyncio.Semaphore(self.MaxConcurrent) if self.MaxConcurrent else _NoLimit()
+        self.WakeUp = asyncio.Event()
+        while not self.Stop:
+            self.WakeUp.clear()
+            for job in self.Timeline.pop_due(_monotonic()):
+                job.Entry = None
+                del self.Jobs[job.ID]
+                task = loop.create_task(self._run_job(job))
+                self.Running.add(task)
+                task.add_done_callback(self._task_done)
+            next_t = self.Timeline.next_time()
+            timeout = None if next_t is None else max(0.0, next_t - _monotonic())
+            await clock.wait_async(self.WakeUp, timeout)
+
+    async def wait_until_empty(self):
+        """Waits until the schedule is empty and no jobs are running
+        """
+        while self.Jobs or self.Running:
+            await self.Idle.wait()
+
+    join = wait_until_empty
+
+class _NoLimit(object):
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *params):
+        return False
@@ -0,0 +1,329 @@
+import threading, heapq, time, asyncio
+
+#
+# robotz primitives read the current time with clock.now() and clock.monotonic() and block with timeouts through the current
+# clock, so that the clock can be replaced, e.g. with a VirtualClock for testing. Deadlines and intervals are calculated with
+# the monotonic time, which is not affected by system clock adjustments. Absolute times given by the user are converted to
+# the monotonic time once, when they are submitted. A clock has the following interface:
+#
+#   t = clock.time()                        - current time, seconds since the Epoch
+#   t = clock.monotonic()                   - current monotonic time
+#   clock.sleep(dt)                         - blocks the calling thread for dt seconds
+#   notified = clock.wait(condition, timeout)
+#                                           - same as condition.wait(timeout), must be called while the condition is locked
+#   set = await clock.wait_async(event, timeout)
+#                                           - waits for the asyncio.Event with time-out, returns whether the event is set
+#   clock.notify(condition, n), clock.notify_all(condition)
+#                                           - same as condition.notify(n) and condition.notify_all()
+#   clock.starting(thread)                  - called before a Robot thread starts
+#
+
+class RealClock(object):
+    """The default clock using the system time
+    """
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, dt):
+        time.sleep(dt)
+
+    def wait(self, condition, timeout=None):
+        return condition.wait(timeout)
+
+    def notify(self, condition, n=1):
+        condition.notify(n)
+
+    def notify_all(self, condition):
+        condition.notify_all()
+
+    def starting(self, thread):
+        pass
+
+    async def wait_async(self, event, timeout=None):
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return event.is_set()
+
+class _AsyncTimeOut(object):
+
+    # stands for the Condition in the VirtualClock time-outs of asyncio waits. Notified by the clock driver thread
+
+    def __init__(self, loop, future):
+        self.Loop = loop
+        self.Future = future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *params):
+        return False
+
+    def notify_all(self):
+        try:    self.Loop.call_soon_threadsafe(self._expire)
+        except RuntimeError:
+            pass            # the loop is closed
+
+    def _expire(self):
+        if not self.Future.done():
+            self.Future.set_result(None)
+
+class VirtualClock(object):
+
+    def __init__(self, t=None, settle=0.001):
+        """Virtual clock for simulations and tests. Virtual time stands still while any thread using the clock is running and
+        jumps to the nearest time-out when all of them are blocked, so that simulating hours of scheduling takes seconds.
+
+        Threads are considered to be using the clock once they block in ``wait`` or ``sleep``, which is how all robotz primitives
+        block, or, for Robot threads, once they are started, until they exit. A thread is considered running as soon as it is
+        notified through ``notify`` or ``notify_all``, which is how robotz primitives wake each other up. A thread blocked on something else, e.g. ``time.sleep`` or ``threading.Event``, is considered
+        running, and a thread, which has never blocked through the clock, is not taken into account. Asyncio code waiting with
+        time-outs through ``wait_async``, e.g. AsyncScheduler, does not block a thread, so the event loop thread is not taken
+        into account either.
+
+        Args:
+            t (numeric): initial time. Default: current time
+            settle (numeric): real time in seconds all the threads must stay blocked before the clock advances. It gives
+                threads, which were just notified, a chance to wake up. Default: 0.001
+        """
+        self.T = time.time() if t is None else t
+        self.Settle = settle
+        self.Lock = threading.Lock()
+        self.Changed = threading.Condition(self.Lock)
+        self.TimeOuts = []          # heap of [deadline, seq, condition, thread], entries of returned waits have condition = None,
+                                    # thread is False for asyncio waits, which do not block threads
+        self.Seq = 0
+        self.Threads = set()        # threads, which have blocked on the clock or are Robots
+        self.Waiters = {}           # condition -> [[notified], ...] threads blocked on the condition in the order they started waiting
+        self.NWaiting = 0           # threads blocked on the clock and not notified yet
+        self.Generation = 0         # incremented every time a thread blocks or wakes up
+        self.Driver = None
+
+    def __str__(self):
+        return "VirtualClock(%s)" % (self.T,)
+
+    def time(self):
+        return self.T
+
+    def monotonic(self):
+        return self.T
+
+    def advance(self, dt):
+        """Moves the clock forward explicitly. Threads, whose time-outs expire, are woken up.
+
+        Args:
+            dt (numeric): time in seconds to move the clock by
+        """
+        with self.Lock:
+            self.T += dt
+            due = self._pop_due()
+        self._notify(due)
+
+    def sleep(self, dt):
+        condition = threading.Condition()
+        with condition:
+            deadline = self.T + dt
+            while self.T < deadline:
+                self.wait(condition, deadline - self.T)
+
+    def wait(self, condition, timeout=None):
+        if timeout is not None and timeout <= 0:
+            return False
+        thread = threading.current_thread()
+        entry = None
+        waiter = [False]            # [notified]
+        with self.Lock:
+            self.Threads.add(thread)
+            deadline = None
+            if timeout is not None:
+                deadline = self.T + timeout
+                self.Seq += 1
+                entry = [deadline, self.Seq, condition, True]
+                heapq.heappush(self.TimeOuts, entry)
+            self.Waiters.setdefault(condition, []).append(waiter)
+            self.NWaiting += 1
+            self._changed()
+        # the condition is locked, so the driver can not notify it before we start waiting
+        condition.wait()
+        with self.Lock:
+            if not waiter[0]:
+                # notified directly, not through the clock
+                self.NWaiting -= 1
+            waiters = self.Waiters[condition]
+            waiters.remove(waiter)
+            if not waiters:
+                del self.Waiters[condition]
+            if entry is not None:
+                entry[2] = None
+            self.Generation += 1
+        return deadline is None or self.T < deadline
+
+    def notify(self, condition, n=1):
+        with self.Lock:
+            self._wake(condition, n)
+        condition.notify(n)
+
+    def notify_all(self, condition):
+        with self.Lock:
+            self._wake(condition, None)
+        condition.notify_all()
+
+    def starting(self, thread):
+        with self.Lock:
+            self.Threads.add(thread)
+            self.Generation += 1
+
+    def _wake(self, condition, n):
+        # must be called while the clock is locked. Marks n (None - all) threads waiting on the condition as running,
+        # in the same order as Condition.notify() wakes them up
+        for waiter in self.Waiters.get(condition, ()):
+            if n is not None and n <= 0:
+                break
+            if not waiter[0]:
+                waiter[0] = True
+                self.NWaiting -= 1
+                if n is not None:
+                    n -= 1
+        self.Generation += 1
+
+    async def wait_async(self, event, timeout=None):
+        if timeout is None or event.is_set():
+            await event.wait()
+            return True
+        if timeout <= 0:
+            await asyncio.sleep(0)
+            return False
+        expired = asyncio.get_running_loop().create_future()
+        with self.Lock:
+            self.Seq += 1
+            entry = [self.T + timeout, self.Seq, _AsyncTimeOut(asyncio.get_running_loop(), expired), False]
+            heapq.heappush(self.TimeOuts, entry)
+            self._changed()
+        event_set = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait([event_set, expired], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            event_set.cancel()
+            with self.Lock:
+                entry[2] = None
+        return event.is_set()
+
+    def _changed(self):
+        # must be called while the clock is locked
+        self.Generation += 1
+        if self.Driver is None:
+            self.Driver = threading.Thread(target=self._drive, name="VirtualClock", daemon=True)
+            self.Driver.start()
+        self.Changed.notify()
+
+    def _pop_due(self):
+        # must be called while the clock is locked. Returns conditions to notify
+        due = []
+        timeouts = self.TimeOuts
+        while timeouts and (timeouts[0][2] is None or timeouts[0][0] <= self.T):
+            entry = heapq.heappop(timeouts)
+            if entry[2] is not None:
+                due.append(entry[2])
+                if entry[3]:
+                    self._wake(entry[2], None)      # the threads are running as soon as they are notified
+                entry[2] = None
+        return due
+
+    def _notify(self, due):
+        # must be called while the clock is not locked to avoid deadlocks with the threads locking the conditions
+        for condition in due:
+            with condition:
+                condition.notify_all()
+
+    def _all_blocked(self):
+        threads = self.Threads
+        for thread in list(threads):
+            if thread.ident is not None and not thread.is_alive():
+                threads.discard(thread)         # exited. Robots, which have not started yet, have no ident
+        return self.NWaiting >= len(threads)
+
+    def _drive(self):
+        idle = False
+        with self.Lock:
+            while True:
+                generation = self.Generation
+                # threads exiting do not notify the driver, so poll for them, but less often when nothing is changing
+                self.Changed.wait(0.05 if idle else self.Settle)
+                idle = False
+                if generation != self.Generation:
+                    continue
+                while self.TimeOuts and self.TimeOuts[0][2] is None:
+                    heapq.heappop(self.TimeOuts)
+                if not self.TimeOuts or not self._all_blocked():
+                    idle = True
+                    continue
+                self.T = max(self.T, self.TimeOuts[0][0])
+                due = self._pop_due()
+                self.Lock.release()
+                try:
+                    self._notify(due)
+                finally:
+                    self.Lock.acquire()
+
+_Clock = RealClock()
+
+def get_clock():
+    return _Clock
+
+def set_clock(clock):
+    """Installs the clock used by all robotz primitives. Should be called before any timers, schedulers or queues are created,
+    because time stamps taken with different clocks can not be compared.
+
+    Args:
+        clock (object): RealClock, VirtualClock or an object with the same interface. None - restore the real clock
+
+    Returns:
+        object: the previously installed clock
+    """
+    global _Clock
+    previous = _Clock
+    _Clock = clock if clock is not None else RealClock()
+    return previous
+
+def now():
+    """
+    Returns:
+        float: current time according to the installed clock
+    """
+    return _Clock.time()
+
+def monotonic():
+    """
+    Returns:
+        float: current monotonic time according to the installed clock
+    """
+    return _Clock.monotonic()
+
+def to_monotonic(t):
+    """Converts time since the Epoch to the monotonic time
+
+    Args:
+        t (numeric): time since the Epoch
+
+    Returns:
+        float: monotonic time
+    """
+    clock = _Clock
+    return t - clock.time() + clock.monotonic()
+
+def to_wall(t):
+    """Converts monotonic time to time since the Epoch
+
+    Args:
+        t (numeric): monotonic time
+
+    Returns:
+        float: time since the Epoch
+    """
+    clock = _Clock
+    return t - clock.monotonic() + clock.time()
@@ -1,6 +1,8 @@
 from threading import RLock, Thread, Event, Condition, Semaphore, currentThread, get_ident
 import time
 import sys
+from .lock_profiler import Profiler as _LockProfiler
+from .clock import monotonic as _monotonic, to_monotonic, get_clock
 
 Waiting = []
 In = []
@@ -16,8 +18,14 @@ def threadName():
     return str(t)
 
 def synchronized(method):
+    name = method.__name__
     def smethod(self, *params, **args):
-        me = get_ident()
+        if _LockProfiler.Enabled:
+            t = _LockProfiler.acquire(self, name)
+            try:
+                return method(self, *params, **args)
+            finally:
+                _LockProfiler.release(self, name, t)
         with self:
             out = method(self, *params, **args)
         return out
@@ -47,29 +55,94 @@ class UnlockContext(object):
         self.Prim = prim
         
     def __enter__(self):
+        self.Depth = _LockProfiler.suspend_hold(self.Prim) if _LockProfiler.Enabled else None
         self.Prim._Lock.__exit__(None, None, None)
         
     def __exit__(self, exc_type, exc_value, traceback):
         self.Prim._Lock.__enter__()    
+        if self.Depth is not None:
+            _LockProfiler.resume_hold(self.Prim, self.Depth)
+
+class LockPool(object):
+
+    def __init__(self, size=64, lock_class=RLock):
+        """Pool of locks to be shared by many small primitives, e.g. Promises, to avoid creating a lock object per primitive.
+        A primitive created with ``lock=pool`` uses one of the pool locks.
+
+        Note that primitives sharing a lock serialize each other's critical sections. A thread holding the lock of
+        one of them should not block waiting for another primitive, which may be using the same lock.
+
+        Args:
+            size (int): number of locks in the pool. Default: 64
+            lock_class: class of the lock objects. Default: threading.RLock
+        """
+        self.Locks = [lock_class() for _ in range(size)]
+        self.Next = 0
+
+    def lock(self, key=None):
+        """Returns one of the pool locks. If ``key`` is specified, the same lock will be returned for the same key.
+        Otherwise, the locks are returned in round-robin order.
+
+        Args:
+            key (hashable): key to select the lock by. Default: None
+        """
+        if key is None:
+            i = self.Next
+            self.Next = (i + 1) % len(self.Locks)
+        else:
+            i = hash(key) % len(self.Locks)
+        return self.Locks[i]
+
+class SlotCore(object):
+
+    __slots__ = ("_Kind", "_Lock", "_WakeUpCondition", "_GateSemaphore", "_GateValue", "_Channels", "_Hold", "Name", "Timer",
+                "__weakref__")
 
-class Core:
     def __init__(self, gate=1, lock=None, name=None):
         """
-        Initiaslizes new Core object
+        Initiaslizes new Core object. SlotCore is the ``__slots__``-based version of the Core. Its instances do not have
+        the ``__dict__`` unless a subclass adds it. The Condition and the Semaphore objects are created when they are needed first time.
         
         Args:
             gate (int): initial value for the Gate semapthore. Default = 1
-            lock (Lock or RLock): Lock or RLock for the primitive to use. Default - new RLock object
+            lock (Lock, RLock, Core or LockPool): Lock or RLock for the primitive to use. If a Core is specified, its lock will be used.
+                If a LockPool is specified, one of its locks will be used. Default - new RLock object
             name (str): Name for the primitive. Default - unnamed
         """
         self._Kind = self.__class__.__name__
-        self._Lock = lock if lock is not None else RLock()
-        #print ("Core:", self, " _Lock:", self._Lock)
-        self._WakeUp = Condition(self._Lock)
-        self._Gate = Semaphore(gate)
+        if lock is None:
+            lock = RLock()
+        elif isinstance(lock, SlotCore):
+            lock = lock._Lock
+        elif isinstance(lock, LockPool):
+            lock = lock.lock()
+        self._Lock = lock
+        self._WakeUpCondition = None
+        self._GateSemaphore = None
+        self._GateValue = gate
+        self._Channels = None       # {name: Condition}, created on first use
+        self._Hold = None           # lock profiling state, see lock_profiler.py
         self.Name = name
         self.Timer = None
         
+    @property
+    def _WakeUp(self):
+        # must be called while the primitive is locked
+        condition = self._WakeUpCondition
+        if condition is None:
+            condition = self._WakeUpCondition = Condition(self._Lock)
+        return condition
+
+    @property
+    def _Gate(self):
+        semaphore = self._GateSemaphore
+        if semaphore is None:
+            with self._Lock:
+                semaphore = self._GateSemaphore
+                if semaphore is None:
+                    semaphore = self._GateSemaphore = Semaphore(self._GateValue)
+        return semaphore
+
     def __str__(self):
         ident = ('"%s"' % (self.Name,)) if self.Name else ("@%s" % (("%x" % (id(self),))[-4:],))
         return "[%s %s]" % (self._Kind, ident)
@@ -100,11 +173,16 @@ class Core:
             with my_primitive.getLock():
                 ...
         """
+        if _LockProfiler.Enabled:
+            _LockProfiler.acquire(self)
+            return True
         return self._Lock.__enter__()
         
     def __exit__(self, exc_type, exc_value, traceback):
         """Core's context exit
         """
+        if _LockProfiler.Enabled:
+            return _LockProfiler.release(self)
         return self._Lock.__exit__(exc_type, exc_value, traceback)
 
     def can_lock(self):
@@ -131,8 +209,19 @@ class Core:
         """
         return UnlockContext(self)
 
+    def _channel(self, channel):
+        # must be called while the primitive is locked
+        if channel is None:
+            return self._WakeUp
+        if self._Channels is None:
+            self._Channels = {}
+        condition = self._Channels.get(channel)
+        if condition is None:
+            condition = self._Channels[channel] = Condition(self._Lock)
+        return condition
+
     @synchronized
-    def sleep(self, timeout = None, function=None, arguments=()):
+    def sleep(self, timeout = None, function=None, arguments=(), channel=None):
         """
         Blocks until wakep() method is called on the same primitive. The primitive will be unlocked for the duration of the sleep() call.
         Then the primitive will be locked again and if the function is provided, it will be called while the primitive is locked
@@ -140,14 +229,22 @@ class Core:
         
         Args:
             timeout (float or int): time-out. If timed-out, RuntimeError exception will be raised.
+            channel (str): name of the wake-up channel to sleep on. The thread will be woken up only by ``wakeup()`` calls
+                for the same channel or by ``wakeup()`` calls without channel. Default: the primitive's common channel
         """
-        self._WakeUp.wait(timeout)
+        condition = self._channel(channel)
+        if _LockProfiler.Enabled:
+            depth = _LockProfiler.suspend_hold(self)
+            get_clock().wait(condition, timeout)
+            _LockProfiler.resume_hold(self, depth)
+        else:
+            get_clock().wait(condition, timeout)
         if function is not None:
             result = function(*arguments)
             return result
 
     @synchronized
-    def sleep_until(self, predicate, *params, timeout = None, **args):
+    def sleep_until(self, predicate, *params, timeout = None, channel = None, **args):
         """
         Blocks until a condition is satisfied. The method will continue calling sleep() and when it wakes up, it will call the
         predicate function and check if the predicate is satisfied and if not go back to sleep. The predicate function is
@@ -165,39 +262,52 @@ class Core:
             params: positional arguments to pass to each predicate function call
             args: keyword arguments to pass to each predicate function call
             timeout (int or float): timeout. If timed-out, RuntimeError exception will be raised
+            channel (str): name of the wake-up channel to sleep on. Default: the primitive's common channel
         """
         #print("sleep", self, get_ident(), "   condition lock:", self._WakeUp._lock, "...")
-        t1 = None if timeout is None else time.time() + timeout
-        while (t1 is None or time.time() < t1):
+        t1 = None if timeout is None else _monotonic() + timeout
+        while (t1 is None or _monotonic() < t1):
             if predicate(*params, **args):
                 return
             delta = None
             if t1 is not None:
-                delta = max(0.0, t1 - time.time())
-            self.sleep(delta)
+                delta = max(0.0, t1 - _monotonic())
+            self.sleep(delta, channel=channel)
         else:
             raise Timeout()
             
     @synchronized
-    def wakeup(self, n=1, all=True, function=None, arguments=()):
+    def wakeup(self, n=1, all=True, function=None, arguments=(), channel=None):
         """Wakes up all or some thread, which is sleeping on the primitive.
         
         Args:
             n (int): number of threads to wake up. Default is 1
             all (bool): wake up all threads sleeping on the primitive. If True, ``n`` argument is ignored
+            channel (str): name of the wake-up channel. If specified, only threads sleeping on this channel will be woken up.
+                Otherwise, threads sleeping on the common channel and on all named channels will be woken up.
         """
         
         if function is not None:
             function(*arguments)
-        if all:
-            self._WakeUp.notifyAll()
+        if channel is None:
+            conditions = [self._WakeUpCondition] if self._WakeUpCondition is not None else []
+            if self._Channels:
+                conditions += list(self._Channels.values())
+        elif self._Channels is None or channel not in self._Channels:
+            return              # nobody has ever slept on this channel
         else:
-            self._WakeUp.notify(n)
+            conditions = [self._Channels[channel]]
+        clock = get_clock()
+        for condition in conditions:
+            if all:
+                clock.notify_all(condition)
+            else:
+                clock.notify(condition, n)
             
     @synchronized
     def alarm(self, *params, **args):
-        """Starts a new "alarm" Timer thread associated with the Core. A Core can have only one alarm thread associated with it.
-        If another alarm thread was already created using a previous call to alarm(), the old thread will be cancelled and
+        """Starts a new "alarm" Timer associated with the Core. A Core can have only one alarm Timer associated with it.
+        If another alarm Timer was already created using a previous call to alarm(), the old Timer will be cancelled and
         deleted.
         
         Args:
@@ -210,13 +320,20 @@ class Core:
     @synchronized
     def cancel_alarm(self):
         """
-        Cancels the alarm thread associated with the Core, if any. 
+        Cancels the alarm Timer associated with the Core, if any. 
         """
         
         if self.Timer is not None:
             self.Timer.cancel()
             self.Timer = None
 
+class Core(SlotCore):
+    """
+    Base class for all robotz primitives. Core combines the functionality of a lock, a condition and a semaphore.
+    Unlike SlotCore, Core subclasses can have arbitrary attributes.
+    """
+    pass
+
 class Robot(Thread, Core):
     def __init__(self, *params, name=None, **args):
         """Initializes a new Robot object. Robot is a subclass of both threading.Thread and Core, so it combines features of both.
@@ -229,15 +346,22 @@ class Robot(Thread, Core):
         Thread.__init__(self, *params, **args)
         Core.__init__(self, name=name)
         self.Stop = False
+
+    def start(self):
+        get_clock().starting(self)
+        Thread.start(self)
         
     def stop(self):
         self.Stop = True
 
-class Timer(Robot):
+class Timer(Core):
     
-    def __init__(self, fcn, *params, t=None, interval=None, start=True, name=None, daemon=True, onexception=None, **args):
-        """Initializes new Timer thread. robotz's Timer is similar in functionality with threading.Timer, but it has additional
+    def __init__(self, fcn, *params, t=None, interval=None, start=True, name=None, daemon=True, onexception=None, service=None, **args):
+        """Initializes new Timer. robotz's Timer is similar in functionality with threading.Timer, but it has additional
         functionality. In particular robotz's Timer can run as a periodic timer, firing at specified frequency until it is cancelled.
+
+        Timers do not have their own threads. All timers are kept by the process-wide TimerService, which uses single thread
+        to wait for them and fires them on its executor threads.
         
         Args:
             fcn (function): function to call every time the Timer fires
@@ -246,18 +370,19 @@ class Timer(Robot):
             t (numeric): specifies the time when to fire the Timer first time. ``t`` can be either absolute timestamp - time in seconds since the
                 Epoch or relative to current time. If ``t`` is less than 3e8 (~10 years), then it is interpreted as relative to current time.
                 Default: current time plus ``interval``
-            start (bool): to start the Timer thread immediately. Otherwise, the Timer thread will be created but not run until started explicitly
+            start (bool): to start the Timer immediately. Otherwise, the Timer will be created but not armed until started explicitly
                 using ``start()`` method. Default: start immediately
-            daemon (bool): whether the Timer thread should be a daemon thread. Default: True
+            daemon (bool): ignored, retained for backward compatibility
             onexception (function): a callback to call if ``fcn`` raies an exception. The callback will be called with 3 arguments:
                 exception type, exception value and the traceback, similar to what sys.exc_info() returns. Default: ignore any exceptions raised by ``fcn``
+            service (TimerService): timer service to use, e.g. one with TimingWheel timer store. Default: the process-wide TimerService
         """
         
-        Robot.__init__(self, name=name, daemon=daemon)
+        Core.__init__(self, name=name)
         if t is None:
-            self.T = time.time() + interval
+            self.T = _monotonic() + interval
         else:
-            self.T = t if t > 3e8 else time.time() + t
+            self.T = to_monotonic(t) if t > 3e8 else _monotonic() + t
         self.Fcn = fcn
         self.OnException = onexception
         self.Params = params
@@ -265,50 +390,102 @@ class Timer(Robot):
         self.Interval = interval
         self.Cancelled = False
         self.Paused = False
+        self.Started = False
+        self.Done = False
+        self.Pending = False            # became due while paused
+        self.Entry = None               # TimerService handle
+        self.Service = service
         if start:
             self.start()
 
-    def run(self):
-        try:
-            again = True
-            while again and not self.Cancelled:
-                again = False
-                now = time.time()
-                if now < self.T:
-                    self.sleep(self.T - now)
-                while self.Paused and not self.Cancelled:
-                    self.sleep(100)
-                if not self.Cancelled:
-                    try:    self.Fcn(*self.Params, **self.Args)
-                    except:
-                        if self.OnException is not None:
-                            try:
-                                self.OnException(*sys.exc_info())
-                            except:
-                                pass
-                    if not self.Cancelled and self.Interval:
-                        self.T = time.time() + self.Interval
-                        again = True
-        finally:
-            # to break any circular links
-            self.Fcn = self.Args = self.Params = None
+    @synchronized
+    def start(self):
+        """Arms the Timer. A Timer can be started only once.
+        """
+        if self.Started:
+            raise RuntimeError("Timer can only be started once")
+        from .timer_service import global_timer_service
+        self.Started = True
+        if self.Service is None:
+            self.Service = global_timer_service()
+        if not self.Cancelled:
+            self.Entry = self.Service.schedule(self.T, self)
+
+    @synchronized
+    def _due(self):
+        # called by the TimerService
+        self.Entry = None
+        if self.Cancelled:
+            return
+        if self.Paused:
+            self.Pending = True
+        else:
+            self.Service.submit(self._fire)
+
+    def _fire(self):
+        # called on a TimerService executor thread
+        fcn, params, args = self.Fcn, self.Params, self.Args
+        if self.Cancelled or fcn is None:
+            return
+        try:    fcn(*params, **args)
+        except:
+            if self.OnException is not None:
+                try:
+                    self.OnException(*sys.exc_info())
+                except:
+                    pass
+        with self:
+            if not self.Cancelled and self.Interval:
+                self.T = _monotonic() + self.Interval
+                self.Entry = self.Service.schedule(self.T, self)
+            else:
+                self._finish()
+
+    def _finish(self):
+        # must be called while the Timer is locked
+        self.Done = True
+        # to break any circular links
+        self.Fcn = self.Args = self.Params = None
+        self.wakeup()
 
+    @synchronized
     def cancel(self):
-        """Cancels the Timer thread
+        """Cancels the Timer
         """
-        self.Cancelled = True
-        self.wakeup()
+        if not self.Cancelled:
+            self.Cancelled = True
+            if self.Entry is not None:
+                self.Service.unschedule(self.Entry)
+                self.Entry = None
+            self._finish()
 
     def pause(self):
-        """Pauses the Timer thread. In fact the thread will continue running, but it will not fire intil ``resume`` method is called
+        """Pauses the Timer. The Timer will remain armed, but it will not fire intil ``resume`` method is called
         """
         self.Paused = True
 
+    @synchronized
     def resume(self):
-        """Resumes the timer firing. Next time the timer will not necessarily fire immediately when resumed, but it will fire at the next
-        end of the firing interval.
+        """Resumes the timer firing. If the Timer became due while it was paused, it will fire immediately. Otherwise, it will fire
+        at the next end of the firing interval.
         """
         self.Paused = False
-        self.wakeup()
+        if self.Pending and not self.Cancelled:
+            self.Pending = False
+            self.Service.submit(self._fire)
 
+    def is_alive(self):
+        """
+        Returns:
+            boolean: True if the Timer was started and has not finished or been cancelled yet
+        """
+        return self.Started and not self.Done
+
+    @synchronized
+    def join(self, timeout=None):
+        """Blocks until the Timer fires for the last time or is cancelled.
 
+        Args:
+            timeout (numeric): time-out in seconds. If timed-out, Timeout exception will be raised
+        """
+        self.sleep_until(lambda: self.Done, timeout=timeout)
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+from bisect import bisect_left
+from .clock import now as _now
+import calendar
+
+_Months = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_Weekdays = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+_Aliases = {
+    "@yearly":      "0 0 1 1 *",
+    "@annually":    "0 0 1 1 *",
+    "@monthly":     "0 0 1 * *",
+    "@weekly":      "0 0 * * 0",
+    "@daily":       "0 0 * * *",
+    "@midnight":    "0 0 * * *",
+    "@hourly":      "0 * * * *"
+}
+
+def _parse_value(text, names):
+    text = text.lower()
+    if text in names:
+        return names[text]
+    return int(text)
+
+def _parse_field(text, low, high, names={}):
+    # returns sorted list of values and whether the field is "*"
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError("Invalid step in cron field: %s" % (text,))
+        if part == "*":
+            first, last = low, high
+        elif "-" in part:
+            first, last = part.split("-", 1)
+            first, last = _parse_value(first, names), _parse_value(last, names)
+        else:
+            first = last = _parse_value(part, names)
+            if step != 1:
+                last = high
+        if not (low <= first <= high and low <= last <= high) or first > last:
+            raise ValueError("Cron field value out of range %d-%d: %s" % (low, high, text))
+        values.update(range(first, last + 1, step))
+    return sorted(values), text == "*"
+
+class CronExpression(object):
+
+    def __init__(self, expression):
+        """Parses standard 5-field cron expression: "minute hour day-of-month month day-of-week".
+
+        Fields can be "*", numbers, ranges "a-b", steps "*/n" or "a-b/n" and comma-separated lists of those. Months and days of week
+        can be specified by their 3-letter names. Day of week 0 and 7 are Sunday. Aliases @yearly, @monthly, @weekly, @daily and @hourly
+        are supported too.
+
+        As in cron, if both day of month and day of week are restricted, the expression matches a day if either of them matches.
+
+        Args:
+            expression (str): cron expression
+        """
+        self.Expression = expression
+        fields = _Aliases.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError("Cron expression must have 5 fields: %s" % (expression,))
+        self.Minutes, _ = _parse_field(fields[0], 0, 59)
+        self.Hours, _ = _parse_field(fields[1], 0, 23)
+        self.Days, any_day = _parse_field(fields[2], 1, 31)
+        self.Months, _ = _parse_field(fields[3], 1, 12, _Months)
+        weekdays, any_weekday = _parse_field(fields[4], 0, 7, _Weekdays)
+        self.Weekdays = set(d % 7 for d in weekdays)        # 0 = Sunday
+        self.DaySet = set(self.Days)
+        if any_day and any_weekday:
+            self.DayMode = "any"
+        elif any_day:
+            self.DayMode = "weekday"
+        elif any_weekday:
+            self.DayMode = "day"
+        else:
+            self.DayMode = "either"
+
+    def __str__(self):
+        return "CronExpression(%s)" % (self.Expression,)
+
+    __repr__ = __str__
+
+    def _day_matches(self, year, month, day):
+        mode = self.DayMode
+        if mode == "any":
+            return True
+        weekday = (calendar.weekday(year, month, day) + 1) % 7       # calendar: 0 = Monday
+        if mode == "day":
+            return day in self.DaySet
+        elif mode == "weekday":
+            return weekday in self.Weekdays
+        else:
+            return day in self.DaySet or weekday in self.Weekdays
+
+    def _next(self, year, month, day, hour, minute):
+        # returns the first matching (year, month, day, hour, minute) at or after the given one
+        months, hours, minutes = self.Months, self.Hours, self.Minutes
+        last_year = year + 30                   # e.g. "0 0 29 2 *" may not match for 8 years
+        while year <= last_year:
+            if month not in months:
+                i = bisect_left(months, month)
+                if i == len(months):
+                    year, month, day, hour, minute = year + 1, months[0], 1, 0, 0
+                else:
+                    month, day, hour, minute = months[i], 1, 0, 0
+                continue
+            if day > calendar.monthrange(year, month)[1]:
+                year, month, day, hour, minute = (year + 1, 1, 1, 0, 0) if month == 12 else (year, month + 1, 1, 0, 0)
+                continue
+            if not self._day_matches(year, month, day):
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if hour not in hours:
+                i = bisect_left(hours, hour)
+                if i == len(hours):
+                    day, hour, minute = day + 1, 0, 0
+                else:
+                    hour, minute = hours[i], 0
+                continue
+            i = bisect_left(minutes, minute)
+            if i == len(minutes):
+                hour, minute = hour + 1, 0
+                if hour > 23:
+                    day, hour = day + 1, 0
+                continue
+            return year, month, day, hour, minutes[i]
+        raise ValueError("Cron expression does not match any time: %s" % (self.Expression,))
+
+    def next_after(self, t=None, tz=None):
+        """Calculates the next time matching the expression
+
+        Args:
+            t (numeric or datetime): time to start from. Default: now
+            tz (tzinfo): time zone to interpret the expression in, e.g. ``zoneinfo.ZoneInfo("America/Chicago")``. Default: local time
+
+        Returns:
+            float: first time matching the expression strictly after ``t``, as a timestamp
+        """
+        return self.upcoming(1, t, tz)[0]
+
+    def upcoming(self, n, t=None, tz=None):
+        """Calculates next ``n`` times matching the expression
+
+        Args:
+            n (int): number of times to calculate
+            t (numeric or datetime): time to start from. Default: now
+            tz (tzinfo): time zone to interpret the expression in. Default: local time
+
+        Returns:
+            list of floats: times matching the expression strictly after ``t``, as timestamps
+        """
+        if t is None:
+            t = _now()
+        if isinstance(t, datetime):
+            dt = t.astimezone(tz) if tz is not None or t.tzinfo is not None else t
+        else:
+            dt = datetime.fromtimestamp(t, tz)
+        # next whole minute
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = dt.year, dt.month, dt.day, dt.hour, dt.minute
+        out = []
+        while len(out) < n:
+            year, month, day, hour, minute = self._next(year, month, day, hour, minute)
+            ts = datetime(year, month, day, hour, minute, tzinfo=tz).timestamp()
+            if not out or ts > out[-1]:
+                # wall clock times repeated when daylight saving time ends fire once
+                out.append(ts)
+            minute += 1
+            if minute > 59:
+                hour, minute = hour + 1, 0
+                if hour > 23:
+                    day, hour = day + 1, 0
+        return out
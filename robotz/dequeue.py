@@ -1,5 +1,5 @@
 from .core import Core, synchronized
-import time
+from .clock import monotonic as _monotonic
 
 class DEQueue(Core):
 
@@ -19,19 +19,26 @@ class DEQueue(Core):
         self.Closed = False
         self.wakeup()
 
+    @synchronized
+    def set_capacity(self, capacity):
+        self.Capacity = capacity
+        self.wakeup(channel="not_full")
+
     def _wait_for_room(self, timeout):
         # must be called from a synchronized method !
-        t0 = time.time()
+        t0 = _monotonic()
         t1 = None if timeout is None else t0 + timeout
         while self.Capacity is not None and len(self.List) >= self.Capacity \
                         and not self.Closed:
             dt = None
             if t1 is not None:
-                t = time.time()
+                t = _monotonic()
                 if t > t1:
+                    # this thread may have been notified just as it timed out, pass the notification on
+                    self.wakeup(all=False, channel="not_full")
                     raise RuntimeError("Operation timed-out")
                 dt = t1 - t
-            self.sleep(dt)
+            self.sleep(dt, channel="not_full")
 
     @synchronized    
     def append(self, item, timeout=None, force=False):
@@ -40,7 +47,7 @@ class DEQueue(Core):
         if self.Closed:
             raise RuntimeError("Queue is closed")
         self.List.append(item)
-        self.wakeup()
+        self.wakeup(all=False, channel="not_empty")
         
     def __lshift__(self, item):
         return self.append(item)
@@ -54,7 +61,7 @@ class DEQueue(Core):
         if self.Closed:
             raise RuntimeError("Queue is closed")
         self.List.insert(0, item)
-        self.wakeup()
+        self.wakeup(all=False, channel="not_empty")
 
     def __rrshift__(self, item):
         return self.insert(item)
@@ -62,10 +69,11 @@ class DEQueue(Core):
     @synchronized
     def pop(self, index=0, timeout=None):
         while not (self.List or self.Closed):
-            self.sleep(timeout)
+            self.sleep(timeout, channel="not_empty")
         try:    
             item = self.List.pop(index)
-            self.wakeup()       # in case someone is waiting to add an item
+            if self.Capacity is not None:
+                self.wakeup(all=False, channel="not_full")       # in case someone is waiting to add an item
         except IndexError:
             item = None         # closed
         return item
@@ -95,7 +103,7 @@ class DEQueue(Core):
     @synchronized
     def flush(self):
         self.List = []
-        self.wakeup()
+        self.wakeup(channel="not_full")
         
     @synchronized
     def items(self):
@@ -125,4 +133,4 @@ class DEQueue(Core):
         
     def remove(self, item):
         self.List.remove(item)
-        self.wakeup()
+        self.wakeup(all=False, channel="not_full")
@@ -13,12 +13,12 @@ class Escrow(Core):
         with self.GetLock:
             try:
                 self.WaitingGet = True
-                self.wakeup()                   # notify the thread, which it waiting to put
+                self.wakeup(channel="getter")   # notify the thread, which it waiting to put
                 while self.Value is None:
-                    self.sleep(timeout)         # will raise exception on timeout
+                    self.sleep(timeout, channel="value")         # will raise exception on timeout
                 value = self.Value
                 self.Value = None
-                self.wakeup()                   # tell the putter that the package was received
+                self.wakeup(channel="picked_up")    # tell the putter that the package was received
                 return value
             finally:
                 self.WaitingGet = False
@@ -28,11 +28,11 @@ class Escrow(Core):
         with self.PutLock:
             try:
                 while not self.WaitingGet:      # wait for the receiver
-                    self.sleep(timeout)
+                    self.sleep(timeout, channel="getter")
                 self.Value = value
-                self.wakeup()
+                self.wakeup(channel="value")
                 while self.Value is not None:   # wait for pickup
-                    self.sleep()
+                    self.sleep(channel="picked_up")
             finally:
                 self.Value = None               # time-out or something else
 
@@ -0,0 +1,194 @@
+from .core import Core, Robot, synchronized
+from .clock import monotonic as _monotonic
+from collections import deque
+import sys, traceback
+
+class InlineExecutor(object):
+    """
+    Executor, which calls the submitted function immediately, in the calling thread.
+    """
+
+    def submit(self, fcn, *params, **args):
+        fcn(*params, **args)
+
+    def stats(self):
+        return dict(queue_delay = 0.0, avg_queue_delay = 0.0, max_queue_delay = 0.0)
+
+    def shutdown(self):
+        pass
+
+class ThreadExecutor(Core):
+
+    class _Worker(Robot):
+
+        def __init__(self, executor):
+            Robot.__init__(self, name="%s.worker" % (executor,), daemon=True)
+            self.Executor = executor
+
+        def run(self):
+            executor = self.Executor
+            try:
+                while True:
+                    item = executor._next_item()
+                    if item is None:
+                        break
+                    fcn, params, args = item
+                    try:
+                        fcn(*params, **args)
+                    except:
+                        executor._failed()
+                        traceback.print_exc(file=sys.stderr)
+            finally:
+                self.Executor = None
+
+    def __init__(self, max_workers=None, idle_timeout=60.0, name=None):
+        """Thread pool executor. Worker threads are created on demand, up to ``max_workers``, and exit after staying
+        idle for ``idle_timeout`` seconds.
+
+        Args:
+            max_workers (int): maximum number of worker threads. Default: no limit
+            idle_timeout (numeric): time in seconds an idle worker thread waits for new work before it exits. Default: 60 seconds
+            name (str): executor name
+        """
+        Core.__init__(self, name=name)
+        self.MaxWorkers = max_workers
+        self.IdleTimeout = idle_timeout
+        self.Queue = deque()         # [(fcn, params, args, t_submitted), ...]
+        self.NWorkers = 0
+        self.NIdle = 0
+        self.Stop = False
+        self.Submitted = self.Executed = self.Failed = 0
+        self.QueueDelay = self.MaxQueueDelay = 0.0
+
+    @synchronized
+    def submit(self, fcn, *params, **args):
+        """Submits the function to be called on one of the worker threads
+
+        Args:
+            fcn (callable): function to call
+            params: positional arguments to pass to the function
+            args: keyword arguments to pass to the function
+        """
+        if self.Stop:
+            raise RuntimeError("Executor is shut down")
+        self.Queue.append((fcn, params, args, _monotonic()))
+        self.Submitted += 1
+        if len(self.Queue) > self.NIdle and (self.MaxWorkers is None or self.NWorkers < self.MaxWorkers):
+            self.NWorkers += 1
+            self._Worker(self).start()
+        else:
+            self.wakeup(all=False, channel="work")
+
+    @synchronized
+    def _next_item(self):
+        # called by a worker thread. Returns None if the worker should exit
+        t_idle = _monotonic()
+        while not self.Queue and not self.Stop:
+            timeout = None
+            if self.IdleTimeout is not None:
+                timeout = t_idle + self.IdleTimeout - _monotonic()
+                if timeout <= 0:
+                    break
+            self.NIdle += 1
+            try:
+                self.sleep(timeout, channel="work")
+            finally:
+                self.NIdle -= 1
+        if not self.Queue:
+            self.NWorkers -= 1
+            return None
+        fcn, params, args, t_submitted = self.Queue.popleft()
+        delay = _monotonic() - t_submitted
+        self.QueueDelay += delay
+        self.MaxQueueDelay = max(self.MaxQueueDelay, delay)
+        self.Executed += 1
+        return fcn, params, args
+
+    @synchronized
+    def _failed(self):
+        self.Failed += 1
+
+    @synchronized
+    def stats(self):
+        """
+        Returns:
+            dict: executor statistics: number of submitted, started and failed calls, number of queued calls, number of
+                worker threads, total, average and maximum time the calls spent in the queue
+        """
+        return dict(
+            submitted = self.Submitted,
+            executed = self.Executed,
+            failed = self.Failed,
+            queued = len(self.Queue),
+            workers = self.NWorkers,
+            idle = self.NIdle,
+            queue_delay = self.QueueDelay,
+            avg_queue_delay = self.QueueDelay/self.Executed if self.Executed else 0.0,
+            max_queue_delay = self.MaxQueueDelay
+        )
+
+    @synchronized
+    def shutdown(self):
+        """Stops the executor. Calls queued before the shutdown will still be executed.
+        """
+        self.Stop = True
+        self.wakeup(channel="work")
+
+class AsyncioExecutor(Core):
+
+    def __init__(self, loop, name=None):
+        """Executor, which calls submitted functions in the asyncio event loop thread, using ``loop.call_soon_threadsafe``.
+
+        Args:
+            loop (asyncio event loop): the event loop
+            name (str): executor name
+        """
+        Core.__init__(self, name=name)
+        self.Loop = loop
+        self.Submitted = self.Executed = self.Failed = 0
+        self.QueueDelay = self.MaxQueueDelay = 0.0
+
+    def submit(self, fcn, *params, **args):
+        """Submits the function to be called in the event loop thread
+
+        Args:
+            fcn (callable): function to call
+            params: positional arguments to pass to the function
+            args: keyword arguments to pass to the function
+        """
+        with self:
+            self.Submitted += 1
+        self.Loop.call_soon_threadsafe(self._call, fcn, params, args, _monotonic())
+
+    def _call(self, fcn, params, args, t_submitted):
+        delay = _monotonic() - t_submitted
+        with self:
+            self.Executed += 1
+            self.QueueDelay += delay
+            self.MaxQueueDelay = max(self.MaxQueueDelay, delay)
+        try:
+            fcn(*params, **args)
+        except:
+            with self:
+                self.Failed += 1
+            traceback.print_exc(file=sys.stderr)
+
+    @synchronized
+    def stats(self):
+        """
+        Returns:
+            dict: executor statistics: number of submitted, started and failed calls, total, average and maximum time
+                the calls spent waiting in the event loop queue
+        """
+        return dict(
+            submitted = self.Submitted,
+            executed = self.Executed,
+            failed = self.Failed,
+            queued = self.Submitted - self.Executed,
+            queue_delay = self.QueueDelay,
+            avg_queue_delay = self.QueueDelay/self.Executed if self.Executed else 0.0,
+            max_queue_delay = self.MaxQueueDelay
+        )
+
+    def shutdown(self):
+        pass
@@ -0,0 +1,90 @@
+from bisect import bisect_left
+
+def _default_bounds():
+    # 100 microseconds to ~100 seconds, 1-2-5 steps
+    bounds = []
+    scale = 0.0001
+    while scale < 1000.0:
+        bounds += [scale, scale*2, scale*5]
+        scale *= 10
+    return bounds
+
+DefaultBounds = _default_bounds()
+
+class Histogram(object):
+
+    __slots__ = ("Bounds", "Counts", "N", "Sum", "Min", "Max")
+
+    def __init__(self, bounds=None):
+        """Fixed bucket histogram of non-negative values, e.g. time intervals. Not thread-safe, the owner is responsible for locking.
+
+        Args:
+            bounds (list of numbers): sorted upper bounds of the buckets. Values above the last bound go to an overflow bucket.
+                Default: 1-2-5 series from 100 microseconds to 500 seconds
+        """
+        self.Bounds = bounds if bounds is not None else DefaultBounds
+        self.Counts = None          # allocated on first add, there can be many histograms, e.g. one per Scheduler job
+        self.N = 0
+        self.Sum = 0.0
+        self.Min = None
+        self.Max = None
+
+    def add(self, value):
+        if self.Counts is None:
+            self.Counts = [0] * (len(self.Bounds) + 1)
+        self.Counts[bisect_left(self.Bounds, value)] += 1
+        self.N += 1
+        self.Sum += value
+        if self.Min is None or value < self.Min:
+            self.Min = value
+        if self.Max is None or value > self.Max:
+            self.Max = value
+
+    def __len__(self):
+        return self.N
+
+    @property
+    def mean(self):
+        return self.Sum/self.N if self.N else None
+
+    def percentile(self, p):
+        """Returns approximate percentile: upper bound of the bucket, where the percentile falls, limited by the maximum value
+
+        Args:
+            p (numeric): percentile, 0-100
+        """
+        if not self.N:
+            return None
+        rank = self.N * p / 100.0
+        total = 0
+        for i, count in enumerate(self.Counts):
+            total += count
+            if total >= rank and count:
+                return min(self.Bounds[i], self.Max) if i < len(self.Bounds) else self.Max
+        return self.Max
+
+    def reset(self):
+        self.Counts = None
+        self.N = 0
+        self.Sum = 0.0
+        self.Min = self.Max = None
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: count, sum, min, max, mean, approximate p50, p90 and p99 values and the list of non-empty buckets as (upper bound, count)
+                tuples. The overflow bucket has upper bound None
+        """
+        bounds = self.Bounds
+        counts = self.Counts or []
+        return dict(
+            count = self.N,
+            sum = self.Sum,
+            min = self.Min,
+            max = self.Max,
+            mean = self.mean,
+            p50 = self.percentile(50),
+            p90 = self.percentile(90),
+            p99 = self.percentile(99),
+            buckets = [(bounds[i] if i < len(bounds) else None, n) for i, n in enumerate(counts) if n]
+        )
@@ -0,0 +1,183 @@
+import time
+from threading import Lock
+
+class LockStats(object):
+
+    def __init__(self, key):
+        self.Key = key              # (kind, name) for a Core or (kind, method) for a synchronized method
+        self.Acquired = 0
+        self.Contended = 0
+        self.WaitTime = 0.0
+        self.MaxWait = 0.0
+        self.HoldTime = 0.0
+        self.MaxHold = 0.0
+
+    def as_dict(self):
+        return dict(
+            key = self.Key,
+            acquired = self.Acquired,
+            contended = self.Contended,
+            wait_time = self.WaitTime,
+            max_wait = self.MaxWait,
+            hold_time = self.HoldTime,
+            max_hold = self.MaxHold,
+            avg_wait = self.WaitTime/self.Acquired if self.Acquired else 0.0,
+            avg_hold = self.HoldTime/self.Acquired if self.Acquired else 0.0
+        )
+
+class LockProfiler(object):
+
+    def __init__(self):
+        """
+        Collects lock contention statistics for Core objects. The profiler is off by default. When it is off, the only
+        cost added to a lock acquisition is a check of the ``Enabled`` attribute.
+
+        Statistics are collected per Core, keyed by the Core ``kind`` and ``Name``, and per ``@synchronized`` method,
+        keyed by the Core ``kind`` and the method name.
+        """
+        self.Enabled = False
+        self.Generation = 0
+        self.Lock = Lock()
+        self.Cores = {}         # (kind, name) -> LockStats
+        self.Methods = {}       # (kind, method) -> LockStats
+
+    def enable(self):
+        """Starts collecting lock statistics. The statistics collected earlier are kept. Use ``reset()`` to discard them.
+        """
+        with self.Lock:
+            self.Generation += 1
+            self.Enabled = True
+
+    def disable(self):
+        """Stops collecting lock statistics. The statistics collected so far are kept.
+        """
+        self.Enabled = False
+
+    def reset(self):
+        """Discards all collected statistics
+        """
+        with self.Lock:
+            self.Cores = {}
+            self.Methods = {}
+
+    def __stats(self, table, key):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = LockStats(key)
+        return stats
+
+    def acquire(self, core, method=None):
+        # acquires the Core's lock measuring the wait time. Returns the time the lock was acquired.
+        lock = core._Lock
+        contended = False
+        t0 = time.perf_counter()
+        if not lock.acquire(False):
+            contended = True
+            lock.acquire()
+        t1 = time.perf_counter()
+        wait = t1 - t0
+        kind = core.kind
+        with self.Lock:
+            for stats in (self.__stats(self.Cores, (kind, core.Name)),
+                            self.__stats(self.Methods, (kind, method)) if method is not None else None):
+                if stats is not None:
+                    stats.Acquired += 1
+                    if contended:
+                        stats.Contended += 1
+                        stats.WaitTime += wait
+                        stats.MaxWait = max(stats.MaxWait, wait)
+        hold = core._Hold
+        if hold is None or hold[2] != self.Generation:
+            # the Core was not profiled since the profiler was enabled, its hold depth may be stale
+            hold = core._Hold = [0, None, self.Generation]      # [depth, start time, generation]
+        if hold[0] == 0:
+            hold[1] = t1
+        hold[0] += 1
+        return t1
+
+    def release(self, core, method=None, t_acquired=None):
+        # records the hold time and releases the Core's lock
+        hold = core._Hold
+        if hold is not None and hold[2] == self.Generation and hold[0] > 0:
+            hold[0] -= 1
+            t = time.perf_counter()
+            outermost = hold[0] == 0
+            with self.Lock:
+                if outermost and hold[1] is not None:
+                    held = t - hold[1]
+                    stats = self.__stats(self.Cores, (core.kind, core.Name))
+                    stats.HoldTime += held
+                    stats.MaxHold = max(stats.MaxHold, held)
+                if method is not None and t_acquired is not None:
+                    held = t - t_acquired
+                    stats = self.__stats(self.Methods, (core.kind, method))
+                    stats.HoldTime += held
+                    stats.MaxHold = max(stats.MaxHold, held)
+        core._Lock.release()
+
+    def suspend_hold(self, core):
+        # called before the Core's lock is released by a Condition wait. Returns the saved hold depth. While the thread waits,
+        # the depth is 0, so that other threads acquiring the lock record their own holds
+        hold = core._Hold
+        if hold is None or hold[2] != self.Generation:
+            return 0
+        depth = hold[0]
+        if depth > 0 and hold[1] is not None:
+            held = time.perf_counter() - hold[1]
+            with self.Lock:
+                stats = self.__stats(self.Cores, (core.kind, core.Name))
+                stats.HoldTime += held
+                stats.MaxHold = max(stats.MaxHold, held)
+        hold[0] = 0
+        hold[1] = None
+        return depth
+
+    def resume_hold(self, core, depth):
+        # called after the Condition wait re-acquired the Core's lock
+        hold = core._Hold
+        if hold is not None and hold[2] == self.Generation:
+            hold[0] = depth
+            hold[1] = time.perf_counter()
+
+    def report(self, top=None, sort_by="wait_time", methods=False):
+        """Returns lock statistics sorted from the hottest lock down
+
+        Args:
+            top (int): number of entries to return. Default: all
+            sort_by (str): statistics attribute to sort by: "wait_time", "contended", "hold_time", "max_wait", "max_hold", "acquired",
+                "avg_wait" or "avg_hold". Default: "wait_time"
+            methods (bool): report per synchronized method statistics instead of per Core statistics. Default: False
+
+        Returns:
+            list of dicts: each dict has the following items: key, acquired, contended, wait_time, max_wait, hold_time, max_hold, avg_wait, avg_hold.
+                The key is (kind, name) tuple for Cores and (kind, method name) tuple for synchronized methods.
+        """
+        with self.Lock:
+            table = self.Methods if methods else self.Cores
+            out = [s.as_dict() for s in table.values()]
+        out.sort(key=lambda d: -d[sort_by])
+        if top is not None:
+            out = out[:top]
+        return out
+
+    def format_report(self, top=20, sort_by="wait_time", methods=False):
+        """Returns the lock statistics report as printable text. See ``report()`` for arguments.
+        """
+        lines = ["%-50s %10s %10s %12s %12s %12s %12s" % ("lock", "acquired", "contended", "wait_time", "max_wait", "hold_time", "max_hold")]
+        for d in self.report(top=top, sort_by=sort_by, methods=methods):
+            kind, name = d["key"]
+            label = "%s %s" % (kind, name if name is not None else "")
+            lines.append("%-50s %10d %10d %12.6f %12.6f %12.6f %12.6f" % (label[:50], d["acquired"], d["contended"],
+                    d["wait_time"], d["max_wait"], d["hold_time"], d["max_hold"]))
+        return "\n".join(lines)
+
+Profiler = LockProfiler()
+
+def enable_lock_profiling():
+    Profiler.enable()
+
+def disable_lock_profiling():
+    Profiler.disable()
+
+def lock_profile_report(top=None, sort_by="wait_time", methods=False):
+    return Profiler.report(top=top, sort_by=sort_by, methods=methods)
@@ -0,0 +1,364 @@
+from .core import Core, Robot, synchronized
+from .dequeue import DEQueue
+from .clock import monotonic as _monotonic, now as _now
+from collections import deque
+
+class _Pump(Robot):
+
+    def __init__(self, queue, stage, name=None):
+        Robot.__init__(self, name=name, daemon=True)
+        self.Queue = queue
+        self.Stage = stage
+
+    def run(self):
+        for item in self.Queue:         # ends when the queue is closed and empty
+            self.Stage.put(item, timeout=None)
+        self.Stage.close()
+
+class Pipeline(Core):
+
+    def __init__(self, *stages, capacity=10, name=None):
+        """Chain of Processors connected with bounded queues. Results of each stage are sent to the input queue of the next stage,
+        from which a pump thread passes them to the next stage as soon as it has a free worker. If a stage is slower than the previous
+        one, its input queue fills up and then the workers of the previous stage block, so the backpressure propagates back to ``put``.
+        The queue depths and the stage statistics show which stage is the bottleneck.
+
+        Pipelines are usually built with the ``|`` operator:
+
+        .. code-block:: python
+
+            pipeline = Parser(4) | Enricher(16) | Writer(2)
+            for x in inputs:
+                pipeline.put(x)
+            pipeline.close()
+            for y in pipeline:
+                ...
+
+        Stages with limited number of workers and without their own queue capacity accept new items only when they have a free worker,
+        the items wait in the stage input queue instead. For that, the pipeline sets the stage queue capacity to the number of its
+        workers. Stage outputs are replaced with the queues between the stages. Closing the pipeline closes the first stage. When a stage finishes processing all its items,
+        the end of the stream is passed to the next stage and, after the last stage, to the pipeline output.
+
+        Args:
+            stages: Processor objects
+            capacity (int): capacity of the queues between the stages. Default: 10
+            name (str): name of the pipeline
+        """
+        Core.__init__(self, name=name)
+        self.Capacity = capacity
+        self.Stages = []
+        self.Queues = []            # input queues of the stages, None for the first stage
+        self.Pumps = []
+        self.Tied = []              # whether the stage task queue capacity follows the number of workers
+        self.StartT = _monotonic()
+        for stage in stages:
+            self.append(stage)
+
+    @synchronized
+    def append(self, stage):
+        """Adds the Processor to the end of the pipeline. Stages should be added before any items are put into the pipeline.
+        Pipelines can not be added to a pipeline, add their stages instead.
+
+        Returns:
+            Pipeline: the pipeline itself
+        """
+        queue = pump = None
+        tied = self._admit(stage)
+        if self.Stages:
+            queue, pump = self._connect(self.Stages[-1], stage)
+        self.Stages.append(stage)
+        self.Queues.append(queue)
+        self.Pumps.append(pump)
+        self.Tied.append(tied)
+        return self
+
+    __or__ = append
+
+    @synchronized
+    def prepend(self, stage):
+        """Adds the Processor in front of the first stage of the pipeline. Used for ``processor | pipeline``.
+
+        Returns:
+            Pipeline: the pipeline itself
+        """
+        tied = self._admit(stage)
+        if self.Stages:
+            self.Queues[0], self.Pumps[0] = self._connect(stage, self.Stages[0])
+        self.Stages.insert(0, stage)
+        self.Queues.insert(0, None)
+        self.Pumps.insert(0, None)
+        self.Tied.insert(0, tied)
+        return self
+
+    def _admit(self, stage):
+        # Returns True if the stage queue capacity follows the number of its workers
+        if isinstance(stage, Pipeline):
+            raise TypeError("Pipeline can not be a stage of another pipeline")
+        tied = stage.workers is not None and stage.queue_capacity is None
+        if tied:
+            # running tasks stay in the task queue, so the stage will accept new items only when it has a free worker
+            stage.set_queue_capacity(stage.workers)
+        return tied
+
+    def _connect(self, upstream, downstream):
+        queue = DEQueue(self.Capacity)
+        upstream.Output = queue
+        pump = _Pump(queue, downstream, name="%s.pump%d" % (self.Name or "Pipeline", len(self.Stages)))
+        pump.start()
+        return queue, pump
+
+    def set_workers(self, i, nworkers):
+        """Changes the number of workers of a stage while the pipeline is running
+
+        Args:
+            i (int): index of the stage
+            nworkers (int): new number of workers
+        """
+        stage = self.Stages[i]
+        stage.set_workers(nworkers)
+        if self.Tied[i]:
+            stage.set_queue_capacity(nworkers)
+
+    def put(self, item, timeout=-1):
+        """Puts the item into the first stage. Blocks if the first stage is busy.
+
+        Returns:
+            Promise: promise of the first stage processing the item
+        """
+        return self.Stages[0].put(item, timeout)
+
+    def get(self):
+        return self.Stages[-1].get()
+
+    def __iter__(self):
+        return iter(self.Stages[-1])
+
+    def close(self):
+        """Closes the pipeline input. The end of the stream will be passed through the stages after they process all the items
+        """
+        self.Stages[0].close()
+
+    def join(self):
+        """Blocks until all the items put into the closed pipeline are processed by all the stages
+        """
+        for stage, pump in zip(self.Stages, self.Pumps):
+            if pump is not None:
+                pump.join()
+            stage.join()
+
+    def stats(self):
+        """
+        Returns:
+            list of dicts: statistics of each stage: ``Processor.stats()`` plus the stage name, number of workers, number of items in
+                the stage input queue, throughput - processed items per second and utilization - fraction of the workers' time
+                spent processing the items, since the pipeline was created
+        """
+        elapsed = _monotonic() - self.StartT
+        out = []
+        for stage, queue in zip(self.Stages, self.Queues):
+            stats = stage.stats()
+            workers = stage.WorkerQueue.NWorkers
+            stats.update(
+                name = stage.Name or str(stage),
+                workers = workers,
+                queued = len(queue) if queue is not None else 0,
+                throughput = stats["processed"]/elapsed if elapsed > 0 else 0.0,
+                utilization = stats["busy_time"]/(elapsed*workers) if workers and elapsed > 0 else None
+            )
+            out.append(stats)
+        return out
+
+    def bottleneck(self):
+        """
+        Returns:
+            Processor: the stage with the highest utilization or, if the utilizations are equal, the longest input queue
+        """
+        stats = self.stats()
+        i = max(range(len(stats)), key=lambda i: (stats[i]["utilization"] or 0.0, stats[i]["queued"]))
+        return self.Stages[i]
+
+class PipelineController(Robot):
+
+    def __init__(self, pipeline, max_threads=None, interval=1.0, min_workers=1, hysteresis=0.2, patience=2, cooldown=2,
+                log_size=1000, start=True, name=None):
+        """Controller, which periodically moves workers between the pipeline stages towards the bottleneck stage, keeping the total
+        number of workers within a fixed budget. The pipeline throughput is limited by the stage with the lowest capacity - number of
+        workers divided by the average time to process one item. Every ``interval`` the controller measures the service time of each
+        stage over the last interval and the number of items waiting for each stage. The bottleneck is the busy stage with the lowest
+        capacity. If the budget has spare threads, one of them is given to the bottleneck. Otherwise one worker is taken from
+        the stage, which would still have the highest capacity without it, if that capacity exceeds the bottleneck capacity by
+        the ``hysteresis`` fraction.
+
+        To avoid thrashing, a change is made only if the same bottleneck is found ``patience`` times in a row, and after each change
+        the controller waits for ``cooldown`` intervals so that the stages settle at the new number of workers.
+
+        Every change is recorded in the event log, see ``events()``.
+
+        .. code-block:: python
+
+            pipeline = Parser(4) | Enricher(4) | Writer(4)
+            controller = PipelineController(pipeline, max_threads=12)
+            ...
+            controller.stop()
+
+        Args:
+            pipeline (Pipeline): pipeline to control. All its stages must have limited number of workers
+            max_threads (int): total number of workers of all the stages. Default: current total number of workers. If the stages
+                have more workers, the stages with the most workers are trimmed
+            interval (float): control interval in seconds. Default: 1 second
+            min_workers (int): minimum number of workers of a stage. Default: 1
+            hysteresis (float): relative capacity margin required to move a worker. Default: 0.2
+            patience (int): number of consecutive intervals the same bottleneck must be found before a change. Default: 2
+            cooldown (int): number of intervals to wait after a change. Default: 2
+            log_size (int): maximum number of events to keep. Default: 1000
+            start (bool): start the controller thread immediately. Otherwise, call ``start()`` or call ``step()`` explicitly
+            name (str): name of the controller
+        """
+        Robot.__init__(self, name=name, daemon=True)
+        workers = [stage.workers for stage in pipeline.Stages]
+        if None in workers:
+            raise ValueError("All the pipeline stages must have limited number of workers")
+        if max_threads is None:
+            max_threads = sum(workers)
+        if min_workers < 1:
+            raise ValueError("Each stage must have at least one worker")
+        if max_threads < min_workers*len(workers):
+            raise ValueError("Thread budget %d is too small for %d stages" % (max_threads, len(workers)))
+        self.Pipeline = pipeline
+        self.MaxThreads = max_threads
+        self.Interval = interval
+        self.MinWorkers = min_workers
+        self.Hysteresis = hysteresis
+        self.Patience = patience
+        self.Cooldown = cooldown
+        self.BusyUtilization = 0.9          # stages without waiting items are considered busy above this utilization
+        self.Events = deque(maxlen=log_size)
+        self.Last = None                    # (time, [(completed, busy_time), ...]) at the previous step
+        self.ServiceTimes = [None]*len(workers)
+        self.Bottleneck = None
+        self.Streak = 0
+        self.Quiet = 0
+        while sum(workers) > max_threads:
+            i = max(range(len(workers)), key=lambda i: workers[i])
+            workers[i] -= 1
+            self._change(None, i, -1, "trim", "total number of workers exceeds the budget")
+        if start:
+            self.start()
+
+    def _change(self, source, target, delta, action, reason, capacities=None):
+        pipeline = self.Pipeline
+        if source is not None:
+            pipeline.set_workers(source, pipeline.Stages[source].workers - 1)
+        pipeline.set_workers(target, pipeline.Stages[target].workers + delta)
+        self.Events.append(dict(
+            time = _now(),
+            action = action,
+            source = self._stage_name(source) if source is not None else None,
+            target = self._stage_name(target),
+            workers = [stage.workers for stage in pipeline.Stages],
+            capacities = capacities,
+            reason = reason
+        ))
+
+    def _stage_name(self, i):
+        stage = self.Pipeline.Stages[i]
+        return stage.Name or "stage%d" % (i,)
+
+    @synchronized
+    def events(self):
+        """
+        Returns:
+            list of dicts: the changes made by the controller, oldest first. Each event has the time, the action - "grow", "move"
+                or "trim", names of the source and the target stages, numbers of workers of the stages after the change,
+                capacities of the stages in items per second, which the decision was based on, and the reason
+        """
+        return list(self.Events)
+
+    @synchronized
+    def step(self):
+        """Measures the stages and makes at most one change. Called by the controller thread every ``interval``.
+
+        Returns:
+            dict or None: the event describing the change or None if no change was made
+        """
+        pipeline = self.Pipeline
+        t = _monotonic()
+        stats = [stage.stats() for stage in pipeline.Stages]
+        counters = [(s["processed"] + s["failed"], s["busy_time"]) for s in stats]
+        last = self.Last
+        self.Last = (t, counters)
+        if last is None:
+            return None
+        last_t, last_counters = last
+        dt = t - last_t
+
+        capacities = []
+        busy = []
+        for i, (s, queue) in enumerate(zip(stats, pipeline.Queues)):
+            completed = counters[i][0] - last_counters[i][0]
+            if completed > 0:
+                self.ServiceTimes[i] = (counters[i][1] - last_counters[i][1])/completed
+            workers = pipeline.Stages[i].workers
+            queued = s["waiting"] + (len(queue) if queue is not None else 0)
+            utilization = (counters[i][1] - last_counters[i][1])/(dt*workers) if dt > 0 else 0.0
+            saturated = queued > 0 or utilization >= self.BusyUtilization or completed == 0 and s["running"] >= workers
+            service_time = self.ServiceTimes[i]
+            if completed == 0 and saturated:
+                # nothing finished during the interval, the items take at least that long
+                service_time = max(service_time or 0.0, dt)
+            capacities.append(workers/service_time if service_time else float("inf"))
+            busy.append(saturated)
+
+        if self.Quiet > 0:
+            self.Quiet -= 1
+            return None
+
+        candidates = [i for i in range(len(capacities)) if busy[i]]
+        if not candidates:
+            self.Bottleneck, self.Streak = None, 0
+            return None
+        target = min(candidates, key=lambda i: capacities[i])
+        source = None
+        action = "grow"
+        reason = "spare thread in the budget"
+        if sum(stage.workers for stage in pipeline.Stages) >= self.MaxThreads:
+            action = "move"
+            donors = [i for i in range(len(capacities))
+                      if i != target and pipeline.Stages[i].workers > self.MinWorkers
+            ]
+            if donors:
+                reduced = lambda i: capacities[i]*(pipeline.Stages[i].workers - 1)/pipeline.Stages[i].workers
+                source = max(donors, key=reduced)
+                if reduced(source) < capacities[target]*(1.0 + self.Hysteresis):
+                    source = None
+            if source is None:
+                self.Bottleneck, self.Streak = None, 0
+                return None
+            reason = "%s capacity %.1f/sec is the lowest, %s would have %.1f/sec" % (
+                self._stage_name(target), capacities[target], self._stage_name(source), reduced(source))
+
+        if target == self.Bottleneck:
+            self.Streak += 1
+        else:
+            self.Bottleneck, self.Streak = target, 1
+        if self.Streak < self.Patience:
+            return None
+
+        self._change(source, target, 1, action, reason, capacities)
+        self.Bottleneck, self.Streak = None, 0
+        self.Quiet = self.Cooldown
+        return self.Events[-1]
+
+    def run(self):
+        self.step()
+        while not self.Stop:
+            with self:
+                self.sleep(self.Interval)
+            if not self.Stop:
+                self.step()
+
+    def stop(self):
+        """Stops the controller thread. The stages keep their current numbers of workers.
+        """
+        self.Stop = True
+        self.wakeup()
@@ -2,19 +2,31 @@ from .core import Core, synchronized, Robot
 from .dequeue import DEQueue
 from .task_queue import Task, TaskQueue
 from .promise import Promise
+from .clock import monotonic as _monotonic
 import sys, traceback
 
 class _WorkerTask(Task):
     
-    def __init__(self, processor, item, promise):
+    def __init__(self, processor, item, promise, seq):
         Task.__init__(self)
         self.Processor = processor
         self.Item = item
         self.Promise = promise
+        self.Seq = seq
         
     def run(self):
-        out = self.Processor._process(self.Item, self.Promise)
+        out = self.Processor._process(self.Item, self.Promise, self.Seq)
         
+class _BatchTask(Task):
+
+    def __init__(self, processor, batch):
+        Task.__init__(self)
+        self.Processor = processor
+        self.Batch = batch
+
+    def run(self):
+        self.Processor._process_batch(self.Batch)
+
 class _CloseOutputThread(Task):
     
     def __init__(self, processor):
@@ -54,17 +66,64 @@ class Processor(Core):
     Default = ""
 
     def __init__(self, max_workers = None, queue_capacity = None, name=None, output = Default, stagger=None, delegate=None,
-            put_timeout=None):
+            put_timeout=None, ordered=False, reorder_limit=None):
+        """
+        Args:
+            max_workers (int): maximum number of items processed concurrently. Default: no limit
+            queue_capacity (int): maximum number of items waiting for a worker. If reached, ``put`` blocks. Default: no limit
+            name (str): name of the processor
+            output (object): queue or another Processor to send the results to. None - do not send the results anywhere.
+                Default: new DEQueue
+            stagger (numeric): minimum time interval in seconds between consecutive item processing starts
+            delegate (object): object to notify when an item is processed: ``itemProcessed(item, result)`` or fails:
+                ``itemFailed(item, exc_type, exc_value, tb)``
+            put_timeout (numeric): default time-out for ``put``
+            ordered (bool): deliver the results to the output and to the promises in the order the items were put. Default: in the
+                order the items are processed
+            reorder_limit (int): for the ordered processor, maximum number of items put, but not delivered yet. If reached,
+                ``put`` blocks until the oldest item is delivered, so one slow item does not make the processor buffer
+                an unlimited number of results. Default: no limit
+        """
         Core.__init__(self, name=name)
         self.Output = DEQueue() if output is self.Default else output
         self.WorkerQueue = TaskQueue(max_workers, capacity=queue_capacity, stagger=stagger)
         self.Delegate = delegate
         self.PutTimeout = put_timeout
         self.Closed = False
+        self.Ordered = ordered
+        self.ReorderLimit = reorder_limit
+        self.NextSeq = 0            # sequence number of the next item put
+        self.NextOut = 0            # sequence number of the next item to deliver
+        self.Reorder = {}           # seq -> (item, promise, result, exc_info) for the items processed out of order, None for skipped
+        self.Releasing = False      # a worker thread is delivering the results in order
+        self.NProcessed = 0
+        self.NFailed = 0
+        self.BusyTime = 0.0         # total time spent in process() or process_batch()
         
     def hold(self):
         self.WorkerQueue.hold()
 
+    def set_workers(self, max_workers):
+        """Changes the maximum number of items processed concurrently
+        """
+        self.WorkerQueue.set_workers(max_workers)
+
+    @property
+    def workers(self):
+        return self.WorkerQueue.NWorkers
+
+    def set_queue_capacity(self, capacity):
+        """Changes the maximum number of items accepted by the processor and not finished yet. If reached, ``put`` blocks.
+
+        Args:
+            capacity (int): new capacity. None - no limit
+        """
+        self.WorkerQueue.set_capacity(capacity)
+
+    @property
+    def queue_capacity(self):
+        return self.WorkerQueue.capacity
+
     def release(self):
         self.WorkerQueue.release()
         
@@ -79,50 +138,133 @@ class Processor(Core):
         t.start()
     
     def wait_and_close_output(self):
-        print("wait_and_close_output: joining...")
         self.join()
-        print("          join done")
-        self.Output.close()
+        if self.Output is not None:
+            self.Output.close()
 
-    @synchronized
     def put(self, item, timeout=-1):
-        if self.Closed:
-            raise RuntimeError("Processor is closed")
-        if timeout == -1: timeout = self.PutTimeout
-        promise = Promise()
-        self.WorkerQueue.addTask(_WorkerTask(self, item, promise), timeout)
+        with self:
+            if self.Closed:
+                raise RuntimeError("Processor is closed")
+            if timeout == -1: timeout = self.PutTimeout
+            promise = Promise()
+            seq = self._next_seq(timeout)
+        # do not keep the processor locked while waiting for room in the worker queue, the workers need the lock to finish
+        try:
+            self.WorkerQueue.addTask(_WorkerTask(self, item, promise, seq), timeout=timeout)
+        except:
+            if seq is not None:
+                self._release(seq, None)        # the item was not accepted, do not wait for it
+            raise
         return promise
 
+    def _next_seq(self, timeout):
+        # must be called while the processor is locked. Returns None if the processor is not ordered
+        if not self.Ordered:
+            return None
+        if self.ReorderLimit is not None:
+            self.sleep_until(lambda: self.NextSeq - self.NextOut < self.ReorderLimit, timeout=timeout, channel="reorder")
+        seq = self.NextSeq
+        self.NextSeq += 1
+        return seq
+
     def get(self):
         return self.Output.get()
 
     def join(self):
         return self.WorkerQueue.join()
 
-    def _process(self, item, promise):
-        #print("%x: Processor._process: item: %s" % (id(self), item))
+    def _process(self, item, promise, seq):
+        t0 = _monotonic()
         try:    
             out = self.process(item)
         except:
-            exc_type, exc_value, tb = sys.exc_info()
-            if self.Delegate is not None:
-                self.Delegate.itemFailed(item, exc_type, exc_value, tb)
-            raise
-            promise.exception(exc_type, exc_value, tb)
-            if self.OutputQueue is not None:
-                self.OutputQueue.append((None, (exc_type, exc_value, tb)))
+            exc_info = sys.exc_info()
+            self._count(0, 1, _monotonic() - t0)
+            self._completed(item, promise, seq, None, exc_info)
+        else:
+            self._count(1, 0, _monotonic() - t0)
+            self._completed(item, promise, seq, out, None)
+
+    @synchronized
+    def _count(self, processed, failed, busy_time):
+        self.NProcessed += processed
+        self.NFailed += failed
+        self.BusyTime += busy_time
+
+    @synchronized
+    def stats(self):
+        """
+        Returns:
+            dict: number of processed and failed items, number of items being processed and waiting for a worker, total and average
+                time spent processing the items
+        """
+        waiting, running = self.WorkerQueue.counts()
+        n = self.NProcessed + self.NFailed
+        return dict(
+            processed = self.NProcessed,
+            failed = self.NFailed,
+            running = running,
+            waiting = waiting,
+            busy_time = self.BusyTime,
+            avg_service_time = self.BusyTime/n if n else None
+        )
+
+    def __or__(self, other):
+        """Builds a Pipeline: ``p1 | p2 | p3``. If ``other`` is a Pipeline, the processor is added in front of its first stage
+        """
+        from .pipeline import Pipeline
+        if isinstance(other, Pipeline):
+            return other.prepend(self)
+        return Pipeline(self, other)
+
+    def _completed(self, item, promise, seq, out, exc_info):
+        if seq is not None:
+            self._release(seq, (item, promise, out, exc_info))
+        elif exc_info is not None:
+            self._failed(item, promise, exc_info)
         else:
-            #print("%x: out: %s" % (id(self), out))
-            if self.Delegate is not None:
-                self.Delegate.itemProcessed(item, out)
-            if self.Output is not None and out is not None:
-                    next_promise = self.Output.put(out)
-                    if next_promise is not None:
-                        # fulfil this promise later, when the output processor has done with the item
-                        next_promise.Name = "secondary"
-                        next_promise.chain(promise)
-                        return
-            promise.complete(out)
+            self._deliver(item, promise, out)
+
+    def _release(self, seq, entry):
+        # delivers results of the ordered processor. Only one thread at a time delivers them, so they are not reordered again
+        with self:
+            self.Reorder[seq] = entry
+            if self.Releasing:
+                return
+            self.Releasing = True
+        while True:
+            with self:
+                if self.NextOut not in self.Reorder:
+                    self.Releasing = False
+                    return
+                entry = self.Reorder.pop(self.NextOut)
+                self.NextOut += 1
+                self.wakeup(channel="reorder")
+            if entry is None:
+                continue
+            item, promise, out, exc_info = entry
+            if exc_info is not None:
+                self._failed(item, promise, exc_info)
+            else:
+                self._deliver(item, promise, out)
+
+    def _failed(self, item, promise, exc_info):
+        if self.Delegate is not None:
+            self.Delegate.itemFailed(item, *exc_info)
+        promise.exception(*exc_info)
+
+    def _deliver(self, item, promise, out):
+        if self.Delegate is not None:
+            self.Delegate.itemProcessed(item, out)
+        if self.Output is not None and out is not None:
+                next_promise = self.Output.put(out)
+                if next_promise is not None:
+                    # fulfil this promise later, when the output processor has done with the item
+                    next_promise.Name = "secondary"
+                    next_promise.chain(promise)
+                    return
+        promise.complete(out)
 
     def process(self, item):
         # override me
@@ -149,3 +291,107 @@ class Processor(Core):
     @synchronized
     def __iter__(self):
         return iter(self.Output)
+
+class BatchProcessor(Processor):
+
+    def __init__(self, max_workers=None, max_batch=100, max_delay=0.1, **args):
+        """Processor, which processes items in batches. Items are accumulated until there are ``max_batch`` of them or
+        ``max_delay`` seconds passed since the first of them was put, and then passed to the ``process_batch`` method
+        as a list. Results are delivered to the promises returned by ``put`` and to the output one by one, same as for the Processor.
+        If ``process_batch`` raises an exception, promises of all the items in the batch get the exception.
+
+        Args:
+            max_workers (int): maximum number of batches processed concurrently. Default: no limit
+            max_batch (int): maximum number of items in a batch. Default: 100
+            max_delay (numeric): maximum time in seconds to wait for the batch to fill up. None - wait until the batch is full or
+                ``flush`` is called. Default: 0.1
+            args: other keyword arguments to pass to the Processor constructor
+        """
+        Processor.__init__(self, max_workers, **args)
+        if self.Ordered and self.ReorderLimit is not None and self.ReorderLimit < max_batch:
+            raise ValueError("reorder_limit must not be less than max_batch")
+        self.MaxBatch = max_batch
+        self.MaxDelay = max_delay
+        self.Batch = []             # [(item, promise, seq), ...]
+
+    def put(self, item, timeout=-1):
+        batch = None
+        with self:
+            if self.Closed:
+                raise RuntimeError("Processor is closed")
+            if timeout == -1: timeout = self.PutTimeout
+            promise = Promise()
+            self.Batch.append((item, promise, self._next_seq(timeout)))
+            if len(self.Batch) >= self.MaxBatch:
+                batch = self._take_batch()
+            elif len(self.Batch) == 1 and self.MaxDelay is not None:
+                self.alarm(self._flush_alarm, t=self.MaxDelay)
+        if batch:
+            self._submit(batch, timeout)
+        return promise
+
+    def flush(self):
+        """Sends accumulated items for processing without waiting for the batch to fill up. Blocks if the worker queue is full.
+        If the batch can not be queued, promises of all its items fail with the exception, and the exception is raised.
+        """
+        with self:
+            batch = self._take_batch()
+        if batch:
+            self._submit(batch, self.PutTimeout)
+
+    def _flush_alarm(self):
+        # called by the timer service, must not block. The items of the batch were already accepted by put,
+        # so the batch is queued regardless of the worker queue capacity
+        with self:
+            batch = self._take_batch()
+        if batch:
+            try:
+                self._submit(batch, None, force=True)
+            except RuntimeError:
+                pass            # the queue is closed, the promises have the exception
+
+    def _submit(self, batch, timeout, force=False):
+        # the batch may contain items put by other callers, which already have the promises,
+        # so if the batch can not be queued, all the promises fail
+        try:
+            self.WorkerQueue.addTask(_BatchTask(self, batch), timeout=timeout, force=force)
+        except:
+            exc_info = sys.exc_info()
+            for item, promise, seq in batch:
+                self._completed(item, promise, seq, None, exc_info)
+            raise
+
+    def _take_batch(self):
+        # must be called while the processor is locked
+        self.cancel_alarm()
+        batch, self.Batch = self.Batch, []
+        return batch
+
+    def close(self):
+        self.flush()
+        Processor.close(self)
+
+    def join(self):
+        self.flush()
+        return Processor.join(self)
+
+    def _process_batch(self, batch):
+        items = [item for item, _, _ in batch]
+        t0 = _monotonic()
+        try:
+            results = list(self.process_batch(items))
+            if len(results) != len(items):
+                raise ValueError("process_batch returned %d results for %d items" % (len(results), len(items)))
+        except:
+            exc_info = sys.exc_info()
+            self._count(0, len(items), _monotonic() - t0)
+            for item, promise, seq in batch:
+                self._completed(item, promise, seq, None, exc_info)
+        else:
+            self._count(len(items), 0, _monotonic() - t0)
+            for (item, promise, seq), out in zip(batch, results):
+                self._completed(item, promise, seq, out, None)
+
+    def process_batch(self, items):
+        # override me. Returns list of results, one per item. None results are not sent to the output
+        return [self.process(item) for item in items]
@@ -1,5 +1,8 @@
-from .core import Core, synchronized, Timeout
+from .core import Core, SlotCore, synchronized, Timeout, Timer
+from .clock import get_clock
 from threading import get_ident, RLock
+import asyncio, concurrent.futures, sys, traceback
+from collections import deque
 
 class DebugLock(object):
     
@@ -22,9 +25,68 @@ class DebugLock(object):
         return self.release()
     
 
-class Promise(Core):
+PENDING = "pending"
+SETTLING = "settling"           # being completed, failed or cancelled, callbacks are running
+COMPLETE = "complete"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+def _callback_entry(cb):
+    # resolve callback object methods once, when the callback is added
+    return (cb, getattr(cb, "oncomplete", None), getattr(cb, "onexception", None), getattr(cb, "oncancel", None))
+
+def _run_callback(cb, *params):
+    # a failing callback must not stop the promise from settling and from delivering the chained promises
+    try:
+        return not not cb(*params)
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        return False
+
+def _set_future_result(future, result):
+    if not future.done():
+        try:    future.set_result(result)
+        except (asyncio.InvalidStateError, concurrent.futures.InvalidStateError):
+            pass            # the future was cancelled concurrently
+
+def _set_future_exception(future, exc_value):
+    if not future.done():
+        try:    future.set_exception(exc_value)
+        except (asyncio.InvalidStateError, concurrent.futures.InvalidStateError):
+            pass
+
+class _FutureCallback(object):
+
+    # Promise callback object delivering the promise outcome to a concurrent.futures.Future or an asyncio.Future.
+    # If the loop is specified, the future is updated by the loop thread.
+
+    def __init__(self, future, loop=None):
+        self.Future = future
+        self.Loop = loop
+
+    def _call(self, fcn, *params):
+        if self.Loop is None:
+            fcn(*params)
+        else:
+            try:    self.Loop.call_soon_threadsafe(fcn, *params)
+            except RuntimeError:
+                pass            # the loop is closed
+
+    def oncomplete(self, promise, result):
+        self._call(_set_future_result, self.Future, result)
+
+    def onexception(self, promise, exc_type, exc_value, exc_traceback):
+        self._call(_set_future_exception, self.Future, exc_value)
+
+    def oncancel(self, promise):
+        self._call(self.Future.cancel)
+
+class Promise(SlotCore):
+
+    __slots__ = ("Data", "State", "Result", "ExceptionInfo", "RaiseException", "OnComplete", "OnException", "OnCancel",
+                "Callbacks", "Chained", "Executor")
     
-    def __init__(self, data=None, callbacks = [], name=None):
+    def __init__(self, data=None, callbacks = [], name=None, lock=None, executor=None):
         """
         Creates new Promise object.
         
@@ -32,22 +94,42 @@ class Promise(Core):
             data: Arbitrary user-defined data to be associated with the promise. Can be anything. robotz does not use it.
             callbacks (list): List of Promise callbacks objects. Each object may have ``oncomplete`` and/or ``onexception`` methods defined. See Notes below.
             name (string): Name for the new Promise object, optional.
+            lock (Lock, RLock, Core or LockPool): lock for the promise to use, see Core. Default: new RLock object
+            executor (object): executor to call the promise callbacks, e.g. ThreadExecutor or AsyncioExecutor. The executor
+                must have ``submit(fcn, *params)`` method. Default: call the callbacks in the thread, which settles the promise
         
         Notes:
-            
+            The promise goes through the following states: "pending" -> "settling" -> "complete", "failed" or "cancelled".
+            Once the promise leaves the "pending" state, all further attempts to complete, fail or cancel it are ignored.
+            The state can be checked without locking the promise.
         """
-        Core.__init__(self, name=name)    #, lock=DebugLock())
+        SlotCore.__init__(self, name=name, lock=lock)    #, lock=DebugLock())
         self.Data = data
-        self.Callbacks = callbacks[:]
-        self.Complete = False
-        self.Cancelled = False
+        self.State = PENDING
         self.Result = None
         self.ExceptionInfo = None     # or tuple (exc_type, exc_value, exc_traceback)
         self.RaiseException = True
         self.OnComplete = self.OnException = self.OnCancel = None
-        self.Chained = []
+        self.Callbacks = [_callback_entry(cb) for cb in callbacks] if callbacks else None
+        self.Chained = None
+        self.Executor = executor
+
+    @property
+    def Complete(self):
+        return self.State == COMPLETE
+
+    @property
+    def Cancelled(self):
+        return self.State == CANCELLED
+
+    @property
+    def done(self):
+        """
+        Returns:
+            boolean: True if the promise has completed, failed or been cancelled and all its callbacks have been called
+        """
+        return self.State in (COMPLETE, FAILED, CANCELLED)
 
-    @synchronized
     def then(self, oncomplete=None, onexception=None):
         """
         Creates new Promise object, which will be chained to the ``self`` promise with provided ``oncomplete`` and/or ``onexception`` callbacks.
@@ -56,15 +138,14 @@ class Promise(Core):
             oncomplete (function): the new promise completion callback function
             oncexception (function): the new promise exception callback function
         """
-        p = Promise()
+        p = Promise(executor=self.Executor)
         if oncomplete is not None:
-            p.oncomplete(oncomplete)
+            p.OnComplete = oncomplete
         if onexception is not None:
-            p.onexception(onexception)
+            p.OnException = onexception
         self.chain(p)
         return p
 
-    @synchronized
     def oncomplete(self, cb):
         """Sets promise completion callback. If the promise has already completed, the callback function is called immediately.
         Old completion callback is removed.
@@ -74,12 +155,14 @@ class Promise(Core):
 
                 cb(promise, result)
         """
-        if self.Complete:
-            cb(self, self.Result)
-        self.OnComplete = cb
+        with self:
+            state = self.State
+            if state in (PENDING, SETTLING):
+                self.OnComplete = cb
+        if state == COMPLETE:
+            self._call(cb, self, self.Result)
         return self
         
-    @synchronized
     def onexception(self, cb):
         """Sets promise exception callback. If the promise has failed already, the callback function will be called immediately.
         Old exception callback is removed.
@@ -89,12 +172,14 @@ class Promise(Core):
         
                 cb(promise, exception_type, exception_value, traceback)
         """
-        if self.ExceptionInfo:
-            cb(self, *self.ExceptionInfo)
-        self.OnException = cb
+        with self:
+            state = self.State
+            if state in (PENDING, SETTLING):
+                self.OnException = cb
+        if state == FAILED:
+            self._call(cb, self, *self.ExceptionInfo)
         return self
         
-    @synchronized
     def oncancel(self, cb):
         """Sets promise cancellation callback. If the promise has been cancelled already, the callback function will be called immediately.
         Old cancellation callback is removed.
@@ -103,12 +188,14 @@ class Promise(Core):
             cb (function):    Function to be called when the promise is cancelled. The function will be called with the promise as the only
                 argiment.
         """
-        if self.Cancelled:
-            cb(self)
-        self.OnCancel = cb
+        with self:
+            state = self.State
+            if state in (PENDING, SETTLING):
+                self.OnCancel = cb
+        if state == CANCELLED:
+            self._call(cb, self)
         return self
         
-    @synchronized
     def addCallback(self, cb):
         """Adds a new promise callback object to the promise callback list. If the promise has completed, failed or cancelled already,
             the new callback object will be notified immediately and will not be added to the list.
@@ -125,17 +212,23 @@ class Promise(Core):
                 def onexception(self, promise, exception_type, exception_value, traceback):
                     # the promise failed        
         """
-        if self.Cancelled and hasattr(cb, "oncancel"):
-            cb.oncancel(self)
-        elif self.Complete and hasattr(cb, "oncomplete"):
-            cb.oncomplete(self, self.Result)
-        elif self.ExceptionInfo and hasattr(cb, "onexception"):
-            cb.onexception(self, *self.ExceptionInfo)
-        else:
-            self.Callbacks.append(cb)
+        with self:
+            state = self.State
+            if state in (PENDING, SETTLING):
+                if self.Callbacks is None:
+                    self.Callbacks = []
+                self.Callbacks.append(_callback_entry(cb))
+        if state == CANCELLED:
+            if hasattr(cb, "oncancel"):
+                self._call(cb.oncancel, self)
+        elif state == COMPLETE:
+            if hasattr(cb, "oncomplete"):
+                self._call(cb.oncomplete, self, self.Result)
+        elif state == FAILED:
+            if hasattr(cb, "onexception"):
+                self._call(cb.onexception, self, *self.ExceptionInfo)
         return self
 
-    @synchronized
     def chain(self, *promises, cancel_chained = True):
         """Adds new chained promises to ``self``. If the ``self`` promise has delivered (completed or failed) already, the new
         promises will be delivered with the same status immediately. If the ``self`` promise has been cancelled, the new promises will be cancelled too.
@@ -144,44 +237,33 @@ class Promise(Core):
             promises (list of Promises): list of promises to add as chained
             cancel_chained (bool): whether to cancel the new promises if the ``self`` promise has been cancelled. Default = True
         """
-        if self.ExceptionInfo:
+        with self:
+            state = self.State
+            if state in (PENDING, SETTLING):
+                if self.Chained is None:
+                    self.Chained = []
+                self.Chained += promises
+        if state == FAILED:
             exc_type, exc_value, exc_traceback = self.ExceptionInfo
             for p in promises:
                 p.exception(exc_type, exc_value, exc_traceback)
-        elif self.Complete:
+        elif state == COMPLETE:
             for p in promises:
                 p.complete(self.Result)
-        elif self.Cancelled and cancel_chained:
-            for p in promises:
-                p.cancel()
-        else:
-            self.Chained += list(promises)
+        elif state == CANCELLED:
+            if cancel_chained:
+                for p in promises:
+                    p.cancel()
         return self
 
-    @synchronized
     def complete(self, result=None):
         """Delivers the promise as successfully completed with given result
             
             Args:
                 result: the promise result to be delivered
         """
-        self.Result = result
-        self.Complete = True
-        if not self.Cancelled:
-            stop = False
-            if self.OnComplete is not None:
-                stop = not not self.OnComplete(self, self.Result)
-            for cb in self.Callbacks:
-                if stop:
-                    break
-                if hasattr(cb, "oncomplete"):
-                    stop = not not cb.oncomplete(self.Result, self)
-        for p in self.Chained:
-            p.complete(result)
-        self.wakeup()
-        self._cleanup()
-
-    @synchronized
+        self._deliver(COMPLETE, result)
+
     def exception(self, exc_type, exc_value, exc_traceback):
         """Fails the promise with the exception
             
@@ -190,53 +272,134 @@ class Promise(Core):
                 exc_value: exception value
                 exc_traceback: exception traceback
         """
-        self.ExceptionInfo = (exc_type, exc_value, exc_traceback)
-        if not self.Cancelled:
-            stop = False
-            if self.OnException is not None:
-                stop = bool(self.OnException(self, exc_type, exc_value, exc_traceback))
-            for cb in self.Callbacks:
-                if stop:
-                    break
-                if hasattr(cb, "onexception"):
-                    stop = not not cb.onexception(self, exc_type, exc_value, exc_traceback)
-            self.RaiseException = not stop
-        for p in self.Chained:
-            #print("forwarding exception to the chained promise...")
-            p.exception(exc_type, exc_value, exc_traceback)
-        self.wakeup()
-        self._cleanup()
+        self._deliver(FAILED, (exc_type, exc_value, exc_traceback))
 
-    @synchronized
     def cancel(self, cancel_chained = True):
         """Cancels the promise
         
         Args:
             cancel_chained (bool): whether to cancel chained promises too. Default = True
         """
-        if not self.Cancelled:
-            stop = False
-            if self.OnCancel is not None:
-                #print("calling OnException...")
-                stop = not not self.OnCancel(self)
-            for cb in self.Callbacks:
-                if stop:
-                    break
-                if hasattr(cb, "oncancel"):
-                    stop = not not cb.oncancel(self)
-            if cancel_chained:
-                for p in self.Chained:
-                    p.cancel()
-        self.Cancelled = True
-        self.wakeup()
-        self._cleanup()
+        self._deliver(CANCELLED, cancel_chained)
+
+    def _deliver(self, state, value):
+        # Settles the promise and all the promises chained to it, directly or indirectly. Uses a work list instead of
+        # recursion, so the stack does not grow with the chain length
+        chained = self._settle(state, value)
+        if chained:
+            _deliver_all(chained, state, True if state == CANCELLED else value)
+
+    def _settle(self, state, value):
+        # Moves the promise to the SETTLING state and calls the callbacks without holding the promise lock, inline or using the
+        # promise executor. Then moves the promise to the final state.
+        # Returns the list of the chained promises to be settled the same way or None
+        cancel_chained = state != CANCELLED or value
+        with self:
+            if self.State != PENDING:
+                return None
+            self.State = SETTLING
+            if state == COMPLETE:
+                self.Result = value
+            elif state == FAILED:
+                self.ExceptionInfo = value
+            handler, callbacks, chained = self._take_callbacks(state)
+            if handler is None and not callbacks:
+                self._finish(state, False)
+                return chained if cancel_chained else None
+        if self.Executor is not None:
+            # chained promises are settled by the executor too, after the callbacks
+            self.Executor.submit(self._call_callbacks_and_deliver, state, handler, callbacks, chained, cancel_chained)
+            return None
+        chained += self._call_callbacks(state, handler, callbacks)
+        return chained if cancel_chained else None
+
+    def _take_callbacks(self, state):
+        # must be called while the promise is locked
+        if state == COMPLETE:
+            handler = self.OnComplete
+        elif state == FAILED:
+            handler = self.OnException
+        else:
+            handler = self.OnCancel
+        callbacks = self.Callbacks
+        chained = self.Chained or []
+        self.Chained = self.Callbacks = None
+        self.OnException = self.OnComplete = self.OnCancel = None
+        return handler, callbacks, chained
+
+    def _finish(self, state, stop):
+        # must be called while the promise is locked
+        if state == FAILED:
+            self.RaiseException = not stop
+        self.State = state
+        if self._WakeUpCondition is not None:
+            # someone is or was waiting
+            get_clock().notify_all(self._WakeUpCondition)
+
+    def _call_callbacks(self, state, handler, callbacks):
+        # Calls the callbacks, including the ones added while the callbacks were running, then moves the promise to its final state.
+        # Exceptions raised by the callbacks are reported and ignored. The final state is reached even if the thread is interrupted.
+        # Returns the list of promises chained while the callbacks were running
+        stop = False
+        late_chained = []
+        try:
+            while True:
+                if state == COMPLETE:
+                    result = self.Result
+                    if handler is not None and not stop:
+                        stop = _run_callback(handler, self, result)
+                    for _, oncomplete, _, _ in callbacks or ():
+                        if stop:
+                            break
+                        if oncomplete is not None:
+                            stop = _run_callback(oncomplete, self, result)
+                elif state == FAILED:
+                    exc_type, exc_value, exc_traceback = self.ExceptionInfo
+                    if handler is not None and not stop:
+                        stop = _run_callback(handler, self, exc_type, exc_value, exc_traceback)
+                    for _, _, onexception, _ in callbacks or ():
+                        if stop:
+                            break
+                        if onexception is not None:
+                            stop = _run_callback(onexception, self, exc_type, exc_value, exc_traceback)
+                else:
+                    if handler is not None and not stop:
+                        stop = _run_callback(handler, self)
+                    for _, _, _, oncancel in callbacks or ():
+                        if stop:
+                            break
+                        if oncancel is not None:
+                            stop = _run_callback(oncancel, self)
+                with self:
+                    handler, callbacks, chained = self._take_callbacks(state)
+                    late_chained += chained
+                    if handler is None and not callbacks:
+                        self._finish(state, stop)
+                        return late_chained
+        finally:
+            with self:
+                if self.State == SETTLING:
+                    self._finish(state, stop)
+
+    def _call_callbacks_and_deliver(self, state, handler, callbacks, chained, cancel_chained):
+        # called by the executor
+        chained += self._call_callbacks(state, handler, callbacks)
+        if chained and cancel_chained:
+            value = self.Result if state == COMPLETE else (self.ExceptionInfo if state == FAILED else True)
+            _deliver_all(chained, state, value)
+
+    def _call(self, fcn, *params):
+        # calls a callback for already settled promise
+        if self.Executor is None:
+            fcn(*params)
+        else:
+            self.Executor.submit(fcn, *params)
 
-    @synchronized
     def wait(self, timeout=None):
         """Blocks until the promise closes (completes, fails or gets cancelled).
         
         Args:
-            timeout (numeric): Time-out in seconds. If the operation times out, the RuntimeError exception will be raised.
+            timeout (numeric): Time-out in seconds. If the operation times out, the Timeout exception will be raised.
         
         Returns:
             Object: promise result, if the promise completes successfully. If the promsie is cancelled, None is returned.
@@ -247,79 +410,248 @@ class Promise(Core):
         """
         
         #print("thread %s: wait(%s)..." % (get_ident(), self))
-        pred = lambda x: x.Complete or x.Cancelled or self.ExceptionInfo is not None
-        self.sleep_until(pred, self, timeout=timeout)
-        try:
-            if self.Complete:
-                return self.Result
-            elif self.Cancelled:
-                return None
-            elif self.ExceptionInfo:
-                if self.RaiseException:
-                    _, e, tb = self.ExceptionInfo
-                    raise e.with_traceback(tb)
+        state = self.State
+        if state in (PENDING, SETTLING):
+            # the wake-up Condition is created only here, when someone actually blocks
+            self.sleep_until(lambda: self.State not in (PENDING, SETTLING), timeout=timeout)
+            state = self.State
+        if state == COMPLETE:
+            return self.Result
+        elif state == FAILED:
+            if self.RaiseException:
+                _, e, tb = self.ExceptionInfo
+                raise e.with_traceback(tb)
+        return None
+
+    def to_future(self):
+        """Creates a ``concurrent.futures.Future`` object, which will be resolved when the promise completes, fails or is cancelled.
+        If the future is cancelled, the promise will be cancelled too. No threads are created.
+
+        Returns:
+            concurrent.futures.Future: the future object
+        """
+        future = concurrent.futures.Future()
+        future.add_done_callback(lambda f: self.cancel() if f.cancelled() else None)
+        self.addCallback(_FutureCallback(future))
+        return future
+
+    def to_asyncio_future(self, loop=None):
+        """Creates an ``asyncio.Future`` object, similar to what ``asyncio.wrap_future`` does for ``concurrent.futures.Future``.
+        The promise outcome is posted to the loop using ``loop.call_soon_threadsafe``, so no threads are created. If the asyncio future is cancelled,
+        the promise will be cancelled too.
+
+        Args:
+            loop (asyncio event loop): the loop to bind the future to. Default: the running loop
+
+        Returns:
+            asyncio.Future: the future object
+        """
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(lambda f: self.cancel() if f.cancelled() else None)
+        self.addCallback(_FutureCallback(future, loop))
+        return future
+
+    def __await__(self):
+        """Makes the promise awaitable from asyncio code running in the event loop thread:
+
+            result = await promise
+
+        If the promise fails, the exception is raised. If the promise is cancelled, asyncio.CancelledError is raised.
+        """
+        return self.to_asyncio_future().__await__()
+
+    @staticmethod
+    def from_future(future, data=None, name=None):
+        """Creates a Promise, which will be resolved when the ``concurrent.futures.Future`` or ``asyncio.Future`` completes, fails or is cancelled.
+
+        Args:
+            future (concurrent.futures.Future or asyncio.Future): the future object
+            data: data to associate with the new promise
+            name (str): name of the new promise
+
+        Returns:
+            Promise: the new promise
+        """
+        promise = Promise(data=data, name=name)
+        def done(f):
+            if f.cancelled():
+                promise.cancel()
             else:
-                raise Timeout()
-        finally:
-            self._cleanup()
+                e = f.exception()
+                if e is None:
+                    promise.complete(f.result())
+                else:
+                    promise.exception(type(e), e, e.__traceback__)
+        future.add_done_callback(done)
+        return promise
 
-    def _cleanup(self):
-        self.Chained = []
-        self.Callbacks = []
-        self.OnException = self.OnComplete = None
+    @staticmethod
+    def all(*args, timeout=None):
+        """Static method to create a Promise, which completes when all the argument promises complete. The new promise result is
+        the list of the argument promises results in the same order. Cancelled argument promises contribute None to the list.
+        The new promise fails as soon as any of the argument promises fails.
+        
+        Args:
+            *args: promise objects to combine, or a single list or tuple of promises
+            timeout (numeric): if specified, the new promise will fail with Timeout exception if it does not complete within
+                ``timeout`` seconds. Default: no time-out
+
+        Returns:
+            Promise: new promise
+        """
+        return _Combinator("all", _promise_list(args), timeout).Promise
 
     @staticmethod
-    def all(*args):
-        """Static method to create an ``ANDPromise`` - a promise-like object, which represents completion of all the argument promsies. 
+    def any(*args, timeout=None):
+        """Static method to create a Promise, which completes as soon as any of the argument promises completes, with the result of that promise.
+        If all the argument promises fail or get cancelled, the new promise fails with the exception of the last failed argument promise,
+        or gets cancelled if none of them failed.
         
         Args:
-            *args: promise objects to combine
+            *args: promise objects to combine, or a single list or tuple of promises
+            timeout (numeric): if specified, the new promise will fail with Timeout exception if it does not complete within
+                ``timeout`` seconds. Default: no time-out
+
+        Returns:
+            Promise: new promise
         """
+        return _Combinator("any", _promise_list(args), timeout).Promise
+
+    @staticmethod
+    def race(*args, timeout=None):
+        """Static method to create a Promise, which settles the same way as the first of the argument promises to settle: completes with
+        its result, fails with its exception or gets cancelled.
         
-        if args and isinstance(args[0], (tuple, list)):
-            promises = args[0]
-        else:
-            promises = args
-        return ANDPromise(promises)
+        Args:
+            *args: promise objects to combine, or a single list or tuple of promises
+            timeout (numeric): if specified, the new promise will fail with Timeout exception if none of the argument promises settles
+                within ``timeout`` seconds. Default: no time-out
+
+        Returns:
+            Promise: new promise
+        """
+        return _Combinator("race", _promise_list(args), timeout).Promise
 
     @staticmethod
-    def any(*args):
-        """Static method to create an ``ORPromise`` - a promise-like object, which represents completion of one of the argument promsies. 
+    def settled(*args, timeout=None):
+        """Static method to create a Promise, which completes when all the argument promises complete, fail or get cancelled.
+        The new promise result is the list of (state, value) tuples in the order of the argument promises, where state is
+        "complete", "failed" or "cancelled" and value is the promise result, the exception or None respectively.
         
         Args:
-            *args: promise objects to combine
+            *args: promise objects to combine, or a single list or tuple of promises
+            timeout (numeric): if specified, the new promise will fail with Timeout exception if not all argument promises settle
+                within ``timeout`` seconds. Default: no time-out
+
+        Returns:
+            Promise: new promise
         """
-        if args and isinstance(args[0], (tuple, list)):
-            promises = args[0]
-        else:
-            promises = args
-        return ORPromise(promises)
-    
-class ORPromise(Core):
-    
-    def __init__(self, promises):
-        Core.__init__(self)
-        self.Fulfilled = None
-        for p in promises:
-            p.addCallback(self)
+        return _Combinator("settled", _promise_list(args), timeout).Promise
+
+def _deliver_all(promises, state, value):
+    # settles the promises and the promises chained to them iteratively
+    work = deque(promises)
+    while work:
+        chained = work.popleft()._settle(state, value)
+        if chained:
+            work.extend(chained)
+
+def _promise_list(args):
+    if args and isinstance(args[0], (tuple, list)):
+        return args[0]
+    else:
+        return args
+
+class _CombinatorInput(object):
+
+    # Promise callback object attached to one of the combinator input promises
+
+    __slots__ = ("Combinator", "Index")
+
+    def __init__(self, combinator, index):
+        self.Combinator = combinator
+        self.Index = index
 
-    @synchronized
     def oncomplete(self, promise, result):
-        if self.Fulfilled is None:
-            self.Fulfilled = promise
-            self.wakeup()
+        self.Combinator.settled(self.Index, COMPLETE, result)
 
-    @synchronized
-    def wait(self, timeout = None):
-        while self.Fulfilled is None:
-            self.sleep(timeout)
-        return self.Fulfilled.Result
+    def onexception(self, promise, exc_type, exc_value, exc_traceback):
+        self.Combinator.settled(self.Index, FAILED, (exc_type, exc_value, exc_traceback))
 
-class ANDPromise(Core):
-    
-    def __init__(self, promises):
-        Core.__init__(self)
-        self.Promises = promises
-        
-    def wait(self, timeout=None):
-        return [p.wait(timeout) for p in self.Promises]
+    def oncancel(self, promise):
+        self.Combinator.settled(self.Index, CANCELLED, None)
+
+class _Combinator(object):
+
+    # Implements Promise.all, Promise.any, Promise.race and Promise.settled. Each input promise settling costs O(1).
+
+    def __init__(self, mode, promises, timeout):
+        self.Mode = mode
+        self.Promise = Promise()
+        self.Lock = RLock()
+        self.Remaining = len(promises)
+        self.Results = [None] * len(promises)
+        self.LastException = None
+        self.Timer = None
+        if not promises:
+            self.finish()
+            return
+        if timeout is not None:
+            self.Timer = Timer(self.timed_out, t=timeout)
+        for i, p in enumerate(promises):
+            p.addCallback(_CombinatorInput(self, i))
+
+    def settled(self, index, state, value):
+        mode = self.Mode
+        promise = self.Promise
+        if promise.State != PENDING:
+            return
+        if mode == "race":
+            self.settle(state, value)
+            return
+        if mode == "any" and state == COMPLETE:
+            self.settle(COMPLETE, value)
+            return
+        if mode == "all" and state == FAILED:
+            self.settle(FAILED, value)
+            return
+        with self.Lock:
+            if mode == "settled":
+                self.Results[index] = (state, value[1] if state == FAILED else value)
+            elif mode == "all":
+                self.Results[index] = value
+            elif state == FAILED:
+                self.LastException = value
+            self.Remaining -= 1
+            done = self.Remaining == 0
+        if done:
+            self.finish()
+
+    def finish(self):
+        # all input promises have settled
+        mode = self.Mode
+        if mode in ("all", "settled"):
+            self.settle(COMPLETE, self.Results)
+        elif mode == "any":
+            if self.LastException is not None:
+                self.settle(FAILED, self.LastException)
+            else:
+                self.settle(CANCELLED, None)
+
+    def timed_out(self):
+        self.Timer = None
+        self.Promise.exception(Timeout, Timeout(), None)
+
+    def settle(self, state, value):
+        timer = self.Timer
+        if timer is not None:
+            self.Timer = None
+            timer.cancel()
+        if state == COMPLETE:
+            self.Promise.complete(value)
+        elif state == FAILED:
+            self.Promise.exception(*value)
+        else:
+            self.Promise.cancel()
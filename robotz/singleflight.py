@@ -0,0 +1,149 @@
+from .core import Core, synchronized
+from .promise import Promise
+from .clock import monotonic as _monotonic
+from collections import OrderedDict
+import sys, functools, types
+
+_KWMark = object()
+
+def _make_key(params, args):
+    key = params
+    if args:
+        key += (_KWMark,) + tuple(sorted(args.items()))
+    return key
+
+class SingleFlight(Core):
+
+    def __init__(self, fcn, ttl=0, maxsize=None, key=None, name=None):
+        """Wraps the function so that concurrent calls with the same arguments share single call of the function.
+        The first caller calls the function, the others wait for its Promise to settle and get the same result or the same exception.
+
+        Optionally, results of completed calls are cached for ``ttl`` seconds. Exceptions are never cached.
+
+        Args:
+            fcn (callable): function to wrap
+            ttl (numeric): time in seconds to cache the results for. 0 - do not cache results, None - cache them until evicted. Default: 0
+            maxsize (int): maximum number of cached results. Least recently used results are evicted first. 0 - do not cache results,
+                None - no limit. Default: None
+            key (callable): function to calculate the call key from the call arguments. Default: the key is built from the positional and
+                keyword arguments, which must be hashable
+            name (str): name of the object. Default: the function name
+        """
+        Core.__init__(self, name=name or getattr(fcn, "__name__", None))
+        functools.update_wrapper(self, fcn)
+        self.Function = fcn
+        self.TTL = ttl
+        self.MaxSize = maxsize
+        self.KeyFunction = key
+        self.Cache = OrderedDict()         # key -> (result, expiration time or None)
+        self.InFlight = {}                 # key -> Promise
+        self.Hits = self.Misses = self.Coalesced = 0
+
+    def __get__(self, obj, objtype=None):
+        # allows to decorate methods
+        if obj is None:
+            return self
+        return types.MethodType(self, obj)
+
+    @property
+    def caching(self):
+        return self.TTL != 0 and self.MaxSize != 0
+
+    def __call__(self, *params, **args):
+        key = self.KeyFunction(*params, **args) if self.KeyFunction is not None else _make_key(params, args)
+        with self:
+            entry = self.Cache.get(key)
+            if entry is not None:
+                result, expiration = entry
+                if expiration is None or expiration > _monotonic():
+                    self.Cache.move_to_end(key)
+                    self.Hits += 1
+                    return result
+                del self.Cache[key]
+            promise = self.InFlight.get(key)
+            leader = promise is None
+            if leader:
+                self.Misses += 1
+                promise = self.InFlight[key] = Promise(data=key)
+            else:
+                self.Coalesced += 1
+
+        if not leader:
+            return promise.wait()
+
+        try:
+            result = self.Function(*params, **args)
+        except:
+            with self:
+                if self.InFlight.get(key) is promise:
+                    del self.InFlight[key]
+            promise.exception(*sys.exc_info())
+            raise
+        with self:
+            if self.InFlight.get(key) is promise:
+                # the key was not invalidated while the call was in flight
+                del self.InFlight[key]
+                if self.caching:
+                    self.Cache[key] = (result, _monotonic() + self.TTL if self.TTL is not None else None)
+                    if self.MaxSize is not None:
+                        while len(self.Cache) > self.MaxSize:
+                            self.Cache.popitem(last=False)
+        promise.complete(result)
+        return result
+
+    @synchronized
+    def invalidate(self, *params, **args):
+        """Removes the cached result for the given call arguments. If a call with these arguments is in flight, its result will not be
+        cached and new calls will not wait for it.
+        """
+        key = self.KeyFunction(*params, **args) if self.KeyFunction is not None else _make_key(params, args)
+        self.Cache.pop(key, None)
+        self.InFlight.pop(key, None)
+
+    @synchronized
+    def clear(self):
+        """Removes all cached results
+        """
+        self.Cache.clear()
+        self.InFlight.clear()
+
+    @synchronized
+    def stats(self):
+        """
+        Returns:
+            dict: number of cache hits, misses (calls of the function), calls coalesced with in-flight calls, number of
+                cached results and number of calls in flight
+        """
+        return dict(
+            hits = self.Hits,
+            misses = self.Misses,
+            coalesced = self.Coalesced,
+            cached = len(self.Cache),
+            in_flight = len(self.InFlight)
+        )
+
+def singleflight(fcn=None, ttl=0, maxsize=None, key=None):
+    """Decorator, which makes concurrent calls of the function with the same arguments share single call. See ``SingleFlight``.
+    Can be used with or without arguments:
+
+    .. code-block:: python
+
+        @singleflight
+        def fetch_config(name):
+            ...
+
+        @singleflight(ttl=60, maxsize=1000)
+        def compute(x, y):
+            ...
+
+    Args:
+        ttl (numeric): time in seconds to cache the results for. Default: 0 - do not cache, only coalesce concurrent calls
+        maxsize (int): maximum number of cached results. Default: no limit
+        key (callable): function to calculate the call key from the call arguments
+
+    Returns:
+        SingleFlight: the wrapped function
+    """
+    if fcn is None:
+        return lambda f: SingleFlight(f, ttl=ttl, maxsize=maxsize, key=key)
+    return SingleFlight(fcn, ttl=ttl, maxsize=maxsize, key=key)
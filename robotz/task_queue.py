@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from .core import Core, Robot, synchronized
 from .dequeue import DEQueue
 from .promise import Promise
-from threading import Timer
+from .clock import now as _now, monotonic as _monotonic, to_monotonic
 
 class TaskQueueDelegate(object):
     
@@ -22,18 +22,19 @@ class TaskQueueDelegate(object):
         pass
         
 def _after_time(after):
+    # returns monotonic time
     if after is None:   return None
     if isinstance(after, timedelta):
-        after = time.time() + after.totalseconds()
+        return _monotonic() + after.total_seconds()
     elif isinstance(after, datetime):
         after = after.timestamp()
     if after < 10*365*24*3600:  # 1980
-        after = time.time() + after
-    return after
+        return _monotonic() + after
+    return to_monotonic(after)
     
 def _time_interval(interval):
     if isinstance(interval, timedelta):
-        interval = interval.totalseconds()
+        interval = interval.total_seconds()
     return interval
         
 class Task(Core):
@@ -43,7 +44,7 @@ class Task(Core):
 
     def __init__(self, name=None):
         Core.__init__(self, name=name)
-        self.Created = time.time()
+        self.Created = _now()
         self.Queued = None
         self.Started = None
         self.Ended = None
@@ -146,19 +147,19 @@ class Task(Core):
 
     @synchronized
     def _started(self):
-        t = time.time()
-        if self.Started is None:    self.Started = t
+        if self.Started is None:    self.Started = _now()
         if self._Private.RunCount is not None:
             self._Private.RunCount -= 1
-        self._Private.LastStart = t
+        self._Private.LastStart = _monotonic()
         self._Private.LastEnd = None
 
     @synchronized
     def _ended(self):
-        self._Private.LastEnd = self.Ended = time.time()
+        self.Ended = _now()
+        self._Private.LastEnd = _monotonic()
 
     def _queued(self):
-        self.Queued = time.time()
+        self.Queued = _now()
 
     def __rshift__(self, queue):
         if not isinstance(queue, TaskQueue):
@@ -233,7 +234,7 @@ class TaskQueue(Core):
                 self.Queue = None
 
     def __init__(self, nworkers=None, capacity=None, stagger=0.0, tasks = [], delegate=None, 
-                        name=None):
+                        name=None, callback_executor=None):
         """Initializes the TaskQueue object
         
         Args:
@@ -247,6 +248,8 @@ class TaskQueue(Core):
             delegate (object): an object to receive callbacks with task status updates. If None, updates will not be sent.
             name (string): primitive name
             daemon (boolean): Threading daemon flag for the queue internal thread. Default = True
+            callback_executor (object): executor to call the callbacks of the task promises, e.g. ThreadExecutor or AsyncioExecutor.
+                Default: call the callbacks in the task thread
         """
         Core.__init__(self, name=name)
         self.NWorkers = nworkers
@@ -256,6 +259,7 @@ class TaskQueue(Core):
         self.LastStart = 0.0
         self.StartTimer = None
         self.Delegate = delegate
+        self.CallbackExecutor = callback_executor
         self.Stop = False
         for t in tasks:
             self.addTask(t)
@@ -281,7 +285,7 @@ class TaskQueue(Core):
             else:
                 raise ArgumentError("The task argument must be either a callable or a Task subclass instance")
 
-        task._Private.Promise = promise = Promise(data=promise_data)
+        task._Private.Promise = promise = Promise(data=promise_data, executor=self.CallbackExecutor)
 
         task._Private.RunCount = count
         task._Private.RepeatInterval = _time_interval(interval)
@@ -378,9 +382,9 @@ class TaskQueue(Core):
         again = True
         while not (self.Stop or self.Held) and again:
             again = False
-            now = time.time()
+            now = _monotonic()
             if self.Stagger is not None and self.LastStart + self.Stagger > now:
-                self.alarm(self.start_tasks, t = self.LastStart + self.Stagger)
+                self.alarm(self.start_tasks, t = self.LastStart + self.Stagger - now)
             elif self.Queue:
                 nrunning = self.nrunning()
                 if (self.NWorkers is None or nrunning < self.NWorkers):
@@ -397,19 +401,19 @@ class TaskQueue(Core):
                     if next_task is not None:
                         t = self.ExecutorThread(self, next_task)
                         t.kind = "%s.task" % (self.kind,)
-                        self.LastStart = time.time()
+                        self.LastStart = _monotonic()
                         self.call_delegate("taskIsStarting", self, next_task, t)
                         t.start()
                         self.call_delegate("taskStarted", self, next_task, t)
                         again = True
                     elif sleep_until is not None:
-                        self.alarm(self.start_tasks, t=sleep_until)
+                        self.alarm(self.start_tasks, t=sleep_until - now)
 
     def threadEnded(self, task, repeat):
         if not repeat:
             try:    self.Queue.remove(task)
             except ValueError:  pass
-            self.wakeup()               # in case someone is waiting for the queue to be drained
+            self.wakeup(channel="task_ended")               # in case someone is waiting for the queue to be drained
         self.start_tasks()
         
     def call_delegate(self, cb, *params):
@@ -479,6 +483,30 @@ class TaskQueue(Core):
             else:               nwaiting += 1
         return nwaiting, nrunning
     
+    @synchronized
+    def set_workers(self, nworkers):
+        """Changes the maximum number of concurrently running tasks. If the number is reduced, running tasks are not interrupted,
+        but new tasks will not start until the number of running tasks drops below the new limit.
+
+        Args:
+            nworkers (int): new maximum number of concurrently running tasks. None - no limit
+        """
+        self.NWorkers = nworkers
+        self.start_tasks()
+
+    @property
+    def capacity(self):
+        return self.Queue.Capacity
+
+    def set_capacity(self, capacity):
+        """Changes the queue capacity. Tasks stay in the queue while they are running, so the capacity limits the number of
+        running and waiting tasks together. If the capacity is increased, blocked ``append`` and ``insert`` calls may proceed.
+
+        Args:
+            capacity (int): new capacity. None - no limit
+        """
+        self.Queue.set_capacity(capacity)
+
     def hold(self):
         """
         Holds the queue, preventing new tasks from being started
@@ -509,7 +537,7 @@ class TaskQueue(Core):
         """
         # wait until all tasks are done and the queue is empty
         if not self.is_empty():
-            while not self.sleep(function=self.is_empty):
+            while not self.sleep(function=self.is_empty, channel="task_ended"):
                 pass
                 
     join = waitUntilEmpty
@@ -519,7 +547,7 @@ class TaskQueue(Core):
         Blocks until no more tasks are running
         """
         while self.nrunning() > 0:
-            self.sleep(10)
+            self.sleep(10, channel="task_ended")
 
     @synchronized
     def flush(self):
@@ -0,0 +1,78 @@
+from .core import Core, Robot, synchronized
+from .executor import ThreadExecutor
+from .timer_store import HeapTimerStore
+from .clock import monotonic as _monotonic
+
+class TimerService(Robot):
+
+    def __init__(self, executor=None, name="TimerService", timer_store=None):
+        """Process-wide timer service. It keeps all armed timers in a timer store ordered by their firing time and uses single
+        thread to wait for the next timer to become due. Due timers are fired on the ``executor`` threads.
+
+        The service thread is started when the first timer is scheduled.
+
+        Args:
+            executor (object): executor to run the timer functions. Default: new ThreadExecutor with up to 32 threads
+            name (str): name of the service
+            timer_store (object): timer store to keep the timers in, e.g. TimingWheel for large number of short-lived timers.
+                Default: new HeapTimerStore
+        """
+        Robot.__init__(self, name=name, daemon=True)
+        self.Executor = executor if executor is not None else ThreadExecutor(32, name="%s.executor" % (name,))
+        self.Store = timer_store if timer_store is not None else HeapTimerStore()
+        self.WakeUpT = None         # time the service thread sleeps until, None if it is not sleeping or sleeps without time-out
+        self.Started = False
+
+    @synchronized
+    def schedule(self, t, timer):
+        """Schedules the timer to become due at time ``t``. Used by the Timer class.
+
+        Returns:
+            object: timer store handle, which can be used to unschedule the timer
+        """
+        handle = self.Store.push(t, timer)
+        if not self.Started:
+            self.Started = True
+            self.start()
+        elif self.WakeUpT is None or t < self.WakeUpT:
+            self.wakeup()
+        return handle
+
+    @synchronized
+    def unschedule(self, handle):
+        """Removes the timer from the schedule using the handle returned by ``schedule``
+        """
+        self.Store.cancel(handle)
+
+    def __len__(self):
+        return len(self.Store)
+
+    def submit(self, fcn, *params, **args):
+        self.Executor.submit(fcn, *params, **args)
+
+    def run(self):
+        store = self.Store
+        while not self.Stop:
+            with self:
+                now = _monotonic()
+                due = store.pop_due(now)
+                if not due:
+                    self.WakeUpT = next_t = store.next_time()
+                    self.sleep(next_t - now if next_t is not None else None)
+                    self.WakeUpT = None
+            for timer in due:
+                timer._due()
+
+_GlobalTimerServiceLock = Core()
+_GlobalTimerService = None
+
+def global_timer_service(**args):
+    """Returns the process-wide TimerService, creating it if needed. Arguments are passed to the TimerService constructor when
+    the service is created and ignored after that.
+    """
+    global _GlobalTimerService
+    if _GlobalTimerService is None:
+        with _GlobalTimerServiceLock:
+            if _GlobalTimerService is None:
+                _GlobalTimerService = TimerService(**args)
+    return _GlobalTimerService
@@ -0,0 +1,283 @@
+from .clock import monotonic as _monotonic
+import heapq, math
+
+#
+# Timer stores keep items ordered by their due time. They are used by TimerService and Scheduler and are not thread-safe:
+# the owner is responsible for locking. All stores have the same interface:
+#
+#   handle = store.push(t, item)        - adds the item to become due at time t, returns a handle to cancel it
+#   handles = store.bulk_load(entries)  - adds (t, item) pairs, returns the list of handles
+#   store.cancel(handle)                - removes the item from the store
+#   items = store.pop_due(now)          - removes and returns the list of items due at or before ``now``
+#   t = store.next_time()               - time to wake up for the next pop_due() or None if the store is empty
+#   len(store)                          - number of items in the store
+#
+
+class HeapTimerStore(object):
+
+    def __init__(self):
+        """Timer store based on a binary heap. Insert and pop operations are O(log n). Cancelled items are removed lazily,
+        the heap is rebuilt when more than a half of its entries are cancelled.
+        """
+        self.Heap = []          # [[t, seq, item], ...], cancelled entries have item = None
+        self.Seq = 0
+        self.NCancelled = 0
+
+    def push(self, t, item):
+        self.Seq += 1
+        entry = [t, self.Seq, item]
+        heapq.heappush(self.Heap, entry)
+        return entry
+
+    def bulk_load(self, entries):
+        # O(n) for all the entries instead of O(n log n) for pushing them one by one
+        seq = self.Seq
+        loaded = []
+        for t, item in entries:
+            seq += 1
+            loaded.append([t, seq, item])
+        self.Seq = seq
+        self.Heap.extend(loaded)
+        heapq.heapify(self.Heap)
+        return loaded
+
+    def cancel(self, entry):
+        if entry[2] is not None:
+            entry[2] = None
+            self.NCancelled += 1
+            if self.NCancelled > 100 and self.NCancelled > len(self.Heap)//2:
+                self.Heap = [e for e in self.Heap if e[2] is not None]
+                heapq.heapify(self.Heap)
+                self.NCancelled = 0
+
+    def _head(self):
+        heap = self.Heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+            self.NCancelled -= 1
+        return heap[0] if heap else None
+
+    def pop_due(self, now):
+        due = []
+        heap = self.Heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            item = entry[2]
+            if item is None:
+                self.NCancelled -= 1
+            else:
+                entry[2] = None         # the handle can not be cancelled any more
+                due.append(item)
+        return due
+
+    def next_time(self):
+        entry = self._head()
+        return entry[0] if entry is not None else None
+
+    def __len__(self):
+        return len(self.Heap) - self.NCancelled
+
+class TimerHandle(object):
+
+    __slots__ = ("T", "Item", "Tick", "Level", "Slot")
+
+    def __init__(self, t, item, tick):
+        self.T = t
+        self.Item = item
+        self.Tick = tick            # the tick the item becomes due at
+        self.Level = None
+        self.Slot = None            # set of handles the handle is in, or None if the handle is in the overflow heap or was removed
+
+class TimingWheel(object):
+
+    def __init__(self, tick=0.01, wheel_size=256, levels=4, origin=None):
+        """Hierarchical timing wheel timer store. Insert and cancel operations are O(1), which makes it suitable for large number
+        of timers, most of which are cancelled before they fire, e.g. request deadlines.
+
+        Time is divided into ticks of ``tick`` seconds. Level 0 wheel has one slot per tick, each slot of level N wheel covers
+        ``wheel_size**N`` ticks. When the level 0 wheel makes full revolution, the next slot of the level 1 wheel is cascaded down to
+        lower levels and so on. Items due later than the highest level wheel covers are kept in an overflow heap.
+
+        Items are never returned before they are due, but they can be returned up to one tick late.
+
+        Args:
+            tick (numeric): tick resolution in seconds. Default: 0.01
+            wheel_size (int): number of slots in each wheel. Default: 256
+            levels (int): number of wheels. Default: 4, which with default tick and wheel size covers about 16 months
+            origin (numeric): time of tick 0. Default: current monotonic time
+        """
+        self.TickSize = tick
+        self.Size = wheel_size
+        self.NLevels = levels
+        self.Origin = _monotonic() if origin is None else origin
+        self.Tick = 0                       # last processed tick
+        self.Wheels = [[set() for _ in range(wheel_size)] for _ in range(levels)]
+        self.Counts = [0] * levels
+        self.Spans = [wheel_size ** level for level in range(levels + 1)]       # ticks covered by one slot of each level
+        self.Ready = []                     # handles, which were due when pushed or cascaded
+        self.Overflow = []                  # heap of [tick, seq, handle]
+        self.Seq = 0
+        self.N = 0
+
+    def __len__(self):
+        return self.N
+
+    def _place(self, handle):
+        tick = handle.Tick
+        delta = tick - self.Tick
+        if delta <= 0:
+            handle.Level = -1
+            handle.Slot = None
+            self.Ready.append(handle)
+            return
+        size = self.Size
+        if delta < size:
+            # most common case
+            slot = self.Wheels[0][tick % size]
+            slot.add(handle)
+            handle.Level = 0
+            handle.Slot = slot
+            self.Counts[0] += 1
+            return
+        spans = self.Spans
+        for level in range(1, self.NLevels):
+            if delta < spans[level+1]:
+                slot = self.Wheels[level][(tick // spans[level]) % size]
+                slot.add(handle)
+                handle.Level = level
+                handle.Slot = slot
+                self.Counts[level] += 1
+                return
+        handle.Level = self.NLevels
+        handle.Slot = None
+        self.Seq += 1
+        heapq.heappush(self.Overflow, [handle.Tick, self.Seq, handle])
+
+    def push(self, t, item):
+        handle = TimerHandle(t, item, math.ceil((t - self.Origin)/self.TickSize))
+        self._place(handle)
+        self.N += 1
+        return handle
+
+    def bulk_load(self, entries):
+        return [self.push(t, item) for t, item in entries]
+
+    def cancel(self, handle):
+        if handle.Item is None:
+            return          # already cancelled or returned by pop_due
+        handle.Item = None
+        self.N -= 1
+        if handle.Slot is not None:
+            handle.Slot.discard(handle)
+            self.Counts[handle.Level] -= 1
+            handle.Slot = None
+        # handles in Ready list and in the overflow heap are removed lazily
+
+    def _cascade(self):
+        # called when self.Tick is at a level 0 revolution boundary
+        tick = self.Tick
+        spans = self.Spans
+        if tick % spans[self.NLevels] == 0:
+            # move items, which now fit into the wheels, from the overflow heap
+            overflow = self.Overflow
+            limit = tick + spans[self.NLevels]
+            while overflow and overflow[0][0] < limit:
+                _, _, handle = heapq.heappop(overflow)
+                if handle.Item is not None:
+                    self._place(handle)
+        for level in range(self.NLevels-1, 0, -1):
+            if tick % spans[level] == 0:
+                slot = self.Wheels[level][(tick // spans[level]) % self.Size]
+                if slot:
+                    handles = list(slot)
+                    slot.clear()
+                    self.Counts[level] -= len(handles)
+                    for handle in handles:
+                        self._place(handle)
+
+    def _collect(self, due):
+        for handle in self.Ready:
+            item = handle.Item
+            if item is not None:
+                handle.Item = None
+                due.append(item)
+                self.N -= 1
+        self.Ready = []
+
+    def pop_due(self, now):
+        due = []
+        target = math.floor((now - self.Origin)/self.TickSize)
+        size = self.Size
+        spans = self.Spans
+        counts = self.Counts
+        level0 = self.Wheels[0]
+        self._collect(due)
+        while self.Tick < target:
+            # find the lowest non-empty level and skip ticks, which can not have any items
+            level = 0
+            while level < self.NLevels and counts[level] == 0:
+                level += 1
+            if level == 0:
+                self.Tick += 1
+            else:
+                if level < self.NLevels:
+                    next_tick = (self.Tick // spans[level] + 1) * spans[level]
+                else:
+                    # the wheels are empty, go straight to the cascade, which brings the first overflow item into the wheels
+                    next_tick = self._overflow_cascade_tick()
+                    if next_tick is None:
+                        self.Tick = target
+                        break
+                if next_tick > target:
+                    self.Tick = target
+                    break
+                self.Tick = next_tick
+            if self.Tick % size == 0:
+                self._cascade()
+            slot = level0[self.Tick % size]
+            if slot:
+                counts[0] -= len(slot)
+                for handle in slot:
+                    handle.Slot = None
+                    self.Ready.append(handle)
+                slot.clear()
+            if self.Ready:
+                self._collect(due)
+        return due
+
+    def _overflow_cascade_tick(self):
+        # the first tick after the current one, at which the earliest live overflow item will be moved into the wheels, or None
+        overflow = self.Overflow
+        while overflow and overflow[0][2].Item is None:
+            heapq.heappop(overflow)
+        if not overflow:
+            return None
+        span = self.Spans[self.NLevels]
+        return max(self.Tick // span + 1, (overflow[0][0] - span) // span + 1) * span
+
+    def next_time(self):
+        if self.N == 0:
+            return None
+        if any(h.Item is not None for h in self.Ready):
+            return self.Origin + self.Tick * self.TickSize
+        tick = self.Tick
+        size = self.Size
+        spans = self.Spans
+        next_tick = None
+        if self.Counts[0]:
+            level0 = self.Wheels[0]
+            for i in range(1, size + 1):
+                if level0[(tick + i) % size]:
+                    next_tick = tick + i
+                    break
+        # a cascade can bring items due earlier than the level 0 items. Wake up at the next cascade then
+        for level in range(1, self.NLevels + 1):
+            if level < self.NLevels:
+                cascade_tick = (tick // spans[level] + 1) * spans[level] if self.Counts[level] else None
+            else:
+                cascade_tick = self._overflow_cascade_tick()
+            if cascade_tick is not None:
+                if next_tick is None or cascade_tick < next_tick:
+                    next_tick = cascade_tick
+                break
+        return self.Origin + next_tick * self.TickSize if next_tick is not None else None
@@ -0,0 +1,81 @@
+from robotz import AsyncScheduler, run_in_thread
+import asyncio, time, threading
+
+async def main():
+    s = AsyncScheduler(max_concurrent=10)
+    s.start()
+
+    # thousands of periodic coroutine probes on one thread with a concurrency limit
+    state = dict(running=0, max_running=0, runs=0)
+    async def probe():
+        state["running"] += 1
+        state["runs"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+
+    n_threads = threading.active_count()
+    for i in range(2000):
+        s.add(probe, interval=0.5, t=0.001*(i % 100), count=2)
+    await asyncio.sleep(0.3)
+    assert threading.active_count() == n_threads
+    await s.wait_until_empty()
+    print("probe runs:", state["runs"], "max concurrent:", state["max_running"])
+    assert state["runs"] == 4000 and state["max_running"] == 10
+
+    # "stop", relative next time, remove
+    ran = []
+    def stopper():
+        ran.append(time.time())
+        return "stop" if len(ran) == 3 else 0.02
+    s.add(stopper, t=0)
+    removed = s.add(ran.append, "removed", t=0.05)
+    s.remove(removed)
+    await asyncio.sleep(0.2)
+    assert len(ran) == 3 and s.is_empty(), ran
+
+    # sync job in a thread pool, failing job keeps repeating
+    threads = []
+    s.add(run_in_thread(lambda: threads.append(threading.get_ident())), t=0)
+    failures = []
+    class Delegate(object):
+        def jobFailed(self, scheduler, job_id, exc_type, exc_value, tb):
+            failures.append(job_id)
+    s.Delegate = Delegate()
+    def fail():
+        raise ValueError()
+    s.add(fail, interval=0.02, count=3, id="fail")
+    await asyncio.sleep(0.2)
+    assert threads and threads[0] != threading.get_ident()
+    assert failures == ["fail"]*3, failures
+    s.stop()
+
+asyncio.run(main())
+
+#
+# the scheduler runs on the installed clock: an hour of 1 minute jobs in virtual time
+#
+from robotz import VirtualClock, set_clock, now
+clock = VirtualClock()
+set_clock(clock)
+
+async def simulated():
+    s = AsyncScheduler()
+    s.start()
+    runs = []
+    async def job():
+        runs.append(now())
+    t0 = now()
+    s.add(job, interval=60, count=60)
+    await s.wait_until_empty()
+    s.stop()
+    return t0, runs
+
+t_real = time.time()
+t0, runs = asyncio.run(simulated())
+t_real = time.time() - t_real
+set_clock(None)
+print("simulated %.0f sec in %.3f sec" % (runs[-1] - t0, t_real))
+assert len(runs) == 60 and abs(runs[-1] - t0 - 3600) < 1.0
+assert t_real < 10.0
+print("OK")
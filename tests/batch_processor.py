@@ -0,0 +1,140 @@
+from robotz import Processor, BatchProcessor
+import time, threading
+
+lock = threading.Lock()
+
+class Squares(BatchProcessor):
+
+    def __init__(self, **args):
+        BatchProcessor.__init__(self, **args)
+        self.Batches = []
+
+    def process_batch(self, items):
+        with lock:
+            self.Batches.append(len(items))
+        time.sleep(0.01)            # per batch cost
+        if "fail" in items:
+            raise ValueError("bad item in batch")
+        return [x*x for x in items]
+
+#
+# full batches
+#
+p = Squares(max_workers=2, max_batch=10, max_delay=None)
+promises = [p.put(i) for i in range(100)]
+assert [promise.wait() for promise in promises] == [i*i for i in range(100)]
+assert p.Batches == [10]*10, p.Batches
+assert sorted(p.Output.pop() for _ in range(100)) == [i*i for i in range(100)]
+
+#
+# partial batch is flushed after max_delay
+#
+p = Squares(max_batch=10, max_delay=0.1)
+t0 = time.time()
+promises = [p.put(i) for i in range(3)]
+assert [promise.wait() for promise in promises] == [0, 1, 4]
+dt = time.time() - t0
+print("partial batch processed after %.3f sec" % (dt,))
+assert 0.09 < dt < 0.3
+assert p.Batches == [3]
+
+#
+# exception goes to all the items of the batch
+#
+p = Squares(max_batch=3, max_delay=None)
+promises = [p.put(x) for x in [1, "fail", 2, 3, 4, 5]]
+failed = []
+for promise in promises:
+    try:
+        promise.wait()
+    except ValueError:
+        failed.append(True)
+    else:
+        failed.append(False)
+assert failed == [True, True, True, False, False, False]
+
+#
+# join() processes the partial batch
+#
+p = Squares(max_batch=100, max_delay=None)
+promises = [p.put(i) for i in range(5)]
+p.join()
+assert all(promise.wait() is not None for promise in promises) and p.Batches == [5]
+
+#
+# batching is cheaper per item than processing items one by one
+#
+class OneByOne(Processor):
+    def process(self, x):
+        time.sleep(0.01)
+        return x
+
+p = OneByOne(max_workers=4)
+t0 = time.time()
+for promise in [p.put(i) for i in range(200)]:
+    promise.wait()
+t_single = time.time() - t0
+p = Squares(max_workers=4, max_batch=50, max_delay=0.01)
+t0 = time.time()
+for promise in [p.put(i) for i in range(200)]:
+    promise.wait()
+t_batch = time.time() - t0
+print("200 items: one by one: %.3f sec, in batches: %.3f sec" % (t_single, t_batch))
+assert t_batch < t_single
+
+#
+# Processor delivers exceptions to the promise
+#
+class Failing(Processor):
+    def process(self, x):
+        raise KeyError(x)
+try:
+    Failing().put(1).wait(timeout=5)
+except KeyError:
+    pass
+else:
+    assert False, "KeyError expected"
+
+#
+# batch put times out: promises of all the items of the batch fail
+#
+go = threading.Event()
+
+class Blocking(BatchProcessor):
+    def process_batch(self, items):
+        go.wait()
+        return items
+
+p = Blocking(max_workers=1, queue_capacity=1, max_batch=2, max_delay=None)
+first = [p.put(0), p.put(1)]            # occupies the worker queue
+second = [p.put(2)]
+try:
+    p.put(3, timeout=0.1)
+except RuntimeError:
+    pass
+else:
+    assert False, "time-out expected"
+try:
+    second[0].wait(timeout=1.0)
+except RuntimeError:
+    pass
+else:
+    assert False, "promise of the dropped batch must fail"
+go.set()
+assert [promise.wait(timeout=1.0) for promise in first] == [0, 1]
+
+#
+# partial batch flushed by the timer does not block the timer service when the worker queue is full
+#
+from robotz import Timer
+go.clear()
+p = Blocking(max_workers=1, queue_capacity=1, max_batch=2, max_delay=0.05)
+first = [p.put(0), p.put(1)]
+partial = p.put(2)
+time.sleep(0.1)
+fired = threading.Event()
+Timer(fired.set, t=0.01)
+assert fired.wait(1.0), "timer service is blocked"
+go.set()
+assert partial.wait(timeout=1.0) == 2
+print("OK")
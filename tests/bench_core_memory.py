@@ -0,0 +1,45 @@
+#
+# Memory and creation time for many Promise objects
+#
+# usage: python bench_core_memory.py [N]
+#
+import sys, time, tracemalloc, gc
+from robotz import Promise, LockPool, SlotCore
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+class SlotPrimitive(SlotCore):
+    __slots__ = ("Value",)
+
+    def __init__(self, **args):
+        SlotCore.__init__(self, **args)
+        self.Value = None
+
+def measure(title, create):
+    gc.collect()
+    gc.disable()
+    t0 = time.perf_counter()
+    objects = [create() for _ in range(N)]
+    dt = time.perf_counter() - t0
+    del objects
+    gc.collect()
+    tracemalloc.start()
+    objects = [create() for _ in range(N)]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    gc.enable()
+    print("%-40s create: %6.3f us/object   memory: %6.0f bytes/object" % (title, dt/N*1e6, memory/N))
+
+pool = LockPool()
+
+print("N =", N)
+measure("Promise()", lambda: Promise())
+measure("Promise(lock=LockPool)", lambda: Promise(lock=pool))
+measure("SlotCore subclass", lambda: SlotPrimitive())
+measure("SlotCore subclass, lock=LockPool", lambda: SlotPrimitive(lock=pool))
+
+# lazily created objects still work
+p = Promise(lock=pool)
+p.complete(1)
+assert p.wait() == 1
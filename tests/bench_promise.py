@@ -0,0 +1,56 @@
+#
+# Cost of the Promise life cycle operations
+#
+# usage: python bench_promise.py [N]
+#
+import sys, time
+from threading import Thread
+from robotz import Promise
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+def measure(title, run):
+    t0 = time.perf_counter()
+    run()
+    dt = time.perf_counter() - t0
+    print("%-40s %7.3f us/promise" % (title, dt/N*1e6))
+
+def create_complete():
+    for i in range(N):
+        Promise().complete(i)
+
+def create_complete_wait():
+    for i in range(N):
+        p = Promise()
+        p.complete(i)
+        p.wait()
+
+def create_callback_complete():
+    cb = lambda promise, result: None
+    for i in range(N):
+        Promise().oncomplete(cb).complete(i)
+
+def create_then_complete():
+    for i in range(N):
+        p = Promise()
+        p.then(lambda promise, result: None)
+        p.complete(i)
+
+def blocked_wait():
+    n = N//10
+    promises = [Promise() for _ in range(n)]
+    def complete():
+        for i, p in enumerate(promises):
+            p.complete(i)
+    t = Thread(target=complete)
+    t.start()
+    for i, p in enumerate(promises):
+        assert p.wait() == i
+    t.join()
+
+print("N =", N)
+measure("create + complete", create_complete)
+measure("create + complete + wait", create_complete_wait)
+measure("create + oncomplete + complete", create_callback_complete)
+measure("create + then + complete", create_then_complete)
+measure("wait in another thread (N/10)", blocked_wait)
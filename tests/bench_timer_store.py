@@ -0,0 +1,55 @@
+#
+# Insert, cancel and fire rates of the timer stores
+#
+# usage: python bench_timer_store.py [N]
+#
+import sys, time, random
+from robotz import HeapTimerStore, TimingWheel
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+def measure(title, run):
+    t0 = time.perf_counter()
+    run()
+    dt = time.perf_counter() - t0
+    print("    %-36s %7.3f us/timer" % (title, dt/N*1e6))
+
+def bench(name, make_store):
+    print(name)
+    origin = 1000.0
+    times = [origin + random.random()*30.0 for _ in range(N)]      # deadlines within 30 seconds
+
+    store = make_store(origin)
+    handles = []
+    measure("insert", lambda: handles.extend(store.push(t, i) for i, t in enumerate(times)))
+    measure("cancel", lambda: [store.cancel(h) for h in handles])
+    assert len(store) == 0
+
+    store = make_store(origin)
+    for i, t in enumerate(times):
+        store.push(t, i)
+    fired = []
+    def fire():
+        now = origin
+        while len(store):
+            now += 0.01
+            fired.extend(store.pop_due(now))
+    measure("fire (10 ms steps)", fire)
+    assert len(fired) == N
+
+    # per-request deadlines: 90% of the timers are cancelled before they fire
+    store = make_store(origin)
+    def deadlines():
+        now = origin
+        handles = []
+        for i, t in enumerate(times):
+            handles.append(store.push(now + 5.0, i))
+            if i % 10:
+                store.cancel(handles[-1])
+            if i % 1000 == 0:
+                now += 0.01
+                store.pop_due(now)
+    measure("deadlines (90% cancelled)", deadlines)
+
+bench("HeapTimerStore", lambda origin: HeapTimerStore())
+bench("TimingWheel", lambda origin: TimingWheel(tick=0.01, origin=origin))
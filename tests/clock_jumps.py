@@ -0,0 +1,108 @@
+from robotz import RealClock, set_clock, Timer, TimerService, Scheduler, TaskQueue, DEQueue, Core, Timeout
+import time, threading
+
+#
+# system clock steps, e.g. by NTP, must not make timers fire in bursts or stall
+#
+
+class JumpingClock(RealClock):
+
+    def __init__(self):
+        self.Offset = 0.0
+
+    def time(self):
+        return time.time() + self.Offset
+
+clock = JumpingClock()
+set_clock(clock)
+
+def jump(dt):
+    clock.Offset += dt
+
+def jumping(fcn, *params):
+    # runs fcn while the clock jumps forward and back
+    def jumper():
+        time.sleep(0.1)
+        jump(3600)
+        time.sleep(0.1)
+        jump(-7200)
+    jumper_thread = threading.Thread(target=jumper)
+    jumper_thread.start()
+    try:
+        return fcn(*params)
+    finally:
+        jumper_thread.join()
+        clock.Offset = 0.0
+
+#
+# periodic Timer
+#
+ticks = []
+def tick_timer():
+    timer = Timer(lambda: ticks.append(time.monotonic()), interval=0.05, service=TimerService())
+    time.sleep(0.5)
+    timer.cancel()
+jumping(tick_timer)
+gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+print("timer ticks:", len(ticks), "max gap: %.3f" % (max(gaps),))
+assert 8 <= len(ticks) <= 11 and max(gaps) < 0.1
+
+#
+# Scheduler interval job and a job scheduled for absolute wall clock time
+#
+runs = []
+absolute = []
+def scheduler_jobs():
+    s = Scheduler()
+    s.add(lambda: runs.append(time.monotonic()), interval=0.05)
+    t0 = time.monotonic()
+    s.add(lambda: absolute.append(time.monotonic() - t0), t=clock.time() + 0.35)     # converted when submitted
+    time.sleep(0.5)
+    s.stop()
+jumping(scheduler_jobs)
+print("scheduler runs:", len(runs), "absolute time job ran after: %.3f" % (absolute[0],))
+assert 8 <= len(runs) <= 11
+assert len(absolute) == 1 and 0.33 < absolute[0] < 0.45
+
+#
+# TaskQueue delayed task
+#
+started = []
+def task_queue():
+    q = TaskQueue(2)
+    t0 = time.monotonic()
+    q.append(lambda: started.append(time.monotonic() - t0), after=0.3)
+    q.join()
+jumping(task_queue)
+print("delayed task started after: %.3f" % (started[0],))
+assert 0.28 < started[0] < 0.4
+
+#
+# time-outs
+#
+def timeout():
+    t0 = time.monotonic()
+    try:
+        Core().sleep_until(lambda: False, timeout=0.3)
+    except Timeout:
+        pass
+    return time.monotonic() - t0
+dt = jumping(timeout)
+print("sleep_until timed out after: %.3f" % (dt,))
+assert 0.28 < dt < 0.4
+
+def full_queue():
+    q = DEQueue(1)
+    q.append(1)
+    t0 = time.monotonic()
+    try:
+        q.append(2, timeout=0.3)
+    except RuntimeError:
+        pass
+    return time.monotonic() - t0
+dt = jumping(full_queue)
+print("DEQueue.append timed out after: %.3f" % (dt,))
+assert 0.28 < dt < 0.4
+
+set_clock(None)
+print("OK")
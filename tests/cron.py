@@ -0,0 +1,69 @@
+from robotz import CronExpression, Scheduler
+from robotz.clock import to_wall
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import time
+
+def ts(*args, tz=timezone.utc):
+    return datetime(*args, tzinfo=tz).timestamp()
+
+utc = timezone.utc
+
+c = CronExpression("*/5 * * * *")
+assert c.next_after(ts(2024, 1, 1, 10, 3, 30), utc) == ts(2024, 1, 1, 10, 5)
+assert c.next_after(ts(2024, 1, 1, 10, 5), utc) == ts(2024, 1, 1, 10, 10)         # strictly after
+assert c.upcoming(3, ts(2024, 12, 31, 23, 52), utc) == [ts(2024, 12, 31, 23, 55), ts(2025, 1, 1, 0, 0), ts(2025, 1, 1, 0, 5)]
+
+# day of month and day of week: either matches
+c = CronExpression("0 9 13 * fri")
+days = [datetime.fromtimestamp(t, utc) for t in c.upcoming(6, ts(2024, 9, 1), utc)]
+assert all(d.day == 13 or d.weekday() == 4 for d in days) and days[0] == datetime(2024, 9, 6, 9, tzinfo=utc), days
+
+# leap day, ranges, lists, names, aliases
+assert CronExpression("0 0 29 2 *").next_after(ts(2024, 3, 1), utc) == ts(2028, 2, 29)
+assert CronExpression("30 8-10/2 * jan-mar mon,wed").upcoming(2, ts(2024, 1, 1), utc) == [ts(2024, 1, 1, 8, 30), ts(2024, 1, 1, 10, 30)]
+assert CronExpression("@daily").next_after(ts(2024, 1, 1, 0, 0), utc) == ts(2024, 1, 2)
+for bad in ("* * *", "60 * * * *", "* * 0 * *", "*/0 * * * *"):
+    try:    CronExpression(bad)
+    except ValueError:  pass
+    else:   assert False, bad
+
+# time zones, daylight saving time
+chicago = ZoneInfo("America/Chicago")
+c = CronExpression("30 2 * * *")
+t = c.next_after(ts(2024, 3, 9, 12, tz=chicago), chicago)
+assert t == ts(2024, 3, 10, 2, 30, tz=chicago)      # non-existent local time on DST day maps to 3:30 CDT
+c = CronExpression("30 1 * * *")
+times = c.upcoming(2, ts(2024, 11, 2, 12, tz=chicago), chicago)
+assert times[1] - times[0] == 24*3600 + 3600 and len(set(times)) == 2
+
+# bulk computation
+t0 = time.perf_counter()
+times = CronExpression("*/5 9-17 * * mon-fri").upcoming(10000, ts(2024, 1, 1), utc)
+print("10000 upcoming times: %.3f sec" % (time.perf_counter() - t0,))
+assert times == sorted(times)
+
+# cron job in Scheduler. Job times are monotonic, compare them with the wall clock times with a tolerance
+def close(a, b):
+    return abs(a - b) < 0.01
+
+s = Scheduler()
+ran = []
+promise = s.add_cron("* * * * *", ran.append, "tick", tz=utc)
+job = promise.Data
+assert job in s.jobs() and close(to_wall(job.NextT), CronExpression("* * * * *").next_after(time.time(), utc))
+assert 0 < to_wall(job.NextT) - time.time() <= 60
+s.remove(job)
+run, next_t = job.due(job.NextT)        # the next run time is calculated from the expression
+assert run and close(next_t, job.NextT + 60)
+run, next_t = job.due(job.NextT + 150)  # missed two runs, coalesce
+assert run and close(next_t, job.NextT + 180) and job.NMissed == 2
+s.stop()
+
+# the default start time comes from the installed clock
+from robotz import VirtualClock, set_clock
+set_clock(VirtualClock(t=datetime(2030, 1, 1, 12, 7, tzinfo=timezone.utc).timestamp()))
+assert CronExpression("*/15 * * * *").upcoming(2, tz=timezone.utc) == \
+    [datetime(2030, 1, 1, 12, m, tzinfo=timezone.utc).timestamp() for m in (15, 30)]
+set_clock(None)
+print("OK")
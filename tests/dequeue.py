@@ -0,0 +1,90 @@
+from robotz import DEQueue, RWLock
+from threading import Thread
+import time
+
+#
+# many consumers and producers on a bounded queue. Each append wakes up one getter, each pop wakes up one putter
+#
+
+q = DEQueue(capacity=5)
+nconsumers = 200
+nitems = 20000
+received = []
+
+def consume():
+    n = 0
+    for item in q:
+        n += 1
+    received.append(n)
+
+def produce(n):
+    for i in range(n):
+        q.append(i)
+
+consumers = [Thread(target=consume) for _ in range(nconsumers)]
+producers = [Thread(target=produce, args=(nitems//4,)) for _ in range(4)]
+t0 = time.time()
+for t in consumers + producers:    t.start()
+for t in producers:     t.join()
+while len(q):
+    time.sleep(0.01)
+q.close()
+for t in consumers:     t.join()
+print("%d items delivered to %d consumers in %.3f seconds" % (sum(received), nconsumers, time.time() - t0))
+assert sum(received) == nitems
+
+#
+# producers timing out do not swallow the wake-ups meant for other blocked producers
+#
+import random
+q = DEQueue(1)
+done = []
+timed_out = []
+
+def patient(i):
+    q.append(("patient", i))
+    done.append(i)
+
+def impatient(i):
+    try:
+        q.append(("impatient", i), timeout=random.random()*0.02)
+    except RuntimeError:
+        timed_out.append(i)
+
+producers = [Thread(target=patient, args=(i,)) for i in range(20)] + [Thread(target=impatient, args=(i,)) for i in range(50)]
+random.shuffle(producers)
+for t in producers:     t.start()
+received = 0
+t1 = time.time() + 5.0
+while len(done) < 20 and time.time() < t1:
+    if len(q):
+        q.pop()
+        received += 1
+    time.sleep(random.random()*0.002)
+for t in producers:     t.join(1.0)
+print("patient producers done: %d, impatient timed out: %d" % (len(done), len(timed_out)))
+assert len(done) == 20
+
+#
+# RWLock: exclusive waiters are woken up when shared locks are released
+#
+lock = RWLock()
+log = []
+
+def reader():
+    with lock.shared:
+        time.sleep(0.1)
+        log.append("r")
+
+def writer():
+    with lock.exclusive:
+        log.append("w")
+
+readers = [Thread(target=reader) for _ in range(3)]
+for t in readers:   t.start()
+time.sleep(0.02)
+w = Thread(target=writer)
+w.start()
+for t in readers + [w]:     t.join()
+assert log == ["r", "r", "r", "w"], log
+print("OK")
@@ -0,0 +1,78 @@
+from robotz import Core, synchronized, DEQueue, enable_lock_profiling, disable_lock_profiling, lock_profile_report
+from robotz.lock_profiler import Profiler
+from threading import Thread
+import time
+
+class Counter(Core):
+
+    def __init__(self, name):
+        Core.__init__(self, name=name)
+        self.N = 0
+
+    @synchronized
+    def slow_increment(self):
+        time.sleep(0.001)
+        self.N += 1
+
+    @synchronized
+    def fast_increment(self):
+        self.N += 1
+
+hot = Counter("hot")
+cold = Counter("cold")
+queue = DEQueue()
+
+def worker():
+    for _ in range(100):
+        hot.slow_increment()
+        cold.fast_increment()
+        queue.append(1)
+        queue.pop()
+
+enable_lock_profiling()
+
+threads = [Thread(target=worker) for _ in range(5)]
+for t in threads:   t.start()
+for t in threads:   t.join()
+
+disable_lock_profiling()
+
+report = lock_profile_report()
+print(Profiler.format_report())
+print()
+print(Profiler.format_report(methods=True))
+
+assert hot.N == cold.N == 500
+assert report[0]["key"] == ("Counter", "hot")
+assert report[0]["contended"] > 0
+
+# profiling is off: nothing more is recorded
+acquired = report[0]["acquired"]
+hot.slow_increment()
+assert lock_profile_report()[0]["acquired"] == acquired
+
+# a thread sleeping on the Core does not hide the hold time of another thread
+class Sleeper(Core):
+
+    @synchronized
+    def wait(self):
+        self.sleep(1.0)
+
+    @synchronized
+    def hold(self):
+        time.sleep(0.2)
+        self.wakeup()
+
+Profiler.reset()
+enable_lock_profiling()
+sleeper = Sleeper(name="sleeper")
+t = Thread(target=sleeper.wait)
+t.start()
+time.sleep(0.05)
+sleeper.hold()
+t.join()
+disable_lock_profiling()
+stats = [d for d in lock_profile_report() if d["key"] == ("Sleeper", "sleeper")][0]
+print("max hold while another thread sleeps: %.3f" % (stats["max_hold"],))
+assert stats["max_hold"] > 0.15
+print("OK")
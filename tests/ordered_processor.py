@@ -0,0 +1,134 @@
+from robotz import Processor, BatchProcessor
+import time, random, threading
+
+class RandomDelay(Processor):
+
+    def process(self, x):
+        time.sleep(random.random()*0.01)
+        if x == 13:
+            raise ValueError(x)
+        return x
+
+#
+# results are delivered in the input order
+#
+p = RandomDelay(max_workers=8, ordered=True)
+promises = [p.put(i) for i in range(100)]
+out = [p.Output.pop() for _ in range(99)]
+assert out == [i for i in range(100) if i != 13], out
+try:
+    promises[13].wait()
+except ValueError:
+    pass
+else:
+    assert False, "ValueError expected"
+
+# not ordered processor delivers in completion order
+p = RandomDelay(max_workers=8)
+for i in range(100):
+    p.put(i)
+out = [p.Output.pop() for _ in range(99)]
+assert sorted(out) == [i for i in range(100) if i != 13] and out != sorted(out)
+
+#
+# reorder limit: one slow item blocks put
+#
+class SlowFirst(Processor):
+
+    def process(self, x):
+        if x == 0:
+            time.sleep(0.3)
+        return x
+
+p = SlowFirst(max_workers=8, ordered=True, reorder_limit=10)
+put_times = []
+t0 = time.time()
+for i in range(20):
+    p.put(i)
+    put_times.append(time.time() - t0)
+print("put times: %.3f %.3f" % (put_times[9], put_times[10]))
+assert put_times[9] < 0.1 and put_times[10] > 0.25
+assert len(p.Reorder) <= 10
+assert [p.Output.pop() for _ in range(20)] == list(range(20))
+
+# put time-out
+p = SlowFirst(max_workers=8, ordered=True, reorder_limit=2)
+p.put(0)
+p.put(1)
+try:
+    p.put(2, timeout=0.1)
+except Exception as e:
+    print("put timed out:", type(e).__name__)
+else:
+    assert False, "time-out expected"
+
+#
+# put time-out does not leave a gap in the output order
+#
+go = threading.Event()
+
+class Blocking(Processor):
+
+    def process(self, x):
+        if x == 0:
+            go.wait()
+        return x
+
+p = Blocking(max_workers=1, queue_capacity=2, ordered=True)
+p.put(0)
+p.put(1)
+try:
+    p.put(2, timeout=0.1)
+except RuntimeError:
+    pass
+else:
+    assert False, "time-out expected"
+go.set()
+for i in range(3, 8):
+    p.put(i)
+assert [p.Output.pop() for _ in range(7)] == [0, 1, 3, 4, 5, 6, 7]
+assert p.NextOut == p.NextSeq and not p.Reorder
+
+# same for a batch, which could not be queued: its items fail, later items are delivered
+class BlockingBatches(BatchProcessor):
+
+    def process_batch(self, items):
+        if 0 in items:
+            go.wait()
+        return items
+
+go.clear()
+p = BlockingBatches(max_workers=1, queue_capacity=1, max_batch=2, max_delay=None, ordered=True)
+first = [p.put(0), p.put(1)]
+dropped = p.put(2)
+try:
+    p.put(3, timeout=0.1)
+except RuntimeError:
+    pass
+else:
+    assert False, "time-out expected"
+go.set()
+later = [p.put(i) for i in range(4, 8)]
+assert [promise.wait(timeout=1.0) for promise in first + later] == [0, 1, 4, 5, 6, 7]
+try:
+    dropped.wait(timeout=1.0)
+except RuntimeError:
+    pass
+else:
+    assert False, "promise of the dropped batch must fail"
+assert [p.Output.pop() for _ in range(6)] == [0, 1, 4, 5, 6, 7]
+
+#
+# ordered batches
+#
+class Batches(BatchProcessor):
+
+    def process_batch(self, items):
+        time.sleep(random.random()*0.02)
+        return items
+
+p = Batches(max_workers=4, max_batch=5, max_delay=0.01, ordered=True, reorder_limit=20)
+for i in range(100):
+    p.put(i)
+assert [p.Output.pop() for _ in range(100)] == list(range(100))
+print("OK")
@@ -0,0 +1,87 @@
+from robotz import Processor, BatchProcessor, Pipeline
+import time
+
+class Stage(Processor):
+
+    def __init__(self, workers, delay, name):
+        Processor.__init__(self, workers, name=name)
+        self.Delay = delay
+
+    def process(self, x):
+        time.sleep(self.Delay)
+        return x + 1
+
+class Sum(BatchProcessor):
+
+    def process_batch(self, items):
+        return [sum(items)] + [None]*(len(items)-1)
+
+#
+# end of stream propagates through the stages
+#
+pipeline = Stage(2, 0.001, "parse") | Stage(4, 0.01, "slow") | Stage(2, 0.001, "write")
+assert isinstance(pipeline, Pipeline) and len(pipeline.Stages) == 3
+for i in range(100):
+    pipeline.put(i)
+pipeline.close()
+out = list(pipeline)            # ends when the last stage closes its output
+assert sorted(out) == list(range(3, 103)), out
+pipeline.join()
+
+#
+# backpressure and the bottleneck stage
+#
+pipeline = Stage(2, 0.001, "fast") | Stage(2, 0.02, "slow") | Stage(2, 0.001, "fast2")
+max_queued = 0
+t0 = time.time()
+for i in range(100):
+    pipeline.put(i)
+    max_queued = max(max_queued, len(pipeline.Queues[1]))
+t_put = time.time() - t0
+pipeline.close()
+n = sum(1 for _ in pipeline)
+stats = pipeline.stats()
+for s in stats:
+    print("%(name)-6s workers: %(workers)s processed: %(processed)4d throughput: %(throughput)6.1f/sec utilization: %(utilization).2f" % s)
+print("put time: %.3f sec, max queued in front of the slow stage: %d" % (t_put, max_queued))
+assert n == 100
+assert max_queued == pipeline.Capacity                  # the queue in front of the slow stage fills up
+assert t_put > 0.5                                      # put is slowed down to the slow stage rate, ~1 sec for 100 items
+assert pipeline.bottleneck().Name == "slow"
+assert all(s["running"] == 0 and s["waiting"] == 0 for s in stats)
+
+#
+# batching stage
+#
+pipeline = Pipeline(Stage(4, 0, "inc"), Sum(max_batch=10, max_delay=None), capacity=5)
+for i in range(100):
+    pipeline.put(i)
+pipeline.close()
+assert sum(pipeline) == sum(range(1, 101))
+
+#
+# processor in front of a pipeline
+#
+tail = Stage(2, 0, "b") | Stage(2, 0, "c")
+pipeline = Stage(2, 0, "a") | tail
+assert pipeline is tail and [stage.Name for stage in pipeline.Stages] == ["a", "b", "c"]
+assert pipeline.Queues[0] is None and all(q is not None for q in pipeline.Queues[1:])
+for i in range(20):
+    pipeline.put(i)
+pipeline.close()
+assert sorted(pipeline) == list(range(3, 23))
+
+# pipelines are not stages
+try:
+    Stage(1, 0, "x") | Stage(1, 0, "y") | (Stage(1, 0, "z") | Stage(1, 0, "w"))
+except TypeError:
+    pass
+else:
+    assert False, "TypeError expected"
+
+# stages with their own queue capacity keep it
+own = Processor(2, queue_capacity=5)
+unlimited = Processor(2)
+Pipeline(own, unlimited)
+assert own.queue_capacity == 5 and unlimited.queue_capacity == 2
+print("OK")
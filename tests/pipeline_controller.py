@@ -0,0 +1,88 @@
+from robotz import Processor, Pipeline, PipelineController
+import time, threading
+
+class Stage(Processor):
+
+    def __init__(self, workers, delay, name):
+        Processor.__init__(self, workers, name=name)
+        self.Delay = delay
+
+    def process(self, x):
+        time.sleep(self.Delay)
+        return x
+
+def run(pipeline, duration):
+    # feeds the pipeline for the duration, returns the throughput over the second half of the run
+    done = []
+    def reader():
+        for _ in pipeline:
+            done.append(time.monotonic())
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    t0 = time.monotonic()
+    i = 0
+    while time.monotonic() < t0 + duration:
+        pipeline.put(i)
+        i += 1
+    pipeline.close()
+    reader_thread.join()
+    t1 = t0 + duration/2
+    return sum(1 for t in done if t1 <= t < t0 + duration)/(duration/2)
+
+#
+# workers move to the slow stage
+#
+stages = lambda: (Stage(4, 0.002, "parse"), Stage(4, 0.02, "slow"), Stage(4, 0.005, "write"))
+static = run(Pipeline(*stages()), 2.0)
+
+pipeline = Pipeline(*stages())
+controller = PipelineController(pipeline, max_threads=12, interval=0.1, patience=2, cooldown=1)
+controlled = run(pipeline, 2.0)
+controller.stop()
+controller.join()
+workers = [stage.workers for stage in pipeline.Stages]
+events = controller.events()
+for e in events:
+    print("%(action)s %(source)s -> %(target)s workers: %(workers)s" % e)
+print("throughput: static: %.1f/sec, controlled: %.1f/sec, workers: %s" % (static, controlled, workers))
+assert sum(workers) == 12 and min(workers) >= 1
+assert workers[1] > 4 and workers[1] == max(workers)
+assert events and all(e["target"] == "slow" for e in events if e["action"] == "move")
+assert controlled > static*1.3
+
+#
+# balanced pipeline: hysteresis prevents moving workers back and forth
+#
+pipeline = Pipeline(Stage(4, 0.01, "a"), Stage(4, 0.01, "b"), Stage(4, 0.01, "c"))
+controller = PipelineController(pipeline, interval=0.1)
+run(pipeline, 1.0)
+controller.stop()
+print("balanced pipeline events:", len(controller.events()))
+assert len(controller.events()) <= 1
+assert sum(stage.workers for stage in pipeline.Stages) == 12
+
+#
+# spare budget goes to the bottleneck, excess workers are trimmed
+#
+pipeline = Pipeline(Stage(1, 0.001, "fast"), Stage(1, 0.02, "slow"))
+controller = PipelineController(pipeline, max_threads=6, start=False)
+for _ in range(20):
+    for _ in range(3):
+        pipeline.put(0)
+    controller.step()
+    time.sleep(0.02)
+assert pipeline.Stages[1].workers > 1
+assert all(e["action"] == "grow" and e["target"] == "slow" for e in controller.events())
+
+pipeline = Pipeline(Stage(6, 0.001, "a"), Stage(2, 0.001, "b"))
+controller = PipelineController(pipeline, max_threads=4, start=False)
+assert [stage.workers for stage in pipeline.Stages] == [2, 2]
+assert [e["action"] for e in controller.events()] == ["trim"]*4
+
+try:
+    PipelineController(Pipeline(Processor(), Stage(2, 0, "b")))
+except ValueError:
+    pass
+else:
+    assert False, "ValueError expected"
+print("OK")
@@ -0,0 +1,75 @@
+from robotz import Promise, Timeout
+from threading import Thread
+import time
+
+#
+# completion, callbacks and chaining
+#
+events = []
+
+class Callback(object):
+
+    def oncomplete(self, promise, result):
+        events.append(("callback", result))
+
+p = Promise()
+p.oncomplete(lambda promise, result: events.append(("oncomplete", result)))
+p.addCallback(Callback())
+chained = p.then(lambda promise, result: events.append(("then", result)))
+p.complete(1)
+assert p.Complete and p.done and not p.Cancelled
+assert p.wait() == 1 and chained.wait() == 1
+assert events == [("oncomplete", 1), ("callback", 1), ("then", 1)], events
+
+# callbacks added after completion are called immediately
+p.oncomplete(lambda promise, result: events.append(("late", result)))
+assert events[-1] == ("late", 1)
+
+# the promise settles only once
+p.complete(2)
+p.cancel()
+assert p.wait() == 1 and p.State == "complete"
+
+#
+# exceptions
+#
+p = Promise()
+chained = p.then()
+try:    raise ValueError("test")
+except ValueError as e:
+    p.exception(type(e), e, e.__traceback__)
+for promise in (p, chained):
+    try:    promise.wait()
+    except ValueError:  pass
+    else:   assert False, "exception was not raised"
+
+# exception handled by a callback is not raised by wait()
+p = Promise().onexception(lambda promise, *exc_info: True)
+try:    raise ValueError("test")
+except ValueError as e:
+    p.exception(type(e), e, e.__traceback__)
+assert p.wait() is None
+
+#
+# cancellation
+#
+p = Promise()
+cancelled = []
+p.oncancel(lambda promise: cancelled.append(promise))
+chained = p.then()
+p.cancel()
+assert p.Cancelled and chained.Cancelled and cancelled == [p]
+assert p.wait() is None
+
+#
+# waiting in another thread, time-out
+#
+p = Promise()
+Thread(target=lambda: (time.sleep(0.1), p.complete("done"))).start()
+assert p.wait() == "done"
+
+try:    Promise().wait(timeout=0.1)
+except Timeout: pass
+else:   assert False, "Timeout was not raised"
+
+print("OK")
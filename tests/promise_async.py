@@ -0,0 +1,56 @@
+from robotz import Promise, TaskQueue
+import asyncio, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+queue = TaskQueue(10)
+
+def slow_square(x):
+    time.sleep(0.1)
+    return x*x
+
+def fail():
+    raise ValueError("test")
+
+async def main():
+    nthreads = threading.active_count()
+
+    # await many promises completed by TaskQueue threads, without a helper thread per promise
+    promises = [queue.append(slow_square, i).promise for i in range(20)]
+    results = await asyncio.gather(*promises)
+    assert results == [i*i for i in range(20)], results
+
+    try:    await queue.append(fail).promise
+    except ValueError:  pass
+    else:   assert False, "exception was not raised"
+
+    p = Promise()
+    threading.Timer(0.05, p.cancel).start()
+    try:    await p
+    except asyncio.CancelledError:  pass
+    else:   assert False, "CancelledError was not raised"
+
+    # asyncio future -> Promise
+    future = asyncio.get_running_loop().create_future()
+    promise = Promise.from_future(future)
+    future.set_result("async result")
+    await asyncio.sleep(0)
+    assert promise.wait() == "async result"
+
+asyncio.run(main())
+
+# concurrent.futures.Future <-> Promise
+with ThreadPoolExecutor(2) as pool:
+    promise = Promise.from_future(pool.submit(slow_square, 3))
+    assert promise.wait() == 9
+
+p = Promise()
+future = p.to_future()
+p.complete(5)
+assert future.result() == 5
+
+p = Promise()
+future = p.to_future()
+future.cancel()
+assert p.Cancelled
+
+print("OK")
@@ -0,0 +1,74 @@
+#
+# Stress test: delivery through very long then() chains, callbacks called with the promise unlocked
+#
+import sys, time
+from threading import Thread
+from robotz import Promise
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+# completion
+head = Promise()
+tail = head
+for _ in range(N):
+    tail = tail.then()
+t0 = time.time()
+head.complete("result")
+print("%d-long chain completed in %.3f seconds" % (N, time.time() - t0))
+assert tail.wait() == "result"
+
+# exception
+head = Promise()
+tail = head
+for _ in range(N):
+    tail = tail.then()
+try:    raise ValueError("test")
+except ValueError as e:
+    head.exception(type(e), e, e.__traceback__)
+try:    tail.wait()
+except ValueError:  pass
+else:   assert False, "exception was not propagated"
+
+# cancellation
+head = Promise()
+tail = head
+for _ in range(N):
+    tail = tail.then()
+head.cancel()
+assert tail.Cancelled
+
+# callbacks are called after the promise lock is released: a callback can wait for another thread,
+# which uses the same promise
+p = Promise()
+added = []
+
+def slow_callback(promise, result):
+    t = Thread(target=lambda: promise.oncancel(lambda p: None) and added.append(True))
+    t.start()
+    t.join(5.0)
+    assert not t.is_alive(), "promise is locked while the callback is running"
+
+p.oncomplete(slow_callback)
+p.complete(1)
+assert added == [True]
+
+# a failing callback does not leave the promise settling, the other callbacks and the chained promises are still delivered
+def failing_callback(promise, result):
+    raise RuntimeError("callback failed")
+
+class Recorder(object):
+    def __init__(self):
+        self.Results = []
+    def oncomplete(self, promise, result):
+        self.Results.append(result)
+
+p = Promise()
+recorder = Recorder()
+p.oncomplete(failing_callback)
+p.addCallback(recorder)
+chained = p.then()
+p.complete(5)
+assert p.wait(timeout=1.0) == 5 and p.done
+assert recorder.Results == [5]
+assert chained.wait(timeout=1.0) == 5
+print("OK")
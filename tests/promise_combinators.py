@@ -0,0 +1,101 @@
+from robotz import Promise, Timeout
+from threading import Thread
+import time
+
+def fail(p, message="test"):
+    try:    raise ValueError(message)
+    except ValueError as e:
+        p.exception(type(e), e, e.__traceback__)
+
+#
+# all
+#
+inputs = [Promise() for _ in range(3)]
+combined = Promise.all(inputs)
+inputs[2].complete(2); inputs[0].complete(0)
+assert not combined.done
+inputs[1].cancel()
+assert combined.wait() == [0, None, 2]
+
+inputs = [Promise() for _ in range(3)]
+combined = Promise.all(*inputs)
+fail(inputs[1])                 # fails fast, without waiting for the others
+try:    combined.wait()
+except ValueError:  pass
+else:   assert False
+
+assert Promise.all().wait() == []
+
+# single overall deadline
+t0 = time.time()
+combined = Promise.all([Promise() for _ in range(10)], timeout=0.2)
+try:    combined.wait()
+except Timeout: pass
+else:   assert False
+assert time.time() - t0 < 0.5
+
+# then/chain work on combined promises
+inputs = [Promise() for _ in range(2)]
+results = []
+Promise.all(inputs).then(lambda p, result: results.append(result))
+inputs[0].complete("a"); inputs[1].complete("b")
+assert results == [["a", "b"]]
+
+#
+# any
+#
+inputs = [Promise() for _ in range(3)]
+combined = Promise.any(inputs)
+fail(inputs[0])
+assert not combined.done
+inputs[2].complete("first")
+inputs[1].complete("second")
+assert combined.wait() == "first"
+
+inputs = [Promise() for _ in range(2)]
+combined = Promise.any(inputs)
+fail(inputs[0], "first"); fail(inputs[1], "last")
+try:    combined.wait()
+except ValueError as e: assert str(e) == "last"
+else:   assert False
+
+inputs = [Promise() for _ in range(2)]
+combined = Promise.any(inputs)
+inputs[0].cancel(); inputs[1].cancel()
+assert combined.Cancelled
+
+#
+# race
+#
+inputs = [Promise() for _ in range(3)]
+combined = Promise.race(inputs)
+fail(inputs[1])
+inputs[0].complete(0)
+try:    combined.wait()
+except ValueError:  pass
+else:   assert False
+
+#
+# settled
+#
+inputs = [Promise() for _ in range(3)]
+combined = Promise.settled(inputs)
+inputs[0].complete(0); fail(inputs[1]); inputs[2].cancel()
+states = combined.wait()
+assert [s for s, _ in states] == ["complete", "failed", "cancelled"]
+assert states[0][1] == 0 and isinstance(states[1][1], ValueError) and states[2][1] is None
+
+#
+# fan-in of many promises completed by another thread
+#
+n = 100000
+inputs = [Promise() for _ in range(n)]
+t0 = time.time()
+combined = Promise.all(inputs, timeout=60)
+def complete():
+    for i, p in enumerate(inputs):
+        p.complete(i)
+Thread(target=complete).start()
+assert combined.wait() == list(range(n))
+print("Promise.all over %d promises: %.3f seconds" % (n, time.time() - t0))
+print("OK")
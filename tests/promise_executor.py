@@ -0,0 +1,87 @@
+from robotz import Promise, ThreadExecutor, AsyncioExecutor, TaskQueue
+import asyncio, threading, time
+
+#
+# callbacks called by a thread pool do not block the thread completing the promise
+#
+executor = ThreadExecutor(4, name="callbacks")
+called = []
+done = threading.Event()
+
+def slow_callback(promise, result):
+    time.sleep(0.2)
+    called.append((threading.get_ident(), result))
+    done.set()
+
+p = Promise(executor=executor)
+p.oncomplete(slow_callback)
+chained = p.then(lambda promise, result: called.append(("then", result)))
+t0 = time.time()
+p.complete(1)
+assert time.time() - t0 < 0.1, "complete() blocked by the callback"
+assert chained.wait(1.0) == 1
+assert done.is_set() and called[0] == (called[0][0], 1) and called[0][0] != threading.get_ident()
+assert called[1] == ("then", 1)         # chained promise is settled after the callbacks
+
+# callbacks added after completion are called by the executor too
+late = threading.Event()
+p.oncomplete(lambda promise, result: late.set())
+assert late.wait(1.0)
+
+stats = executor.stats()
+print("thread executor:", stats)
+assert stats["executed"] >= 2 and stats["max_queue_delay"] >= 0.0
+
+#
+# callbacks called by an asyncio loop
+#
+async def main():
+    loop = asyncio.get_running_loop()
+    executor = AsyncioExecutor(loop)
+    loop_thread = threading.get_ident()
+    threads = []
+    p = Promise(executor=executor)
+    p.oncomplete(lambda promise, result: threads.append(threading.get_ident()))
+    threading.Thread(target=p.complete, args=("x",)).start()
+    assert await p == "x"
+    await asyncio.sleep(0.01)
+    assert threads == [loop_thread], threads
+    print("asyncio executor:", executor.stats())
+
+asyncio.run(main())
+
+#
+# TaskQueue callback executor
+#
+executor = ThreadExecutor(2, name="task_callbacks")
+queue = TaskQueue(4, callback_executor=executor)
+results = []
+lock = threading.Lock()
+
+def add_result(promise, result):
+    with lock:
+        results.append(result)
+
+go = threading.Event()
+
+def task(x):
+    go.wait()
+    return x
+
+promises = [queue.append(task, i).promise.oncomplete(add_result) for i in range(20)]
+go.set()
+for p in promises:
+    p.wait(1.0)
+time.sleep(0.1)
+assert sorted(results) == list(range(20)), results
+print("task queue callbacks:", executor.stats())
+
+# a callback raising an exception on the executor thread does not prevent the promise from settling
+def failing(promise, result):
+    raise RuntimeError("callback failed")
+
+p = Promise(executor=executor).oncomplete(failing)
+chained = p.then()
+p.complete(3)
+assert p.wait(1.0) == 3 and chained.wait(1.0) == 3
+print("OK")
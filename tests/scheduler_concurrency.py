@@ -0,0 +1,64 @@
+from robotz import Scheduler
+import time, threading
+
+lock = threading.Lock()
+running = 0
+max_running = 0
+ran = []
+
+def job(i, duration=0.1):
+    global running, max_running
+    with lock:
+        running += 1
+        max_running = max(max_running, running)
+    time.sleep(duration)
+    with lock:
+        running -= 1
+        ran.append(i)
+
+#
+# queue: a burst of due jobs does not exceed max_concurrent threads
+#
+s = Scheduler(max_concurrent=5)
+n_threads = threading.active_count()
+for i in range(50):
+    s.add(job, i, t=0)
+time.sleep(0.05)
+assert threading.active_count() <= n_threads + 5 + 1
+time.sleep(1.2)
+assert sorted(ran) == list(range(50)) and max_running == 5, (len(ran), max_running)
+stats = s.stats()
+print("queue:", stats)
+assert stats["delayed"] == 45 and stats["waiting"] == 0 and stats["running"] == 0
+s.stop()
+
+#
+# skip: one-time jobs over the limit are cancelled
+#
+ran = []; max_running = 0
+s = Scheduler(max_concurrent=2, overflow="skip")
+promises = [s.add(job, i, t=0) for i in range(10)]
+time.sleep(0.3)
+assert len(ran) == 2 and sum(p.Cancelled for p in promises) == 8, ran
+print("skip:", s.stats())
+s.stop()
+
+#
+# coalesce: runs of the same job waiting for a thread are merged
+#
+ran = []; max_running = 0
+s = Scheduler(max_concurrent=1, overflow="coalesce")
+s.add(job, "blocker", 0.3, t=0)
+time.sleep(0.05)
+promises = [s.add(job, "same", 0.01, t=0, id="same") for _ in range(5)]
+for _ in range(5):
+    time.sleep(0.02)
+    promises.append(s.add(job, "same", 0.01, t=0, id="same"))
+time.sleep(0.5)
+assert ran == ["blocker", "same"], ran
+# a scheduled job is replaced by the job with the same id, a waiting one is coalesced
+assert all(p.Complete or p.Cancelled for p in promises) and promises[-1].Complete
+print("coalesce:", s.stats())
+assert s.stats()["coalesced"] >= 1
+s.stop()
+print("OK")
@@ -0,0 +1,56 @@
+from robotz import Scheduler
+import time, threading
+
+#
+# jobs fire in time order, removed and cancelled jobs do not fire
+#
+fired = []
+lock = threading.Lock()
+
+def fire(i):
+    with lock:
+        fired.append(i)
+
+s = Scheduler()
+for i in range(20):
+    s.add(fire, i, t=0.2 - i*0.005, id="job%d" % (i,))
+s.remove("job3")
+s.jobs()[0].cancel()             # job19 fires first
+time.sleep(0.4)
+assert sorted(fired) == [i for i in range(19) if i != 3], fired
+assert s.is_empty()
+
+#
+# repeating job, cancelled while running
+#
+ticks = []
+def tick():
+    ticks.append(time.time())
+    time.sleep(0.05)
+
+promise = s.add(tick, interval=0.1, t=0)
+time.sleep(0.25)
+job = promise.Data
+job.cancel()
+n = len(ticks)
+time.sleep(0.3)
+assert len(ticks) <= n + 1 and s.is_empty(), (n, len(ticks))
+
+#
+# 200k scheduled jobs: add, remove and wake-up cost
+#
+s = Scheduler()
+n = 200000
+t0 = time.time()
+promises = [s.add(fire, i, t=3600 + i*0.001) for i in range(n)]
+t1 = time.time()
+for p in promises[::2]:
+    s.remove(p.Data)
+t2 = time.time()
+print("add: %.2f us/job, remove: %.2f us/job" % ((t1-t0)/n*1e6, (t2-t1)/(n//2)*1e6))
+t0 = time.time()
+for _ in range(1000):
+    s.run_jobs()
+print("wake-up with %d jobs scheduled: %.2f us" % (len(s.jobs()), (time.time()-t0)/1000*1e6))
+s.stop()
+print("OK")
@@ -0,0 +1,48 @@
+from robotz import Scheduler, Histogram
+import time
+
+h = Histogram([1, 2, 5, 10])
+for v in (0.5, 1.5, 1.7, 3, 20):
+    h.add(v)
+snap = h.snapshot()
+assert snap["count"] == 5 and snap["max"] == 20 and snap["min"] == 0.5
+assert snap["buckets"] == [(1, 1), (2, 2), (5, 1), (None, 1)], snap["buckets"]
+assert snap["p50"] == 2 and snap["p99"] == 20
+
+class Delegate(object):
+    def __init__(self):
+        self.Late = []
+    def jobLate(self, scheduler, job_id, lateness):
+        self.Late.append((job_id, lateness))
+
+delegate = Delegate()
+s = Scheduler(max_concurrent=1, delegate=delegate, late_threshold=0.05, job_metrics=True)
+s.add(time.sleep, 0.1, interval=0.2, t=0, id="sleeper")
+s.add(time.sleep, 0.01, interval=0.2, t=0, id="other")       # waits for the thread, starts late
+for i in range(100):
+    s.add(lambda: None, t=3600, id="idle%d" % (i,))
+time.sleep(0.5)
+snap = s.snapshot()
+print("lateness:", {k: v for k, v in snap["lateness"].items() if k != "buckets"})
+print("duration:", {k: v for k, v in snap["duration"].items() if k != "buckets"})
+print("timeline depth:", snap["timeline_depth"]["buckets"])
+print("late jobs:", delegate.Late)
+assert snap["lateness"]["count"] >= 4 and snap["duration"]["max"] >= 0.1
+assert snap["jobs"]["sleeper"]["duration"]["count"] >= 2
+assert snap["jobs"]["other"]["lateness"]["max"] >= 0.05
+assert delegate.Late and all(job_id == "other" for job_id, _ in delegate.Late)
+assert snap["timeline_depth"]["min"] >= 100
+s.snapshot(reset=True)
+assert s.snapshot()["lateness"]["count"] == 0
+s.stop()
+
+# per job histograms are not allocated by default, job stats are still collected
+s = Scheduler()
+promise = s.add(time.sleep, 0.05, interval=0.1, t=0, id="sleeper")
+time.sleep(0.3)
+job = promise.Data
+assert job.Lateness is None and job.Duration is None and "jobs" not in s.snapshot()
+stats = job.stats()
+assert stats["runs"] >= 2 and stats["max_duration"] >= 0.05 and 0.05 <= stats["avg_duration"] < 0.1
+s.stop()
+print("OK")
@@ -0,0 +1,81 @@
+from robotz import Scheduler
+from robotz.Scheduler import Job
+import time, threading
+
+#
+# misfire policies
+#
+def job(misfire, grace=None):
+    return Job(None, "j", 100.0, 1.0, 0.0, None, None, (), {}, misfire=misfire, grace=grace)
+
+j = job("catch_up")
+assert j.due(102.5) == (True, 101.0)
+j = job("coalesce")
+assert j.due(102.5) == (True, 103.0) and j.NMissed == 2
+j = job("skip")
+assert j.due(102.5) == (False, 103.0) and j.NMissed == 3
+assert j.due(100.5) == (True, 101.0)          # on time
+j = job("catch_up", grace=1.0)
+assert j.due(102.5) == (False, 101.0) and j.NMisfired == 1
+
+#
+# overlap policies
+#
+def run_policy(overlap):
+    lock = threading.Lock()
+    state = dict(running=0, max_running=0, runs=0)
+    def slow():
+        with lock:
+            state["running"] += 1
+            state["runs"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        time.sleep(0.25)
+        with lock:
+            state["running"] -= 1
+    s = Scheduler()
+    promise = s.add(slow, interval=0.1, t=0, overlap=overlap)
+    time.sleep(1.0)
+    promise.Data.cancel()
+    time.sleep(0.3)
+    stats = s.stats()
+    s.stop()
+    print("%-6s runs: %d, max concurrent: %d, %s" % (overlap, state["runs"], state["max_running"], promise.Data.stats()))
+    return state, stats
+
+state, stats = run_policy("skip")
+assert state["max_running"] == 1 and 3 <= state["runs"] <= 5 and stats["overlapped"] >= 5
+state, stats = run_policy("queue")
+assert state["max_running"] == 1 and 4 <= state["runs"] <= 6
+state, stats = run_policy("allow")
+assert state["max_running"] >= 2 and state["runs"] >= 9
+
+#
+# runs skipped because of the overlap do not count against the job count
+#
+for overlap in ("skip", "queue"):
+    runs = []
+    def counted():
+        runs.append(time.time())
+        time.sleep(0.08)
+    s = Scheduler()
+    s.add(counted, interval=0.05, t=0, count=5, overlap=overlap)
+    time.sleep(1.0)
+    print("count=5, overlap=%s: %d runs" % (overlap, len(runs)))
+    assert len(runs) == 5 and s.is_empty(), (overlap, len(runs))
+    s.stop()
+
+#
+# the job function can still return the next run time or "stop"
+#
+ran = []
+def twice():
+    ran.append(time.time())
+    if len(ran) >= 2:
+        return "stop"
+    return 0.05
+s = Scheduler()
+s.add(twice, interval=10, t=0)
+time.sleep(0.2)
+assert len(ran) == 2 and s.is_empty()
+s.stop()
+print("OK")
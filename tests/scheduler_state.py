@@ -0,0 +1,94 @@
+from robotz import Scheduler, register_job_function, HeapTimerStore
+import time, json, threading
+
+lock = threading.Lock()
+runs = []
+
+@register_job_function
+def record(name):
+    with lock:
+        runs.append((name, time.time()))
+
+def not_registered():
+    pass
+
+s = Scheduler(start=False)
+s.add(record, "interval", id="interval", interval=0.2, t=0.1, jitter=0.05, count=5, tags=["x"])
+s.add_cron("*/5 * * * *", record, "cron", id="cron", count=3)
+s.add(record, "paused", id="paused", interval=1.0, t=0.1, tags=["p"])
+s.pause_tag("p")
+s.add(not_registered, id="unregistered", t=100)
+interval_job = s.Jobs["interval"]
+interval_job.Count = 4              # as if it already ran once
+
+state = json.loads(json.dumps(s.save_state()))
+assert state["skipped"] == ["unregistered"]
+assert len(state["jobs"]) == 3
+s.stop()
+
+s = Scheduler()
+promises = s.restore_state(state)
+assert len(promises) == 3
+job = s.Jobs["interval"]
+# saved times are converted to the wall clock time and back
+assert abs(job.NextT - interval_job.NextT) < 0.001 and abs(job.BaseT - interval_job.BaseT) < 0.001
+assert (job.Count, job.Jitter, job.Tags) == (4, 0.05, frozenset(["x"]))
+assert s.Jobs["cron"].Cron.Expression == "*/5 * * * *"
+assert "paused" in s.Paused and "paused" not in s.Jobs
+s.resume_tag("p")
+time.sleep(1.2)
+with lock:
+    names = [name for name, _ in runs]
+print("runs after restore:", names)
+assert names.count("interval") == 4
+assert names.count("paused") >= 1
+s.stop()
+
+# unknown function
+try:
+    Scheduler(start=False).restore_state(dict(jobs=[dict(state["jobs"][0], function="no.such.function")]))
+except ValueError:
+    pass
+else:
+    assert False, "ValueError expected"
+
+#
+# restore vs. adding jobs one by one
+#
+N = 100000
+s = Scheduler(start=False)
+now = time.time()
+for i in range(N):
+    s.add(record, i, t=now + 1000 + i % 997, interval=60)
+state = s.save_state()
+
+t0 = time.time()
+restored = Scheduler(start=False)
+restored.restore_state(state)
+t_restore = time.time() - t0
+
+t0 = time.time()
+added = Scheduler(start=False)
+for saved in state["jobs"]:
+    added.add(record, *saved["params"], t=saved["t"], interval=saved["interval"])
+t_add = time.time() - t0
+print(f"{N} jobs: restore: {t_restore:.3f} sec, add: {t_add:.3f} sec")
+assert len(restored.Jobs) == N and len(restored.Timeline) == N
+assert restored.Timeline.next_time() == min(job.NextT for job in restored.Jobs.values())
+
+# restored jobs get per job histograms
+source = Scheduler(start=False)
+for i in range(10):
+    source.add(record, i, t=1000, interval=60, id="job%d" % (i,))
+metrics = Scheduler(start=False, job_metrics=True)
+metrics.restore_state(source.save_state())
+snap = metrics.snapshot(reset=True)
+assert sorted(snap["jobs"]) == ["job%d" % (i,) for i in range(10)]
+assert all(job["lateness"]["count"] == 0 for job in snap["jobs"].values())
+
+# bulk loaded heap is still a valid heap
+store = HeapTimerStore()
+store.push(5, "a")
+store.bulk_load([(3, "b"), (7, "c"), (1, "d")])
+assert store.pop_due(10) == ["d", "b", "a", "c"]
+print("OK")
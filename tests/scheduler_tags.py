@@ -0,0 +1,82 @@
+from robotz import Scheduler
+import time, threading
+
+lock = threading.Lock()
+runs = {}
+
+def count(name):
+    with lock:
+        runs[name] = runs.get(name, 0) + 1
+
+def nruns(name):
+    with lock:
+        return runs.get(name, 0)
+
+s = Scheduler()
+for i in range(5):
+    s.add(count, "a", id=f"a{i}", interval=0.1, t=0.05, tags=["a", "all"])
+    s.add(count, "b", id=f"b{i}", interval=0.1, t=0.05, tags=["b", "all"])
+assert len(s.jobs(tag="a")) == 5 and len(s.jobs(tag="all")) == 10
+
+#
+# pause and resume
+#
+time.sleep(0.3)
+assert s.pause_tag("a") == 5
+assert s.pause_tag("a") == 0                # already paused
+time.sleep(0.1)
+paused_runs = nruns("a")
+time.sleep(0.4)
+print("runs while paused:", nruns("a") - paused_runs, "b runs:", nruns("b"))
+assert nruns("a") == paused_runs
+assert len(s.jobs()) == 5 and len(s.jobs(tag="a")) == 5 and s.stats()["paused"] == 5
+assert s.resume_tag("a") == 5
+time.sleep(0.3)
+assert nruns("a") > paused_runs
+assert len(s.jobs()) == 10 and s.stats()["paused"] == 0
+
+#
+# reschedule
+#
+assert s.reschedule_tag("b", delta=100) == 5
+b_runs = nruns("b")
+time.sleep(0.3)
+assert nruns("b") == b_runs
+assert all(j.NextT > time.monotonic() + 90 for j in s.jobs(tag="b"))
+s.reschedule_tag("b", t=0.05)
+time.sleep(0.3)
+assert nruns("b") > b_runs
+
+#
+# remove, including paused jobs
+#
+s.pause_tag("b")
+assert s.remove_tag("all") == 10
+assert s.is_empty() and not s.jobs(tag="a") and not s.jobs(tag="b") and s.stats()["paused"] == 0
+time.sleep(0.2)
+a_runs, b_runs = nruns("a"), nruns("b")
+time.sleep(0.3)
+assert (nruns("a"), nruns("b")) == (a_runs, b_runs)
+
+# replaced job is removed from its tags
+s.add(count, "c", id="c", t=100, tags=["old"])
+s.add(count, "c", id="c", t=100, tags=["new"])
+assert not s.jobs(tag="old") and len(s.jobs(tag="new")) == 1
+s.remove("c")
+assert not s.jobs(tag="new")
+s.stop()
+
+#
+# bulk operations on many jobs
+#
+s = Scheduler(start=False)
+for i in range(50000):
+    s.add(count, "x", t=1000, tags=["even" if i % 2 == 0 else "odd"])
+t0 = time.time()
+s.pause_tag("even")
+s.resume_tag("even")
+s.reschedule_tag("odd", delta=10)
+s.remove_tag("odd")
+print("bulk operations on 50000 jobs:", time.time() - t0)
+assert len(s.jobs()) == 25000 and len(s.jobs(tag="even")) == 25000
+print("OK")
@@ -0,0 +1,85 @@
+from robotz import singleflight
+from threading import Thread
+import time
+
+#
+# concurrent identical calls share one call
+#
+calls = []
+
+@singleflight
+def fetch(name):
+    calls.append(name)
+    time.sleep(0.2)
+    return "config:" + name
+
+results = []
+threads = [Thread(target=lambda: results.append(fetch("a"))) for _ in range(50)]
+for t in threads:   t.start()
+for t in threads:   t.join()
+assert results == ["config:a"]*50 and calls == ["a"], calls
+stats = fetch.stats()
+print("coalescing:", stats)
+assert stats["misses"] == 1 and stats["coalesced"] == 49 and stats["cached"] == 0
+fetch("a")
+assert len(calls) == 2           # not cached
+
+#
+# exceptions are shared by the waiters and not cached
+#
+@singleflight
+def fail(x):
+    time.sleep(0.1)
+    raise ValueError(x)
+
+errors = []
+def call_fail():
+    try:    fail(1)
+    except ValueError as e:
+        errors.append(e)
+threads = [Thread(target=call_fail) for _ in range(5)]
+for t in threads:   t.start()
+for t in threads:   t.join()
+assert len(errors) == 5 and fail.stats()["misses"] == 1
+call_fail()
+assert fail.stats()["misses"] == 2
+
+#
+# TTL and LRU
+#
+computed = []
+
+@singleflight(ttl=0.2, maxsize=2)
+def compute(x, y=0):
+    computed.append((x, y))
+    return x + y
+
+assert compute(1) == 1 and compute(1) == 1 and compute(2, y=1) == 3
+assert computed == [(1, 0), (2, 1)]
+compute(3)                      # evicts (1,)
+compute(1)
+assert computed[-1] == (1, 0) and len(computed) == 4
+time.sleep(0.25)
+compute(1)
+assert len(computed) == 5       # expired
+compute.invalidate(1)
+compute(1)
+assert len(computed) == 6
+print("caching:", compute.stats())
+assert compute.stats()["hits"] == 1
+
+#
+# methods
+#
+class Service(object):
+    def __init__(self):
+        self.Calls = 0
+
+    @singleflight(ttl=None)
+    def get(self, x):
+        self.Calls += 1
+        return x*2
+
+s = Service()
+assert s.get(2) == 4 and s.get(2) == 4 and s.Calls == 1
+print("OK")
@@ -0,0 +1,100 @@
+from robotz import TimingWheel, HeapTimerStore, TimerService, Timer, Scheduler
+import random, time, threading
+
+#
+# both stores return the same items and never return an item early
+#
+random.seed(1)
+for store in (HeapTimerStore(), TimingWheel(tick=0.01, wheel_size=8, levels=2, origin=0.0)):
+    now = 0.0
+    alive = {}
+    handles = {}
+    for step in range(5000):
+        op = random.random()
+        if op < 0.5:
+            t = now + random.choice([0.05, 1.0, 10.0, 100.0]) * random.random()
+            handles[step] = store.push(t, step)
+            alive[step] = t
+        elif op < 0.7 and alive:
+            k = random.choice(list(alive))
+            store.cancel(handles.pop(k))
+            del alive[k]
+        else:
+            now += random.random()*0.5
+            for k in store.pop_due(now):
+                assert alive.pop(k) <= now
+            assert all(t > now - 0.01 for t in alive.values())
+            assert len(store) == len(alive)
+            next_t = store.next_time()
+            assert next_t is None or not alive or next_t <= min(alive.values()) + 0.01
+
+#
+# small wheels and large time jumps: the wheel returns the same items as the heap, at most one tick late, and jumping over
+# empty time does not take time proportional to the jump
+#
+random.seed(2)
+for wheel_size, levels in ((2, 1), (8, 1), (4, 2), (8, 3), (256, 4)):
+    tick = 0.01
+    heap, wheel = HeapTimerStore(), TimingWheel(tick=tick, wheel_size=wheel_size, levels=levels, origin=0.0)
+    now = 0.0
+    handles = {}
+    heap_due, wheel_due = set(), set()
+    t0 = time.time()
+    for step in range(3000):
+        op = random.random()
+        if op < 0.45:
+            t = now + random.choice([0.05, 1.0, 100.0, 1e4, 1e7]) * random.random()
+            handles[step] = (heap.push(t, (step, t)), wheel.push(t, (step, t)))
+        elif op < 0.6 and handles:
+            k = random.choice(list(handles))
+            for store, handle in zip((heap, wheel), handles.pop(k)):
+                store.cancel(handle)
+        else:
+            now += random.choice([0.1, 10.0, 1e5, 1e8]) * random.random()
+            returned = heap.pop_due(now)
+            heap_due.update(returned)
+            new = wheel.pop_due(now)
+            assert all(t <= now for _, t in new)
+            wheel_due.update(new)
+            assert wheel_due <= heap_due
+            assert all(t > now - tick*1.01 for _, t in heap_due - wheel_due)
+            for k, _ in returned:
+                handles.pop(k)          # not cancelled any more, the wheel may return it up to one tick later
+            next_t = wheel.next_time()
+            assert (next_t is None) == (len(wheel) == 0)
+    now += 1e9
+    heap_due.update(heap.pop_due(now))
+    wheel_due.update(wheel.pop_due(now))
+    assert heap_due == wheel_due and len(heap) == len(wheel) == 0
+    dt = time.time() - t0
+    print("wheel size %3d, levels %d: %d items, %.3f sec" % (wheel_size, levels, len(heap_due), dt))
+    assert dt < 5.0
+
+wheel = TimingWheel(tick=0.01, wheel_size=8, levels=1, origin=0.0)
+t0 = time.time()
+assert wheel.pop_due(1e5) == [] and wheel.pop_due(1e9) == []
+wheel.push(2e9, "far")
+assert wheel.pop_due(2e9 - 1) == [] and wheel.pop_due(2e9 + 1) == ["far"]
+assert time.time() - t0 < 0.1
+
+#
+# Timer and Scheduler with the timing wheel
+#
+fired = []
+service = TimerService(timer_store=TimingWheel(tick=0.005), name="WheelTimerService")
+timers = [Timer(fired.append, i, t=0.1 + i*0.001, service=service) for i in range(100)]
+for t in timers[::2]:
+    t.cancel()
+time.sleep(0.3)
+assert sorted(fired) == list(range(1, 100, 2)), fired
+
+ran = []
+s = Scheduler(timer_store=TimingWheel(tick=0.005))
+for i in range(20):
+    s.add(ran.append, i, t=0.05 + i*0.005)
+s.add(ran.append, "late", t=0.2)
+s.remove(s.jobs()[-1])
+time.sleep(0.3)
+assert sorted(ran) == list(range(20)), ran
+s.stop()
+print("OK")
@@ -0,0 +1,106 @@
+from robotz import Timer, Core, global_timer_service
+import threading, time
+
+#
+# thousands of armed timers share one service thread
+#
+
+fired = []
+lock = threading.Lock()
+
+def fire(i):
+    with lock:
+        fired.append(i)
+
+n = 5000
+timers = [Timer(fire, i, t=0.2 + (i % 100)/1000.0) for i in range(n)]
+for t in timers[::2]:
+    t.cancel()
+print("threads with %d armed timers: %d" % (n//2, threading.active_count()))
+assert threading.active_count() < 10
+time.sleep(0.5)
+assert sorted(fired) == list(range(1, n, 2)), len(fired)
+print("threads after firing:", threading.active_count())
+
+#
+# periodic timer with pause, resume and cancel
+#
+
+ticks = []
+periodic = Timer(lambda: ticks.append(time.time()), interval=0.05)
+time.sleep(0.28)
+periodic.pause()
+n_paused = len(ticks)
+time.sleep(0.2)
+assert len(ticks) <= n_paused + 1
+periodic.resume()
+time.sleep(0.12)
+periodic.cancel()
+n_cancelled = len(ticks)
+time.sleep(0.15)
+assert len(ticks) == n_cancelled
+assert not periodic.is_alive()
+print("periodic timer fired", len(ticks), "times")
+
+#
+# onexception and join
+#
+
+errors = []
+def fail():
+    raise ValueError("test")
+
+t = Timer(fail, t=0.05, onexception=lambda *exc_info: errors.append(exc_info[1]))
+t.join(1.0)
+assert len(errors) == 1 and isinstance(errors[0], ValueError)
+
+#
+# Core.alarm
+#
+
+class Alarmed(Core):
+
+    def __init__(self):
+        Core.__init__(self)
+        self.Rang = 0
+
+    def ring(self):
+        self.Rang += 1
+
+a = Alarmed()
+a.alarm(a.ring, t=0.05)
+a.alarm(a.ring, t=0.1)          # replaces the first alarm
+time.sleep(0.2)
+assert a.Rang == 1
+
+#
+# LogFile flush timer: periodic flushing, close() and garbage collection
+#
+
+import gc, os, tempfile, weakref
+from robotz import LogFile
+
+path = os.path.join(tempfile.mkdtemp(), "test.log")
+log = LogFile(path, append=True, flush_interval=0.05)
+log.File.write("unflushed\n")
+time.sleep(0.2)
+assert "unflushed" in open(path).read()
+log.File.write("unflushed again\n")
+time.sleep(0.2)
+assert "unflushed again" in open(path).read()
+assert log.FlushTimer.is_alive()
+
+timer = log.FlushTimer
+log.close()
+assert log.File is None and log.FlushTimer is None and not timer.is_alive()
+
+log = LogFile(path, append=True, flush_interval=0.05)
+timer = log.FlushTimer
+ref = weakref.ref(log)
+del log
+gc.collect()
+assert ref() is None
+assert not timer.is_alive()
+
+print("timers in service:", len(global_timer_service()))
+print("OK")
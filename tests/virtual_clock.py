@@ -0,0 +1,77 @@
+from robotz import VirtualClock, set_clock, now, Scheduler, Timer, TaskQueue, Core, Timeout, TimerService
+import time, threading
+
+clock = VirtualClock()
+set_clock(clock)
+real_start = time.time()
+
+#
+# a day of Scheduler runs
+#
+t0 = now()
+lock = threading.Lock()
+runs = []
+
+def record(name):
+    with lock:
+        runs.append((name, now() - t0))
+
+s = Scheduler()
+s.add(record, "minute", interval=60, t=60, count=24*60)
+s.add(record, "hour", interval=3600, t=3600, count=24)
+s.join()
+time.sleep(0.1)         # the last run may be still running
+with lock:
+    minutes = [t for name, t in runs if name == "minute"]
+    hours = [t for name, t in runs if name == "hour"]
+print("minute runs:", len(minutes), "hour runs:", len(hours), "simulated hours:", (now() - t0)/3600)
+assert minutes == [60.0*(i+1) for i in range(24*60)]
+assert hours == [3600.0*(i+1) for i in range(24)]
+assert s.snapshot()["lateness"]["max"] == 0.0
+s.stop()
+
+#
+# Timer
+#
+t0 = now()
+ticks = []
+done = threading.Event()
+def tick():
+    ticks.append(now() - t0)
+    if len(ticks) == 10:
+        done.set()
+timer = Timer(tick, interval=30, service=TimerService())
+while not done.is_set():
+    clock.sleep(1)
+timer.cancel()
+assert ticks == [30.0*(i+1) for i in range(10)], ticks
+
+#
+# TaskQueue delayed and repeated tasks
+#
+t0 = now()
+started = []
+q = TaskQueue(5)
+q.append(lambda: started.append(now() - t0), after=600)
+q.append(lambda: started.append(now() - t0), after=300, count=3, interval=100)
+q.join()
+assert sorted(started) == [300.0, 400.0, 500.0, 600.0], started
+
+#
+# Core.sleep_until time-out
+#
+c = Core()
+t0 = now()
+try:
+    c.sleep_until(lambda: False, timeout=3600)
+except Timeout:
+    pass
+else:
+    assert False, "Timeout expected"
+assert now() - t0 == 3600.0
+
+real_time = time.time() - real_start
+print("real time: %.2f sec" % (real_time,))
+assert real_time < 60
+set_clock(None)
+print("OK")